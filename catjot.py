@@ -28,6 +28,7 @@ Architecture at a glance
 ─────────────────────────
   Note            — a single jotted thought; knows how to read/write itself
   NoteContext     — `with` wrapper that materialises a filtered Note list
+  NoteTransaction — batches deletes/amends/inserts into a single write
   ContextBundle   — a live, set-algebra view over many notes; used by the
                     LLM roleplay / conversation system
   catjot_graphql  — optional GraphQL interface over the same note file
@@ -40,7 +41,7 @@ import json
 import sys
 from functools import partial
 from typing import Callable, List
-from os import environ, getcwd, getenv
+from os import cpu_count, environ, getcwd, getenv
 from enum import Enum, auto
 
 # ENVIRONMENT VARIABLES
@@ -58,6 +59,36 @@ from enum import Enum, auto
 #                                            to the built-in cat-assistant
 #                                            prompt in `jot llm`; replaces it
 #                                            entirely in `jot chat`/`jot convo`.
+# CATJOT_INDEX      1                        Set to 0 to disable the sidecar
+#                                            files (<notefile>.idx, .tags, .dirs,
+#                                            .words, .tri, .vocab, .cache)
+#                                            entirely.
+# CATJOT_INDEX_MIN  1048576                  Notefile size in bytes at which a
+#                                            missing sidecar is built on first
+#                                            use.  Smaller files are simply
+#                                            scanned.
+# CATJOT_FULLTEXT   1                        Set to 0 to stop message and
+#                                            context searches from using (and
+#                                            building) <notefile>.words.
+# CATJOT_TRIGRAM    0                        Set to 1 to keep <notefile>.tri, a
+#                                            trigram index for `jot m`, `jot re`
+#                                            and punctuation-heavy searches.
+# CATJOT_CACHE      0                        Set to 1 to have full reads use
+#                                            (and build) the parsed snapshot
+#                                            <notefile>.cache.
+# CATJOT_WORKERS    (number of CPUs)         Processes a full scan of a large
+#                                            notefile is split across.  Set to
+#                                            1 to always scan in one process.
+# CATJOT_PARALLEL_MIN 33554432               Notefile size in bytes at which
+#                                            Note.match() scans in parallel.
+# CATJOT_COMPACT_RATIO 0.1                   Fraction of tombstoned records
+#                                            (deleted notes plus their
+#                                            tombstones) at which `jot compact`
+#                                            rewrites the notefile.
+# CATJOT_QUERY_CACHE 16777216                Bytes of query results the MCP
+#                                            server, GraphQL and `jot llm` keep
+#                                            between identical queries.  Set to
+#                                            0 to turn the cache off.
 #
 # ── Bash / Zsh ────────────────────────────────────────────────────────────────
 # Persist in ~/.bash_profile, ~/.bashrc, or ~/.zshrc:
@@ -142,8 +173,11 @@ class SearchType(Enum):
       CONTEXT    — case-sensitive substring search of the context field
       CONTEXT_I  — case-insensitive version of CONTEXT
       TIMESTAMP  — match the exact integer epoch timestamp (Note.now)
+      TIME_RANGE — (since, until) epoch bounds on Note.now: since <= now < until;
+                   either bound may be None to leave that end open
       DIRECTORY  — exact match on the stored directory path (Note.pwd)
       TREE       — prefix match on pwd; returns the note and all children
+      REGEX      — re.search() of a regular expression in the message body
     """
 
     ALL = auto()
@@ -153,8 +187,10 @@ class SearchType(Enum):
     CONTEXT = auto()
     CONTEXT_I = auto()
     TIMESTAMP = auto()
+    TIME_RANGE = auto()
     DIRECTORY = auto()
     TREE = auto()
+    REGEX = auto()
 
 
 class OutputColors(Enum):
@@ -226,6 +262,12 @@ class Note(object):
 
     This keeps a one-step rollback available at all times — the cat always
     lands on its feet.
+
+    Deletes can also skip the rewrite entirely: delete(..., tombstone=True)
+    appends a small record whose Directory: is TOMBSTONE_PWD and whose Date:
+    is the timestamp being deleted.  Readers hide the tombstone and every
+    note with that timestamp written *before* it; Note.compact() later folds
+    the accumulated tombstones away with one ordinary two-phase rewrite.
     """
 
     # ── On-disk field label constants ────────────────────────────────────────
@@ -279,11 +321,64 @@ class Note(object):
         ("context", LABEL_CTX),
     ]
 
+    # Lines of a record that hold its headers: all a header-only read keeps
+    HEADER_LINES = len(FIELDS_TO_PARSE)
+
+    # Bytes read per step when walking the file backwards from EOF
+    TAIL_BLOCK = 64 * 1024
+
+    # compile() tests a note's fields in this order: cheapest first, the
+    # message (decoded on first access, see _load()) last
+    QUERY_ORDER = (
+        SearchType.TIMESTAMP,
+        SearchType.TIME_RANGE,
+        SearchType.DIRECTORY,
+        SearchType.TREE,
+        SearchType.TAG,
+        SearchType.CONTEXT,
+        SearchType.CONTEXT_I,
+        SearchType.MESSAGE,
+        SearchType.MESSAGE_I,
+        SearchType.REGEX,
+    )
+
+    # rank() scores notes with BM25 over these fields, each word found in a
+    # tag counting twice; RANK_LIMIT is how many notes `jot s --rank` shows
+    RANK_FIELDS = (("tag", 2.0), ("context", 1.0), ("message", 1.0))
+    RANK_K1 = 1.2
+    RANK_B = 0.75
+    RANK_LIMIT = 10
+
+    # A full scan of a notefile this big is split across WORKERS processes
+    WORKERS = int(getenv("CATJOT_WORKERS", "0")) or cpu_count() or 1
+    PARALLEL_MIN = int(getenv("CATJOT_PARALLEL_MIN", str(32 << 20)))
+
+    # stream() hands the mapped pages of the notefile back to the OS every
+    # time it has read this far past the last ones it dropped
+    DROP_BEHIND = 16 << 20
+
+    # Directory: of a tombstone record.  Never a real working directory, so
+    # it can't collide with a jotted note; older catjot versions simply show
+    # tombstones as notes written in /dev/null.
+    TOMBSTONE_PWD = "/dev/null"
+    # `jot compact` rewrites once this fraction of records is dead weight
+    COMPACT_RATIO = float(getenv("CATJOT_COMPACT_RATIO", "0.1"))
+
     # Filepath to save to, saves in $HOME
     NOTEFILE = f"{environ['HOME']}/.catjot"
+    # Notefiles kept parsed by current(): {path: (notes, resume mark)}
+    _SHELF = {}
     # Use colorization if terminal supports
     USE_COLORIZATION = True and supports_color()
 
+    # No per-instance __dict__: a notefile of tens of thousands of notes is
+    # held in memory by `jot d`, the MCP server and rpjot bundles alike.
+    # context and message are properties backed by _context/_message; notes
+    # read from disk leave both None and keep the raw lines in _body until
+    # one of them is first asked for (see _load()).  A header-only read
+    # keeps no body at all, just the record's (src, start, end) span.
+    __slots__ = ("pwd", "now", "tag", "_context", "_message", "_body")
+
     def __init__(self, values_dict=None):
         """Initialise a Note from a plain dictionary of field values.
 
@@ -304,23 +399,99 @@ class Note(object):
                 "context" — str, situational annotation
                 "message" — str, the note body
         """
-        from time import time
-
         if values_dict is None:
             values_dict = {}
-        now = int(time())
-        self.pwd = values_dict.get("pwd", getcwd())
+        if "now" in values_dict:
+            now = values_dict["now"]
+        else:
+            from time import time
+
+            now = time()
+        self._body = None
+        self.pwd = values_dict["pwd"] if "pwd" in values_dict else getcwd()
         assert self.pwd.startswith("/")
-        self.now = int(values_dict.get("now", now))
-        assert isinstance(self.now, int)
+        self.now = int(now)
         self.tag = values_dict.get("tag", "")
         assert isinstance(self.tag, str)
-        self.context = values_dict.get("context", "")
-        self.message = values_dict.get("message", "")
+        self._context = values_dict.get("context", "")
+        message = values_dict.get("message", "")
         # Strip the on-disk "Message:" label prefix if present so the stored
         # text and the in-memory text are always identical.
-        if self.message.startswith(Note.LABEL_ARG):
-            self.message = self.message[len(Note.LABEL_ARG) :]
+        if message.startswith(Note.LABEL_ARG):
+            message = message[len(Note.LABEL_ARG) :]
+        self._message = message
+
+    @classmethod
+    def _load(cls, record, span=None):
+        """Build a Note straight from one record's raw lines, or return None.
+
+        The lazy twin of Note(_parse(record)): it accepts and rejects exactly
+        the same records, but only the Directory:/Date:/Tag: headers are
+        decoded here.  The Context: line and the message lines are kept as
+        one raw string in _body until the context or message property is
+        first read — which for `jot -d`, counts and timestamp lookups is
+        never.
+
+        When `span` is given, `record` is a header-only read (see iterate()):
+        just its first HEADER_LINES lines were kept.  The context is decoded
+        on the spot and _body holds the (src, start, end) span instead, so
+        asking for the message re-reads that one record from disk.
+        """
+        try:
+            pwd = record[0].split(cls.LABEL_PWD, 1)[1].strip()
+            now = record[1].split(cls.LABEL_NOW, 1)[1].strip()
+            tag = record[2].split(cls.LABEL_TAG, 1)[1].strip()
+            if cls.LABEL_CTX not in record[3]:
+                return None
+        except IndexError:
+            return None  # header line missing or out of order — skip record
+        note = cls.__new__(cls)
+        note.pwd = pwd
+        note.now = int(now)
+        note.tag = tag
+        note._context = note._message = None
+        if span is None:
+            note._body = "".join(record[3:])
+        else:
+            note._context = record[3].split(cls.LABEL_CTX, 1)[1].strip()
+            note._body = span
+        return note
+
+    @property
+    def context(self):
+        if self._context is None:
+            line = self._body.split("\n", 1)[0]
+            self._context = line.split(Note.LABEL_CTX, 1)[1].strip()
+            if self._message is not None:
+                self._body = None
+        return self._context
+
+    @context.setter
+    def context(self, value):
+        self._context = value
+
+    @property
+    def message(self):
+        if self._message is None:
+            body = self._body
+            if isinstance(body, tuple):
+                # header-only read: fetch the record's lines back from disk
+                src, start, end = body
+                with open(src, "rb") as file:
+                    file.seek(start)
+                    body = "".join(Note._split_lines(file.read(end - start))[3:])
+            body = body.split("\n", 1)
+            message = (body[1] if len(body) > 1 else "").rstrip() + "\n"
+            if message.startswith(Note.LABEL_ARG):
+                message = message[len(Note.LABEL_ARG) :]
+            self._message = message
+            if self._context is not None:
+                self._body = None
+        return self._message
+
+    @message.setter
+    def message(self, value):
+        self._message = value
 
     def __str__(self):
         """Render the note for human eyes (terminal display format).
@@ -451,357 +622,3608 @@ class Note(object):
             }
         )
 
-    @classmethod
-    def append(cls, src, note):
-        """Serialise a Note and append it to the note file.
+    @classmethod
+    def append(cls, src, note):
+        """Serialise a Note and append it to the note file.
+
+        Writes one complete record — separator, all four header fields, and
+        the message body — in a single open/write/close cycle.  The file is
+        opened in append mode ("at") so concurrent writers don't clobber each
+        other's notes (though concurrent *deletes* are not safe).
+
+        Args:
+            src:  path to the .catjot file (created if it doesn't exist).
+            note: a Note object; its message must be non-empty.
+
+        Raises:
+            ValueError: if note.message is falsy (empty string).
+        """
+        if not note.message:
+            raise ValueError("Cannot append a note with an empty message")
+
+        # tag and context each occupy a single line in the record format;
+        # collapse any embedded newlines defensively so a Note built outside
+        # of Note.jot() (e.g. directly from a dict) can't desync the parser.
+        head = f"{Note.LABEL_SEP}\n".encode("utf-8")
+        body = cls._record_text(note).encode("utf-8")
+
+        cls.recover(src)
+        stamp = _Sidecar.stamp(src)
+        with open(src, "ab") as file:
+            start = file.seek(0, 2) + len(head)
+            file.write(head + body)
+        # keep any sidecar indexes in step with the bytes just written
+        _Sidecar.appended(src, stamp, start, start + len(body), body)
+
+    @staticmethod
+    def _record_text(note):
+        """Serialise a Note as one on-disk record, minus the "^-^" line."""
+        return (
+            f"{Note.LABEL_PWD}{note.pwd}\n"
+            + f"{Note.LABEL_NOW}{note.now}\n"
+            + f"{Note.LABEL_TAG}{Note._single_line(note.tag)}\n"
+            + f"{Note.LABEL_CTX}{Note._single_line(note.context)}\n"
+            + f"{Note.LABEL_ARG}{note.message}\n\n"
+        )
+
+    @classmethod
+    def delete(cls, src, timestamp, tombstone=False):
+        """Write a shadow copy of the note file with matching notes omitted.
+
+        Does NOT modify src in place.  Instead it creates <src>.new containing
+        every note whose timestamp does NOT equal `timestamp`.  Call
+        Note.commit(src) afterward to atomically replace src with the new file
+        and keep a backup at <src>.old.
+
+        If multiple notes share the same timestamp (unusual but possible if
+        notes are constructed with an explicit `now` value) all of them will be
+        omitted — timestamp is the only identity key the format provides.
+
+        With tombstone=True nothing is rewritten: a tombstone record for
+        `timestamp` is appended to src instead, hiding the matching notes
+        from every reader immediately.  There is no <src>.new, so do NOT
+        call commit() afterward; Note.compact() reclaims the space later.
+
+        Args:
+            src:       path to the source note file.
+            timestamp: int epoch value of the note(s) to remove.
+            tombstone: append a tombstone instead of writing <src>.new.
+        """
+        if tombstone:
+            grave = {"pwd": cls.TOMBSTONE_PWD, "now": int(timestamp)}
+            cls.append(src, Note({**grave, "message": "tombstone\n"}))
+            return
+
+        newpath = cls._shadow(src)
+        with open(newpath, "wt") as trunc_file:
+            for inst in cls.iterate(src):
+                if int(inst.now) != int(timestamp):
+                    trunc_file.write(f"{Note.LABEL_SEP}\n")
+                    trunc_file.write(f"{Note.LABEL_PWD}{inst.pwd}\n")
+                    trunc_file.write(f"{Note.LABEL_NOW}{inst.now}\n")
+                    trunc_file.write(f"{Note.LABEL_TAG}{inst.tag}\n")
+                    trunc_file.write(f"{Note.LABEL_CTX}{inst.context}\n")
+                    trunc_file.write(f"{Note.LABEL_ARG}{inst.message}\n\n")
+
+    @classmethod
+    def amend(cls, src, context=None, pwd=None, tag=None):
+        """Rewrite the *last* note in the file with updated field values.
+
+        Like delete(), this is a two-phase operation: it produces <src>.new and
+        requires a subsequent Note.commit() call to finalise.  Unlike delete(),
+        <src>.new holds only the *tail* of the file — the last note, rewritten
+        with whichever fields are provided as non-None arguments, followed by
+        any bytes after it (tombstones) copied verbatim.  Alongside it goes
+        <src>.journal, recording where that tail belongs and the bytes it
+        replaces, so commit() can splice it in place instead of swapping in a
+        whole new file.  Nothing before the last note is read or written:
+        amending costs about as much as appending, whatever the file size.
+
+        Tag handling is additive by default — passing tag="new_label" appends
+        to the existing tag string rather than replacing it.  To *remove* a
+        tag, prefix it with "~": tag="~old_label" strips "old_label" from
+        the existing tags.
+
+        Args:
+            src:     path to the source note file.
+            context: new context string for the last note, or None to keep
+                     the existing value.
+            pwd:     new directory path for the last note, or None to keep
+                     the existing value.
+            tag:     tag to add (plain string) or remove ("~tagname"), or None
+                     to leave the tag field untouched.
+        """
+        import os
+
+        cls.recover(src)
+        src_stat = os.stat(src)
+        cut, end, inst = next(
+            cls._live_reverse(src), (src_stat.st_size, src_stat.st_size, None)
+        )
+        with open(src, "rb") as file:
+            file.seek(cut)
+            undo = file.read(src_stat.st_size - cut)
+
+        tail = b""
+        if inst is not None:
+            if pwd:
+                inst.pwd = pwd
+            if tag:
+                inst.tag = cls._retag(inst.tag, tag)
+            if context:
+                inst.context = context
+            tail = cls._record_text(inst).encode("utf-8") + undo[end - cut :]
+
+        # redo data first, then the journal that makes it meaningful
+        with open(src + ".new", "wb") as shadow:
+            shadow.write(tail)
+            shadow.flush()
+            os.fsync(shadow.fileno())
+        cls._write_journal(src, ("pending", src_stat, cut, undo))
+
+    @staticmethod
+    def _retag(tags, tag):
+        """Apply one amend-style tag edit to a tag string and return the result.
+
+        A plain word is added (once); "~word" removes it if present.
+        """
+        all_tags = tags.split(" ")
+        if tag.startswith("~"):
+            try:
+                all_tags.remove(tag[1:])
+            except ValueError:
+                pass  # don't care if its not in there
+        else:
+            if tag not in all_tags:
+                all_tags.append(tag)
+        return " ".join(all_tags)
+
+    @classmethod
+    def transaction(cls, src):
+        """Return a NoteTransaction that batches changes to src.
+
+        Usage:
+            with Note.transaction(NOTEFILE) as txn:
+                txn.delete(1694747662)
+                txn.amend(1694747797, tag="~draft")
+                txn.insert(Note.jot("rescheduled"))
+
+        Everything queued inside the block is applied once, when it exits
+        cleanly — see NoteTransaction for how.
+        """
+        return NoteTransaction(src)
+
+    @classmethod
+    def pop(cls, src, path, tombstone=False):
+        """Delete the most recently written note for a given directory.
+
+        Walks the notes matching the exact directory path backwards from EOF
+        and stops at the first one — the newest.  That timestamp is passed
+        to Note.delete() to produce the <src>.new shadow file.
+
+        Still requires Note.commit(src) to apply the deletion, unless
+        tombstone=True, which appends a tombstone instead (see delete()).
+
+        Args:
+            src:       path to the note file.
+            path:      exact directory string to match (SearchType.DIRECTORY).
+            tombstone: passed through to delete().
+
+        Raises:
+            TypeError: if no notes are found for `path` (last_record stays
+                       None and delete(src, None) will raise).
+        """
+        last_record = None
+        for last_record in Note.match(
+            src, [(SearchType.DIRECTORY, path)], time_only=True, order="desc"
+        ):
+            break
+        cls.delete(src, last_record, tombstone=tombstone)
+
+    @classmethod
+    def commit(cls, src):
+        """Atomically replace the note file with the pending shadow copy.
+
+        The two-step rename sequence is:
+          1. src        → src.old   (previous version kept as one-step backup)
+          2. src.new    → src       (shadow copy becomes the live file)
+
+        Always pair this with a prior Note.delete(), Note.amend(), or
+        Note.pop() call that produced the src.new file.  Calling commit()
+        without a preceding write-phase will raise FileNotFoundError because
+        src.new won't exist — the cat doesn't like committing to nothing.
+
+        After amend() there is a <src>.journal as well, and src.new is only
+        the file's tail: commit() then truncates src at the journalled offset
+        and writes the tail in place (see _apply_tail()).  No .old is made in
+        that case — the journal holds the replaced bytes until the splice is
+        on disk, and is removed once it is.
+        """
+        import shutil
+
+        journal = cls._read_journal(src)
+        if journal is not None:
+            # amend() left a tail, not a whole file: splice it in place
+            cls._apply_tail(src, journal)
+            return
+
+        shutil.move(src, src + ".old")
+        shutil.move(src + ".new", src)
+        # the swapped-in file has a new inode, so every sidecar is stale;
+        # drop them and let the next open() rebuild just the one it needs
+        _Sidecar.discard(src)
+
+    # ── amend journal ───────────────────────────────────────────────────────
+    #
+    # <src>.journal is a marshal tuple:
+    #
+    #   (JOURNAL_MAGIC, state, st_dev, st_ino, size, cut, undo)
+    #
+    # written by amend() next to a tail-only <src>.new.  `undo` holds the
+    # bytes src[cut:size] that the tail replaces.  state "pending" means src is
+    # untouched; commit() flips it to "applying" before truncating src at
+    # `cut`, and deletes the journal once the tail is durably written.  A
+    # crash while "applying" is repaired by recover(), which simply redoes
+    # the splice — truncate-and-write is idempotent.
+
+    JOURNAL_MAGIC = "catjot-amend"
+
+    @classmethod
+    def _write_journal(cls, src, entry):
+        """Atomically write <src>.journal for (state, src_stat, cut, undo)."""
+        import marshal
+        import os
+
+        state, src_stat, cut, undo = entry
+        tmp = src + ".journal.tmp"
+        with open(tmp, "wb") as file:
+            marshal.dump(
+                (
+                    cls.JOURNAL_MAGIC,
+                    state,
+                    src_stat.st_dev,
+                    src_stat.st_ino,
+                    src_stat.st_size,
+                    cut,
+                    undo,
+                ),
+                file,
+            )
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, src + ".journal")
+
+    @classmethod
+    def _read_journal(cls, src):
+        """Return (state, dev, ino, size, cut, undo) from <src>.journal, or None."""
+        import marshal
+
+        try:
+            with open(src + ".journal", "rb") as file:
+                entry = marshal.load(file)
+        except FileNotFoundError:
+            return None
+        except (EOFError, ValueError, TypeError):
+            entry = None
+        if not entry or entry[0] != cls.JOURNAL_MAGIC:
+            # a journal that never finished being written: the amend it
+            # belonged to never reached src, so forget it
+            cls._discard_journal(src)
+            return None
+        return entry[1:]
+
+    @classmethod
+    def _discard_journal(cls, src):
+        """Drop a pending amend (its journal and tail) without applying it."""
+        import os
+
+        for path in (src + ".journal", src + ".new"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @classmethod
+    def _apply_tail(cls, src, journal):
+        """Splice amend()'s tail into src at the journalled offset.
+
+        Raises:
+            ValueError: src was replaced or written to after amend() ran, so
+                        the tail no longer fits; the pending amend is dropped.
+        """
+        import os
+
+        state, dev, ino, size, cut, undo = journal
+        src_stat = os.stat(src)
+        if (src_stat.st_dev, src_stat.st_ino) != (dev, ino) or (
+            state == "pending" and src_stat.st_size != size
+        ):
+            cls._discard_journal(src)
+            raise ValueError(f"{src} changed after amend; amend discarded")
+
+        with open(src + ".new", "rb") as shadow:
+            tail = shadow.read()
+        if state == "pending":
+            cls._write_journal(src, ("applying", src_stat, cut, undo))
+
+        stamp = _Sidecar.stamp(src)
+        with open(src, "r+b") as file:
+            file.truncate(cut)
+            file.seek(cut)
+            file.write(tail)
+            file.flush()
+            os.fsync(file.fileno())
+        os.remove(src + ".new")
+        os.remove(src + ".journal")
+        if state == "pending":
+            # a redo after a crash can't vouch for the sidecars; leave them
+            # to notice the change and rebuild
+            _Sidecar.rewritten(src, stamp, cut, tail)
+
+    @classmethod
+    def recover(cls, src):
+        """Finish an amend commit that was interrupted mid-write.
+
+        Cheap when there is nothing to do (one failed open).  Called before
+        every append, amend and commit so no write ever lands on a notefile
+        that is still half-spliced.
+        """
+        journal = cls._read_journal(src)
+        if journal is not None and journal[0] == "applying":
+            cls._apply_tail(src, journal)
+
+    @classmethod
+    def _shadow(cls, src):
+        """Return <src>.new for a whole-file rewrite, clearing any pending amend.
+
+        A tail left by amend() must never be mistaken for a full copy by the
+        next commit(), so its journal goes before the new shadow is written.
+        """
+        cls.recover(src)
+        cls._discard_journal(src)
+        return src + ".new"
+
+    @classmethod
+    def compact(cls, src, ratio=None):
+        """Rewrite src without its tombstones and the notes they buried.
+
+        Tombstoned deletes are cheap appends, but the dead records keep
+        taking up space and parse time.  Once they make up at least `ratio`
+        of all records, compact() writes only the live notes to <src>.new
+        and commits it — the same two-phase swap delete() uses, so <src>.old
+        still holds the pre-compaction file.  Below the ratio nothing is
+        touched.
+
+        Args:
+            src:   path to the note file.
+            ratio: fraction of dead records (0.0–1.0) that justifies the
+                   rewrite; defaults to COMPACT_RATIO.  0 compacts whenever
+                   there is anything at all to fold.
+
+        Returns:
+            (dead, total): dead records dropped and records scanned, or
+            (0, total) when the ratio wasn't reached and src was left alone.
+        """
+        if ratio is None:
+            ratio = cls.COMPACT_RATIO
+        dead = cls._tombstones(src)
+        total = buried = 0
+        for start, end, record in cls._records(src, headers_only=True):
+            total += 1
+            buried += cls._buried(cls._load(record, (src, start, end)), start, dead)
+        if not buried or buried < ratio * total:
+            return 0, total
+
+        newpath = cls._shadow(src)
+        with open(newpath, "wt") as trunc_file:
+            for inst in cls.iterate(src):
+                trunc_file.write(f"{Note.LABEL_SEP}\n{cls._record_text(inst)}")
+        cls.commit(src)
+        return buried, total
+
+    @classmethod
+    def iterate(cls, src, headers_only=False, resume=None):
+        """Yield every Note in the file, in order of appearance.
+
+        This is the foundation of all read operations.  Note.match() calls
+        this generator and filters its output; nothing else should need to
+        open the note file directly (the sidecar indexes only ever seek to
+        byte spans this parser reported — see _records()).
+
+        The parser recognises a record boundary as a blank line immediately
+        followed by a "^-^" line (LABEL_SEP).  Records do not need a trailing
+        separator at the end of the file — the final record is flushed when
+        EOF is reached.
+
+        Fault tolerance
+        ───────────────
+        If the first line of a new record doesn't look like a Directory:
+        header (which happens when a raw "^-^" separator ends up inside a
+        previous note's message body, e.g. from `cat file.jot | jot`), the
+        malformed fragment is silently discarded so it doesn't poison the
+        rest of the file.  Parsing resumes at the next valid record boundary.
+
+        Tombstones
+        ──────────
+        Tombstone records (see delete(tombstone=True)) are never yielded, and
+        neither is any note they bury.  _tombstones() finds them up front
+        with a byte search, so a file that has none parses exactly as before.
+
+        Header-only reads
+        ─────────────────
+        With headers_only=True the parser keeps only the first HEADER_LINES
+        of each record and never decodes the rest — a note piped in from
+        `top -b` or a build log costs about the same as a one-liner.  pwd,
+        now, tag and context are all there; message is re-read from disk,
+        one seek per note, on first access.  Meant for callers that count
+        notes or print `-d` timestamps.
+
+        Snapshot cache
+        ──────────────
+        With CATJOT_CACHE=1 and a file big enough to have a <src>.cache
+        (see NoteCache), a full read takes the notes from that snapshot
+        instead and the file isn't parsed at all; they are the same notes
+        either way.  Header-only reads never use it.
+
+        Resuming
+        ────────
+        The generator's return value (what `yield from` evaluates to) is a
+        high-water mark.  Passed back as `resume`, it makes iterate() yield
+        only the notes appended since: reading starts at the mark instead of
+        byte 0.  If the file can't simply have grown since — a different
+        inode, fewer bytes, or changed bytes in the tail an amend would
+        splice — the mark is ignored and the whole file is read again.  A
+        tombstone appended since the mark hides notes in the new part only;
+        use refresh() to also drop the older notes it buries.
+
+        Yields:
+            Note objects, one per valid record.
+
+        Returns:
+            the mark to resume from next time.
+        """
+        resume = cls._resume(src, resume)
+        return (yield from cls._iterate_from(src, headers_only, resume))
+
+    @classmethod
+    def refresh(cls, src, notes, mark=None):
+        """Bring a list from an earlier read up to date; return the new mark.
+
+        `notes` is a list filled by a previous refresh() (or iterate()) of src
+        that returned `mark`.  Only records appended after the mark are
+        parsed: their notes are appended to the list, and notes the new
+        tombstones bury are removed from it.  When the mark no longer fits
+        the file (see iterate()), or is None, the list is refilled from
+        scratch.  Long-lived readers — the MCP server, ContextBundle, the
+        `jot llm` tools — call this (through current()) before each use, so a
+        refresh costs as much as what was written since, not as much as the
+        file.
+        """
+        resume = cls._resume(src, mark)
+        offset, dead = resume[0], resume[-1]
+        if not offset:
+            notes.clear()
+        elif dead:
+            notes[:] = [n for n in notes if n.now not in dead]
+        reader = cls._iterate_from(src, False, resume)
+        while True:
+            try:
+                notes.append(next(reader))
+            except StopIteration as done:
+                return done.value
+
+    @classmethod
+    def current(cls, src):
+        """Return every note in src, as a list kept up to date across calls.
+
+        The list lives in _SHELF for the life of the process and is caught
+        up with refresh() on each call, so a long-running reader pays for a
+        full parse once and afterwards only for what was written since.
+        Treat it as read-only: it is shared with every other caller.
+        """
+        notes, mark = cls._SHELF.pop(src, ([], None))
+        mark = cls.refresh(src, notes, mark)
+        cls._SHELF[src] = (notes, mark)
+        return notes
+
+    @classmethod
+    def mark(cls, src):
+        """Return the mark refresh() would after reading all of src.
+
+        Only the last visible note is read (found from the end, as
+        reverse_iterate() does), so a reader that got its notes some other
+        way — a sidecar index, a match() — can still catch up with
+        refresh()'s machinery later, from where the file stands now.
+        """
+        start = 0
+        for start, _end, _note in cls._live_reverse(src, True):
+            break
+        resume = (start, False, start, None, cls._tombstones(src, start))
+        reader = cls._iterate_from(src, True, resume)
+        while True:
+            try:
+                next(reader)
+            except StopIteration as done:
+                return done.value
+
+    @classmethod
+    def _resume(cls, src, mark):
+        """Check a resume mark against src and say where to read from.
+
+        A mark is (st_dev, st_ino, offset, flushed, live, live_now, crc):
+        where the last read stopped; whether its final record was only
+        closed by EOF, so the next line has to be a "^-^" separator for it
+        to stay closed; the start and timestamp of the last visible note;
+        and the CRC-32 of the bytes from that note to `offset`.  Note.amend
+        splices the file from the last visible note on, so the CRC notices
+        an amend that kept the size the same — unless a tombstone since
+        buried that note, and the amend went further back; that restarts.
+
+        Returns (offset, flushed, live, live_now, dead), dead being the
+        tombstones from offset on (see _tombstones()), or the same for a
+        read from the top when the mark is None or doesn't fit.
+        """
+        import os
+        import zlib
+
+        restart = (0, False, 0, None)
+        if mark is not None:
+            dev, ino, offset, flushed, live, live_now, crc = mark
+            src_stat = os.stat(src)
+            if (src_stat.st_dev, src_stat.st_ino) != (dev, ino):
+                mark = None
+            elif src_stat.st_size < offset:
+                mark = None
+            else:
+                with open(src, "rb") as file:
+                    file.seek(live)
+                    if zlib.crc32(file.read(offset - live)) != crc:
+                        mark = None
+                    elif flushed and offset < src_stat.st_size:
+                        line = file.readline().decode("utf-8", "replace")
+                        if line.strip() != cls.LABEL_SEP:
+                            mark = None
+        if mark is not None:
+            dead = cls._tombstones(src, offset)
+            if live_now not in dead:
+                return offset, flushed, live, live_now, dead
+        return restart + (cls._tombstones(src),)
+
+    @classmethod
+    def _iterate_from(cls, src, headers_only, resume):
+        """iterate() from a resume point returned by _resume()."""
+        import os
+        import zlib
+
+        offset, was_flushed, live, live_now, dead = resume
+        src_stat = os.stat(src)
+        cache = NoteCache.open(src) if not (offset or headers_only) else None
+        if cache is not None:
+            stop, flushed, live, live_now = yield from cache.notes()
+        else:
+            records = cls._records(src, headers_only, offset)
+            while True:
+                try:
+                    start, end, record = next(records)
+                except StopIteration as done:
+                    stop, flushed = done.value
+                    if stop == offset:
+                        flushed = was_flushed  # nothing new was read
+                    break
+                span = (src, start, end) if headers_only else None
+                note = cls._load(record, span)
+                if note is None:
+                    yield Note(None)
+                elif cls._buried(note, start, dead):
+                    continue
+                else:
+                    yield note
+                live, live_now = start, note and note.now
+
+        if not stop:
+            live, live_now = 0, None  # ended mid-line: the next read restarts
+        with open(src, "rb") as file:
+            file.seek(live)
+            crc = zlib.crc32(file.read(stop - live))
+        return src_stat.st_dev, src_stat.st_ino, stop, flushed, live, live_now, crc
+
+    @classmethod
+    def _buried(cls, note, start, dead):
+        """True if the loaded record at `start` must be hidden from readers.
+
+        That is: it is a tombstone itself, or `dead` (from _tombstones())
+        holds a tombstone for its timestamp written after it.  A note jotted
+        again after its tombstone — same timestamp, later offset — lives.
+        """
+        if note is None:
+            return False
+        if note.pwd == cls.TOMBSTONE_PWD:
+            return True
+        return bool(dead) and start < dead.get(note.now, -1)
+
+    @classmethod
+    def _tombstones(cls, src, begin=0, drop_behind=False):
+        """Return {timestamp: offset} of the last tombstone for each timestamp.
+
+        A memchr-speed search over the mapped file finds every place the
+        tombstone header could be.  Each hit is then confirmed by parsing
+        forward from the nearest sync separator before it (_record_at()), so
+        a message that merely quotes "Directory:/dev/null" buries nothing.
+        Files without tombstones never get past the search.  Only tombstones
+        at or after offset `begin` (a line start) are looked for.  With
+        drop_behind the search goes DROP_BEHIND bytes at a time, releasing
+        the pages it is done with, as _records() does.
+        """
+        import mmap
+        import os
+
+        marker = f"{cls.LABEL_PWD}{cls.TOMBSTONE_PWD}".encode("utf-8")
+        dead = {}
+        with open(src, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if not size:
+                return dead
+            drop_behind = drop_behind and hasattr(mmap, "MADV_DONTNEED")
+            step = cls.DROP_BEHIND if drop_behind else size
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                checked = -1
+                pos = begin
+                while pos < size:
+                    # hits starting in [pos, pos + step)
+                    stop = min(size, pos + step + len(marker) - 1)
+                    hit = view.find(marker, pos, stop)
+                    while hit >= 0:
+                        begin = cls._line_start(view, 0, hit)
+                        if begin > checked:
+                            checked = begin
+                            fields = cls._record_at(view, begin)
+                            if fields and fields["pwd"] == cls.TOMBSTONE_PWD:
+                                try:
+                                    dead[int(fields["now"])] = begin
+                                except ValueError:
+                                    pass
+                        hit = view.find(marker, hit + len(marker), stop)
+                    pos += step
+                    if drop_behind:
+                        done = min(pos, size)
+                        view.madvise(mmap.MADV_DONTNEED, 0, done - done % mmap.PAGESIZE)
+        return dead
+
+    @classmethod
+    def _record_at(cls, view, begin):
+        """Parse the record starting exactly at offset `begin` of view.
+
+        Returns the _parse() fields, or None when the full-file parser would
+        not start a record on that line.  Only the bytes between the nearest
+        sync separator before `begin` and the end of that record are read.
+        """
+        lo, cut = begin, None
+        while cut is None and lo > 0:
+            lo = max(0, lo - max(cls.TAIL_BLOCK, begin - lo))
+            cut = cls._sync_point(view[lo:begin], lo)
+        for start, _end, record in cls._scan(cls._lines_in(view, cut or 0)):
+            if start >= begin:
+                return cls._parse(record) if start == begin else None
+        return None
+
+    @classmethod
+    def _parse(cls, record):
+        """Convert a list of raw lines into a Note-constructor dict.
+
+        Pops lines from the front of `record` in FIELDS_TO_PARSE order,
+        strips the field label prefix, and accumulates the remainder as
+        the message body.  Returns None (implicitly) if the header lines
+        don't match the expected labels, causing the caller to skip the
+        malformed record silently.
+
+        Args:
+            record: list of raw file lines for one record (mutable;
+                    lines are pop(0)'ed during parsing).
+
+        Returns:
+            dict suitable for Note(**d), or None on parse failure.
+        """
+        current_read = {}
+        for field, label in cls.FIELDS_TO_PARSE:  # enforce header ordering
+            try:
+                current_read[field] = record.pop(0).split(label, 1)[1].strip()
+            except IndexError:
+                break  # header line missing or out of order — skip record
+        else:
+            # `for…else` fires only when the loop completed without a break,
+            # meaning all four header fields were parsed successfully.
+            message = "".join(record).rstrip() + "\n"
+            current_read["message"] = message
+            return current_read
+
+    @staticmethod
+    def _decode(raw):
+        """Decode file bytes as text mode would: "\\r\\n" and "\\r" become "\\n"."""
+        text = raw.decode("utf-8")
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return text
+
+    @staticmethod
+    def _line_end(data, pos, size):
+        """Offset just past the line holding data[pos]: after its "\\n",
+        "\\r\\n" or lone "\\r" (universal newlines), or `size` if unterminated.
+        """
+        stop = data.find(b"\n", pos, size)
+        stop = size if stop < 0 else stop + 1
+        cr = data.find(b"\r", pos, stop)
+        if cr >= 0 and data[cr + 1 : cr + 2] != b"\n":
+            stop = cr + 1
+        return stop
+
+    @staticmethod
+    def _line_start(data, lo, pos):
+        """Offset where the line holding data[pos] begins, or `lo` if it
+        starts at or before lo.  data[pos] must not be a line terminator.
+        """
+        nl = data.rfind(b"\n", lo, pos) + 1 or lo
+        cr = data.rfind(b"\r", nl, pos)
+        return nl if cr < 0 else cr + 1
+
+    @classmethod
+    def _line_before(cls, data, lo, begin):
+        """Offset where the line ending right before data[begin] begins, as
+        _line_start(): `begin` is just past that line's terminator, if any.
+        """
+        crlf = data[max(lo, begin - 2) : begin] == b"\r\n"
+        return cls._line_start(data, lo, begin - 2 if crlf else begin - 1)
+
+    @staticmethod
+    def _split_lines(data):
+        """Split raw record bytes into decoded lines, exactly as file iteration would."""
+        lines = Note._decode(data).split("\n")
+        record = [line + "\n" for line in lines[:-1]]
+        if lines[-1]:
+            record.append(lines[-1])
+        return record
+
+    @classmethod
+    def _records(cls, src, headers_only=False, offset=0, drop_behind=False):
+        """Yield (start, end, lines) for every record in src, in file order.
+
+        This is the parser behind iterate(): `lines` is the raw record handed
+        to _parse(), and [start, end) is the byte span those lines occupy in
+        the file — from the line after the "^-^" separator up to the next
+        record boundary (or EOF).  The spans are what the sidecar indexes
+        store, so a record can later be re-read with one seek.
+
+        The file is mapped and searched rather than walked line by line (see
+        _scan_blocks()): `lines` holds the header lines one by one and the
+        rest of the record as a single string — or, with headers_only=True,
+        just the header lines.
+
+        Reading starts at `offset`, which must be a point where the parser's
+        state is clean (0, or a resume point returned by an earlier read).
+        The generator returns that resume point — see _scan().
+
+        Every page of the mapping the scan touches stays resident until the
+        mapping is closed, so reading a 2 GB file this way ends with 2 GB
+        counted against the process.  With drop_behind, the pages behind
+        the record just yielded are released every DROP_BEHIND bytes
+        (madvise(MADV_DONTNEED); the records already decoded are copies),
+        which keeps a one-way read like stream() small.
+        """
+
+        import mmap
+        import os
+
+        with open(src, "rb") as file:
+            if not os.fstat(file.fileno()).st_size:
+                return offset, False
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                records = cls._scan_blocks(
+                    view, begin=offset, headers_only=headers_only
+                )
+                if not (drop_behind and hasattr(mmap, "MADV_DONTNEED")):
+                    return (yield from records)
+                dropped = 0
+                while True:
+                    try:
+                        start, end, record = next(records)
+                    except StopIteration as done:
+                        return done.value
+                    yield start, end, record
+                    reached = start - start % mmap.PAGESIZE
+                    if reached - dropped >= cls.DROP_BEHIND:
+                        view.madvise(mmap.MADV_DONTNEED, dropped, reached - dropped)
+                        dropped = reached
+
+    @staticmethod
+    def _lines_in(data, pos=0, base=0):
+        """Yield (base + offset, raw line) for data[pos:], like file iteration.
+
+        `data` may be bytes or an mmap; `base` is the file offset of data[0].
+        """
+        size = len(data)
+        while pos < size:
+            stop = Note._line_end(data, pos, size)
+            yield base + pos, data[pos:stop]
+            pos = stop
+
+    @staticmethod
+    def _scan(lines, end=None, begin=0):
+        """Run the record state machine over (offset, raw bytes) line pairs.
+
+        The reference parser, one line at a time: the readers use
+        _scan_blocks(), which agrees with it record for record, and this is
+        kept for the small slices checked around a single record (see
+        _record_at() and the sidecars).  With end=None the lines run to EOF
+        and the final record follows the EOF rule (flushed only after a
+        blank line).  Otherwise `end` is the offset of a sync separator (see
+        _sync_point()) that the full-file parser is guaranteed to treat as a
+        boundary, so whatever record is still open gets flushed there.
+
+        Run to EOF, the generator returns (offset, flushed): the first byte a
+        later read of the same, grown file has to start parsing from to
+        agree with a parse of the whole thing.  That is the start of a record
+        still open at EOF, or EOF itself — and then `flushed` says whether
+        the last record was only closed by the EOF rule, which holds up only
+        if the next line turns out to be a separator.  `begin` is the offset
+        of the first line, reported back if there are no lines at all.  A
+        file ending mid-line has no such point short of a record start, and
+        returns (0, False): start over.
+        """
+        current_record = []
+        last_line = ""
+        start = pos = begin
+        raw = b"\n"
+
+        for here, raw in lines:
+            pos = here + len(raw)
+            line = Note._decode(raw)
+            if last_line == "" and line.strip() == Note.LABEL_SEP:
+                # Blank line + separator = end of previous record.
+                # Flush whatever we accumulated and start fresh.
+                if len(current_record):
+                    yield start, here, current_record
+                current_record = []
+            else:
+                if current_record and Note.LABEL_PWD not in current_record[0]:
+                    # We're mid-record but the first line doesn't look like
+                    # a Directory: header — a separator landed inside the
+                    # previous note's data.  Drop this fragment silently
+                    # and wait for the next valid record boundary.
+                    current_record = []
+                    last_line = ""
+                    continue
+
+                if not current_record:
+                    start = here
+                current_record.append(line)
+                last_line = line.strip()
+
+        if end is not None:
+            # segment cut at a sync separator: that line closes the record
+            if len(current_record):
+                yield start, end, current_record
+        elif last_line == "" and len(current_record):
+            # End of file: no trailing separator, so flush the last record
+            # manually if one is in progress.
+            yield start, pos, current_record
+            return (pos, True) if raw.endswith((b"\n", b"\r")) else (0, False)
+        elif len(current_record):
+            return start, False
+        return (pos, False) if raw.endswith((b"\n", b"\r")) else (0, False)
+
+    @classmethod
+    def _scan_blocks(cls, data, base=0, end=None, begin=0, headers_only=False):
+        """_scan() over a whole buffer at once: same records, same spans.
+
+        `data` is bytes or an mmap starting at file offset `base`; `end` is
+        as for _scan().  The first HEADER_LINES lines of a record go through
+        the state machine one at a time, exactly as in _scan().  After that
+        the only thing that can happen is a boundary — a separator line
+        right after a blank one — so instead of decoding every line of a
+        `top -b` dump, the body is skipped with a byte search for the next
+        "^-^" and only the lines around each hit are looked at.  Parsing
+        starts at data[begin]; what the generator returns matches _scan().
+
+        The body skipped over is decoded in one go and kept as a single
+        trailing string, so a record comes out as its header lines plus the
+        rest of it — "".join() of that is exactly what _scan() would give.
+        With headers_only=True the body is not kept at all.
+
+        Lines end at "\n", "\r\n" or a lone "\r", and text is decoded with
+        those translated to "\n", as a text-mode read would.  Few notefiles
+        hold a "\r" at all, so the next one is looked for a window ahead
+        (`clear`: no "\r" before it) and lines short of it take the plain
+        "\n" path.
+        """
+        sep = cls.LABEL_SEP.encode("utf-8")
+        size = len(data)
+        current_record = []
+        last_line = ""
+        start = pos = begin
+        clear = begin
+
+        def stripped(begin, stop):
+            return data[begin:stop].decode("utf-8").strip()
+
+        while pos < size:
+            if len(current_record) >= cls.HEADER_LINES:
+                # find the first separator line at or after pos whose
+                # predecessor is blank; every line before it is body
+                hit = data.find(sep, pos)
+                while hit >= 0:
+                    stop = data.find(b"\n", hit)
+                    stop = size if stop < 0 else stop + 1
+                    if stop > clear:
+                        clear = data.find(b"\r", pos, stop)
+                        clear = stop if clear < 0 else clear
+                    if stop <= clear:
+                        begin = data.rfind(b"\n", pos, hit) + 1 or pos
+                    else:
+                        begin = cls._line_start(data, pos, hit)
+                        stop = cls._line_end(data, hit, size)
+                    if stripped(begin, stop) == cls.LABEL_SEP:
+                        if begin == pos:
+                            blank = last_line == ""
+                        elif begin <= clear:
+                            prev = data.rfind(b"\n", pos, begin - 1) + 1 or pos
+                            blank = stripped(prev, begin) == ""
+                        else:
+                            prev = cls._line_before(data, pos, begin)
+                            blank = stripped(prev, begin) == ""
+                        if blank:
+                            if begin > pos and not headers_only:
+                                body = data[pos:begin]
+                                current_record.append(
+                                    body.decode("utf-8")
+                                    if begin <= clear
+                                    else cls._decode(body)
+                                )
+                            pos, last_line = begin, ""
+                            break
+                    hit = data.find(sep, stop)
+                else:
+                    # no boundary before the end: only the last line counts
+                    if pos < size:
+                        prev = cls._line_before(data, pos, size)
+                        last_line = stripped(prev, size)
+                        if not headers_only:
+                            current_record.append(cls._decode(data[pos:size]))
+                    pos = size
+                    break
+
+            here = pos
+            stop = data.find(b"\n", pos)
+            pos = size if stop < 0 else stop + 1
+            if pos > clear:
+                clear = data.find(b"\r", here, here + cls.TAIL_BLOCK)
+                if clear < 0:
+                    clear = min(size, here + cls.TAIL_BLOCK)
+            if pos <= clear:
+                line = data[here:pos].decode("utf-8")
+            else:
+                pos = cls._line_end(data, here, size)
+                line = cls._decode(data[here:pos])
+            if last_line == "" and line.strip() == cls.LABEL_SEP:
+                if len(current_record):
+                    yield base + start, base + here, current_record
+                current_record = []
+            else:
+                if current_record and cls.LABEL_PWD not in current_record[0]:
+                    current_record = []
+                    last_line = ""
+                    continue
+
+                if not current_record:
+                    start = here
+                current_record.append(line)
+                last_line = line.strip()
+
+        if end is not None:
+            if len(current_record):
+                yield base + start, end, current_record
+            return None
+        ended = pos == begin or data[pos - 1 : pos] in (b"\n", b"\r")
+        if last_line == "" and len(current_record):
+            yield base + start, base + pos, current_record
+            return (base + pos, True) if ended else (0, False)
+        elif len(current_record):
+            return base + start, False
+        return (base + pos, False) if ended else (0, False)
+
+    @staticmethod
+    def _sync_point(buf, base):
+        """Return the offset of the last sync separator in buf, or None.
+
+        buf holds the file bytes starting at offset `base`.  A sync separator
+        is a "^-^" line the forward parser must treat as a record boundary no
+        matter what came before it: one at the very start of the file, one
+        directly after a whitespace-only line, or one directly after another
+        sync separator.  In every case the parser's state on reaching that
+        line is ([], "") — which is what lets the reverse reader start a
+        fresh parse there and still agree with iterate() byte for byte.
+
+        Only lines whose predecessor lies completely inside buf can be
+        judged; if none qualifies, the caller reads further back and asks
+        again.
+        """
+        sep = Note.LABEL_SEP.encode("utf-8")
+
+        def line_start(pos):
+            # offset in buf where the line containing buf[pos] begins, or
+            # None when that line might continue before the buffer
+            begin = Note._line_start(buf, 0, pos)
+            return begin if begin or base == 0 else None
+
+        def is_sync(begin):
+            # begin is the start of a line already known to be a separator;
+            # walk back over any run of separators to what precedes it
+            while begin:
+                prev = Note._line_before(buf, 0, begin)
+                if not prev and base:
+                    return False
+                text = buf[prev:begin].decode("utf-8").strip()
+                if text == "":
+                    return True
+                if text != Note.LABEL_SEP:
+                    return False
+                begin = prev
+            return base == 0
+
+        hit = buf.rfind(sep)
+        while hit >= 0:
+            begin = line_start(hit)
+            if begin is None:
+                return None
+            line = buf[begin : Note._line_end(buf, hit, len(buf))]
+            if line.decode("utf-8").strip() == Note.LABEL_SEP and is_sync(begin):
+                return base + begin
+            hit = buf.rfind(sep, 0, begin)
+        return None
+
+    @classmethod
+    def _records_reverse(cls, src, headers_only=False):
+        """Yield (start, end, lines) for every record in src, newest first.
+
+        Reads backwards from EOF in TAIL_BLOCK chunks.  Each time a sync
+        separator (see _sync_point()) turns up, the bytes from there to the
+        previous cut are parsed forward with _scan_blocks() and their records are
+        handed out in reverse.  Because a cut is only ever made where the
+        full-file parser would also see a clean boundary, the output is
+        exactly reversed(list(_records(src, headers_only))) — fault-tolerance quirks
+        included — while the work done is proportional to how far back the
+        caller reads, not to the size of the file.
+        """
+
+        with open(src, "rb") as file:
+            eof = hi = lo = file.seek(0, 2)
+            buf = b""
+            while hi > 0:
+                cut = cls._sync_point(buf, lo)
+                if cut is None and lo > 0:
+                    # no safe place to cut yet: read further back, doubling
+                    # the step so one huge record is still read in O(size)
+                    step = min(max(cls.TAIL_BLOCK, len(buf)), lo)
+                    lo -= step
+                    file.seek(lo)
+                    buf = file.read(step) + buf
+                    continue
+                if cut is None:
+                    cut = 0  # start of file: the parser always begins clean
+                segment = buf[cut - lo :]
+                buf = buf[: cut - lo]
+                stop = None if hi == eof else hi
+                records = list(cls._scan_blocks(segment, cut, stop, 0, headers_only))
+                yield from reversed(records)
+                hi = cut
+
+    @classmethod
+    def reverse_iterate(cls, src, headers_only=False):
+        """Yield every Note in the file, newest first.
+
+        The mirror image of iterate(): same records, same fault tolerance,
+        opposite order — but it starts at EOF, so asking for the last note
+        of a multi-gigabyte file costs about as much as reading that note.
+        The cat checks the warmest spot on the couch first.
+
+        headers_only works as it does for iterate().
+
+        Yields:
+            Note objects, one per valid record, last record first.
+        """
+        for _start, _end, note in cls._live_reverse(src, headers_only):
+            yield note if note is not None else Note(None)
+
+    @classmethod
+    def _live_reverse(cls, src, headers_only=False):
+        """Yield (start, end, note) for every visible record, newest first.
+
+        `note` is None for a record _load() rejects (iterate()'s phantom).
+        """
+        dead = set()
+        for start, end, record in cls._records_reverse(src, headers_only):
+            note = cls._load(record, (src, start, end) if headers_only else None)
+            if note is not None:
+                # walking backwards, a tombstone is always met before the
+                # notes it buries — no up-front search needed
+                if note.pwd == cls.TOMBSTONE_PWD:
+                    dead.add(note.now)
+                    continue
+                if note.now in dead:
+                    continue
+            yield start, end, note
+
+    @classmethod
+    def match(
+        cls,
+        src,
+        criteria,
+        logic="and",
+        time_only=False,
+        order="asc",
+        headers_only=False,
+        limit=None,
+    ):
+        """Yield notes from src that satisfy the given search criteria.
+
+        Criteria are expressed as (SearchType, value) tuples.  For
+        convenience a single tuple may be passed directly (without wrapping
+        it in a list) — this method normalises it automatically.
+
+        AND mode (default)
+        ──────────────────
+        A note is yielded only when it satisfies *every* criterion.  The
+        yield happens as soon as the running match count reaches len(criteria),
+        which means the generator is safe to partially consume (e.g. next()).
+
+        OR mode
+        ───────
+        A note is yielded as soon as *any single* criterion is satisfied,
+        then the inner loop breaks so the note is never yielded twice.
+
+        Empty criteria list always yields nothing — an explicit match
+        against nothing is treated as "no results", not "everything".
+
+        Falsy values (empty string, 0) are skipped and never increment the
+        match counter, EXCEPT for SearchType.ALL which always matches and
+        always increments regardless of its value.
+
+        Args:
+            src:       path to the note file.
+            criteria:  list of (SearchType, value) tuples, or a single tuple.
+            logic:     "and" (all must match) or "or" (any must match).
+            time_only: if True, yield note.now (int) instead of the Note object.
+            order:     "asc" walks the file from the top; "desc" walks it
+                       backwards from EOF (see reverse_iterate()), so
+                       stopping after the first few matches never touches
+                       the older bulk of the file.
+            headers_only: read only each record's headers (see iterate()).
+                       Implied by time_only; ignored when a MESSAGE,
+                       MESSAGE_I or REGEX criterion has to look at every
+                       body anyway.
+            limit:     stop after this many matches.  Reading stops with
+                       them, so order="desc", limit=5 reads the newest
+                       stretch of the file and nothing before it.
+
+        Yields:
+            Note objects (or int timestamps if time_only=True) in file order,
+            or in reverse file order when order="desc".
+        """
+        if isinstance(criteria, tuple):
+            criteria = [criteria]  # normalise bare tuple → single-element list
+
+        # indexed criteria (see _indexed()) seek straight to their records
+        # when a sidecar is available; every candidate still goes through
+        # filter() below
+        source = cls._indexed(src, criteria, logic, order)
+        if source is None:
+            headers_only = (headers_only or time_only) and not any(
+                s_type in (SearchType.MESSAGE, SearchType.MESSAGE_I, SearchType.REGEX)
+                for s_type, _s_text in criteria
+            )
+            # a limited scan stops early, a parallel one reads everything
+            wide = order == "asc" and criteria and limit is None
+            cuts = cls._cuts(src) if wide else None
+            if cuts:
+                yield from cls._parallel(
+                    src, cuts, criteria, logic, time_only, headers_only
+                )
+                return
+            if order == "desc":
+                source = cls.reverse_iterate(src, headers_only)
+            else:
+                source = cls.iterate(src, headers_only)
+        found = cls.filter(source, criteria, logic, time_only)
+        if limit is not None:
+            from itertools import islice
+
+            found = islice(found, limit)
+        yield from found
+
+    @classmethod
+    def stream(cls, src, criteria, logic="and", headers_only=False, after=None):
+        """Yield the notes of src matching criteria, holding on to none.
+
+        match() in file order, minus everything that trades memory for
+        speed: no sidecar index or snapshot (each is loaded whole), no
+        parallel scan (each piece comes back as a list).  One record is
+        parsed at a time and the mapped file is released behind the read
+        (see _records()), so memory stays flat however big the notefile is,
+        and the first match is out as soon as it has been read.
+
+        `after` is a pagination cursor, (timestamp, record start) of the
+        last note of the previous page as cursor() returns it: reading
+        seeks straight to that record and resumes right after it.  A
+        tombstone doesn't move the record, so the cursor holds even once
+        its note is removed; a cursor that no longer points at a record
+        with its timestamp (the file was compacted) raises ValueError.
+        """
+        for _start, inst in cls._stream(src, criteria, logic, headers_only, after):
+            yield inst
+
+    @classmethod
+    def _stream(cls, src, criteria, logic="and", headers_only=False, after=None):
+        """stream(), yielding (record start, note) pairs."""
+        if isinstance(criteria, tuple):
+            criteria = [criteria]
+        test = cls.compile(criteria, logic)
+        if test is None:
+            return
+        headers_only = headers_only and not any(
+            s_type in (SearchType.MESSAGE, SearchType.MESSAGE_I, SearchType.REGEX)
+            for s_type, _s_text in criteria
+        )
+        begin = 0 if after is None else after[1]
+        # a tombstone only ever buries notes before it
+        dead = cls._tombstones(src, begin, drop_behind=True)
+        records = cls._records(src, headers_only, begin, drop_behind=True)
+        if after is not None and not cls._at_cursor(next(records, None), after[0]):
+            raise ValueError(f"cursor {after[0]}@{after[1]} no longer fits {src}")
+        for start, end, record in records:
+            note = cls._load(record, (src, start, end) if headers_only else None)
+            if note is None:
+                note = Note(None)  # iterate()'s phantom, filtered like the rest
+            elif cls._buried(note, start, dead):
+                continue
+            if test(note):
+                yield start, note
+
+    @classmethod
+    def _at_cursor(cls, first, ts):
+        """True if the (start, end, record) read at a cursor is its record.
+
+        A record the parser rejects has no timestamp to check, so a cursor
+        left on one of iterate()'s phantoms is taken on its offset alone.
+        """
+        if first is None:
+            return False
+        note = cls._load(first[2])
+        return note is None or note.now == ts
+
+    @classmethod
+    def cursor(cls, src, text):
+        """Turn a `jot d --after` cursor into (timestamp, record start).
+
+        The footer prints cursors as "<timestamp>@<offset>", pointing at
+        one record however many notes share its second.  A bare
+        "<timestamp>" is looked up (one pass, the last record with it);
+        either raises ValueError when no such record is there.
+        """
+        ts, sep, start = str(text).partition("@")
+        ts = int(ts)
+        if sep:
+            start = int(start)
+            first = next(cls._records(src, True, start), None) if start >= 0 else None
+            if not cls._at_cursor(first, ts):
+                raise ValueError(f"cursor {text} no longer fits {src}")
+            return ts, start
+        found = None
+        for start, _end, record in cls._records(src, True, drop_behind=True):
+            if getattr(cls._load(record), "now", None) == ts:
+                found = start
+        if found is None:
+            raise ValueError(f"no note with timestamp {ts} in {src}")
+        return ts, found
+
+    @staticmethod
+    def filter(source, criteria, logic="and", time_only=False):
+        """Yield the notes from `source` that satisfy `criteria`.
+
+        The matching half of match(), for notes already in hand — a list
+        kept current with refresh(), say.  Arguments and results are exactly
+        as for match().
+        """
+        test = Note.compile(criteria, logic)
+        if test is None:
+            return
+        for inst in source:
+            if test(inst):
+                yield inst.now if time_only else inst
+
+    @staticmethod
+    def filter_many(source, queries, time_only=False):
+        """Answer many independent queries in one pass over `source`.
+
+        `queries` is a list of (criteria, logic) pairs, each what filter()
+        would take; the result is a list holding, for each query in turn,
+        the notes (or timestamps, with time_only) it matches, in source
+        order.  Every note is looked at once however many queries there are.
+
+        A query on one exact tag, directory or timestamp — what
+        ContextBundle terms and the per-word search tools ask — isn't even
+        tested one by one: those queries are filed under the value they
+        want, and each note just looks up its own tags, pwd and timestamp.
+        Anything else is compiled (see compile()) and tested per note.
+        """
+        keyed = {
+            SearchType.TAG: {},
+            SearchType.DIRECTORY: {},
+            SearchType.TIMESTAMP: {},
+        }
+        tested = []
+        for i, (criteria, logic) in enumerate(queries):
+            if isinstance(criteria, tuple):
+                criteria = [criteria]
+            if len(criteria) == 1 and criteria[0][0] in keyed and criteria[0][1]:
+                s_type, value = criteria[0]
+                keyed[s_type].setdefault(value, []).append(i)
+                continue
+            test = Note.compile(criteria, logic)
+            if test is not None:
+                tested.append((i, test))
+
+        results = [[] for _query in queries]
+        by_tag, by_pwd, by_now = keyed.values()
+        if not (by_tag or by_pwd or by_now or tested):
+            return results
+        for inst in source:
+            hits = set()
+            if by_tag:
+                for tag in set(inst.tag.split()):
+                    hits.update(by_tag.get(tag, ()))
+            hits.update(by_pwd.get(inst.pwd, ()))
+            hits.update(by_now.get(inst.now, ()))
+            hits.update(i for i, test in tested if test(inst))
+            for i in hits:
+                results[i].append(inst.now if time_only else inst)
+        return results
+
+    @classmethod
+    def match_many(cls, src, queries, time_only=False, headers_only=False):
+        """filter_many() over one read of the notefile at src.
+
+        The batch counterpart of match(): however many (criteria, logic)
+        queries are asked, src is read once.  Message bodies are skipped
+        when headers_only (or time_only) is set and no query needs them.
+        """
+        bodies = (SearchType.MESSAGE, SearchType.MESSAGE_I, SearchType.REGEX)
+        needs_body = any(
+            s_type in bodies
+            for criteria, _logic in queries
+            for s_type, _value in (
+                [criteria] if isinstance(criteria, tuple) else criteria
+            )
+        )
+        headers_only = (headers_only or time_only) and not needs_body
+        return cls.filter_many(cls.iterate(src, headers_only), queries, time_only)
+
+    @staticmethod
+    def compile(criteria, logic="and"):
+        """Turn a criteria list into a single test, note -> bool.
+
+        Does once, up front, all the work match() would otherwise repeat
+        for every note: needles are lowercased, tag and timestamp values
+        gathered into sets, and criteria of the same kind folded into one
+        check — two TAG criteria under OR become one set intersection.  The
+        checks then run cheapest first (QUERY_ORDER), so under AND a note
+        in the wrong directory is turned away before its message is ever
+        decoded.
+
+        The rules are the ones match() documents: ALL always counts, a
+        falsy value never does, and an empty criteria list matches nothing.
+        Returns None when no note can match at all — an empty list, an AND
+        with a falsy value, two different directories under AND — so
+        callers can skip the scan entirely.
+        """
+        if isinstance(criteria, tuple):
+            criteria = [criteria]
+        if not criteria:
+            return None
+
+        every = logic == "and"
+        wanted = {}
+        for s_type, s_text in criteria:
+            if s_type is SearchType.ALL:
+                if not every:
+                    return lambda inst: True
+            elif s_text and s_type in Note.QUERY_ORDER:
+                wanted.setdefault(s_type, []).append(s_text)
+            elif every:
+                return None  # can never count, so AND can never be met
+
+        if not wanted:
+            return (lambda inst: True) if every else None
+        checks = []
+        for s_type in Note.QUERY_ORDER:
+            if s_type in wanted:
+                check = Note._check(s_type, wanted[s_type], every)
+                if check is None:
+                    return None
+                checks.append(check)
+
+        if len(checks) == 1:
+            return checks[0]
+
+        def test(inst):
+            for check in checks:
+                if check(inst) is not every:
+                    return not every  # AND: first miss, OR: first hit
+            return every
+
+        return test
+
+    @staticmethod
+    def _check(s_type, values, every):
+        """compile() for the criteria of one SearchType; None if unmeetable."""
+        if s_type in (SearchType.TIMESTAMP, SearchType.DIRECTORY):
+            field = "now" if s_type is SearchType.TIMESTAMP else "pwd"
+            values = set(values)
+            if every and len(values) > 1:
+                return None  # one note can't be in two places at once
+            if len(values) == 1:
+                (value,) = values
+                return lambda inst: getattr(inst, field) == value
+            return lambda inst: getattr(inst, field) in values
+
+        if s_type is SearchType.TIME_RANGE:
+            spans = [
+                (float("-inf") if lo is None else lo, float("inf") if hi is None else hi)
+                for lo, hi in values
+            ]
+            if every:
+                # all of the ranges hold iff their overlap does
+                lo = max(lo for lo, _hi in spans)
+                hi = min(hi for _lo, hi in spans)
+                if lo >= hi:
+                    return None
+                spans = [(lo, hi)]
+            if len(spans) == 1:
+                ((lo, hi),) = spans
+                return lambda inst: lo <= inst.now < hi
+            return lambda inst: any(lo <= inst.now < hi for lo, hi in spans)
+
+        if s_type is SearchType.TREE:
+            if every:
+                # every prefix holds iff the longest one does, and it only
+                # can if it extends all the others
+                longest = max(values, key=len)
+                if not all(longest.startswith(p) for p in values):
+                    return None
+                return lambda inst: inst.pwd.startswith(longest)
+            prefixes = tuple(values)
+            return lambda inst: inst.pwd.startswith(prefixes)
+
+        if s_type is SearchType.TAG:
+            tags = set(values)
+            if len(tags) == 1:
+                (tag,) = tags
+                return lambda inst: tag in inst.tag.split()
+            if every:
+                return lambda inst: tags.issubset(inst.tag.split())
+            return lambda inst: not tags.isdisjoint(inst.tag.split())
+
+        if s_type is SearchType.REGEX:
+            import re
+
+            patterns = [re.compile(v) for v in set(values)]
+            combine = all if every else any
+            return lambda inst: combine(p.search(inst.message) for p in patterns)
+
+        # substring searches: CONTEXT, MESSAGE and their _I twins
+        field = "message"
+        if s_type in (SearchType.CONTEXT, SearchType.CONTEXT_I):
+            field = "context"
+        fold = s_type in (SearchType.CONTEXT_I, SearchType.MESSAGE_I)
+        needles = tuple({v.lower() if fold else v for v in values})
+        combine = all if every else any
+        if len(needles) == 1:
+            (needle,) = needles
+            if fold:
+                return lambda inst: needle in getattr(inst, field).lower()
+            return lambda inst: needle in getattr(inst, field)
+
+        def check(inst):
+            text = getattr(inst, field)
+            if fold:
+                text = text.lower()  # once per note, however many needles
+            return combine(needle in text for needle in needles)
+
+        return check
+
+    @classmethod
+    def _cuts(cls, src):
+        """Return the byte offsets a parallel scan of src splits at, or None.
+
+        None means "scan in this process": there is one worker, or src is
+        smaller than PARALLEL_MIN.  Otherwise the list runs from 0 to the
+        file size, with a cut near each 1/WORKERS of the way through.  Every
+        cut is a sync separator (see _sync_point()), where the parser's
+        state is clean no matter what came before — so parsing the pieces
+        separately gives exactly the records a single pass would.
+        """
+        import mmap
+        import os
+
+        size = os.stat(src).st_size
+        if cls.WORKERS < 2 or not size or size < cls.PARALLEL_MIN:
+            return None
+        cuts = [0]
+        with open(src, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                for i in range(1, cls.WORKERS):
+                    lo = max(size * i // cls.WORKERS, cuts[-1])
+                    hi, cut = lo, None
+                    while cut is None and hi < size:
+                        # the last sync separator in a growing window past lo
+                        hi = min(size, hi + max(cls.TAIL_BLOCK, hi - lo))
+                        cut = cls._sync_point(view[lo:hi], lo)
+                    if cut is not None and cut > cuts[-1]:
+                        cuts.append(cut)
+        cuts.append(size)
+        return cuts
+
+    @classmethod
+    def _parallel(cls, src, cuts, criteria, logic, time_only, headers_only):
+        """match() over the pieces between `cuts`, one worker process each.
+
+        Tombstones are found once up front and handed to every worker, so a
+        note buried by a tombstone in a later piece stays buried.  Results
+        are merged back in file order: the same notes, in the same order,
+        as a sequential scan.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        dead = cls._tombstones(src)
+        pieces = list(zip(cuts, cuts[1:]))
+        with ProcessPoolExecutor(min(cls.WORKERS, len(pieces))) as pool:
+            futures = [
+                pool.submit(
+                    cls._scan_piece,
+                    src,
+                    lo,
+                    hi,
+                    hi != cuts[-1],
+                    dead,
+                    criteria,
+                    logic,
+                    time_only,
+                    headers_only,
+                )
+                for lo, hi in pieces
+            ]
+            for future in futures:
+                yield from future.result()
+
+    @classmethod
+    def _scan_piece(
+        cls, src, lo, hi, cut, dead, criteria, logic, time_only, headers_only
+    ):
+        """Worker half of _parallel(): parse and filter src[lo:hi].
+
+        `cut` is True when hi is a sync separator rather than EOF.  Returns
+        a list, since the results travel back to the parent process.
+        """
+        import mmap
+
+        with open(src, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                data = view[lo:hi]
+        end = hi if cut else None
+
+        def notes():
+            for start, stop, record in cls._scan_blocks(
+                data, lo, end, 0, headers_only
+            ):
+                note = cls._load(record, (src, start, stop) if headers_only else None)
+                if note is None:
+                    yield Note(None)
+                elif not cls._buried(note, start, dead):
+                    yield note
+
+        return list(cls.filter(notes(), criteria, logic, time_only))
+
+    @classmethod
+    def _indexed(cls, src, criteria, logic, order="asc"):
+        """Return the candidate notes a sidecar index can supply, or None.
+
+        Each index answers some kinds of criteria (its ANSWERS): NoteIndex
+        timestamps and time ranges, TagIndex tags, DirIndex directories and subtrees,
+        TextIndex and TrigramIndex message and context searches (and
+        TrigramIndex regular expressions).  Under AND a single truthy
+        criterion an index answers pins the candidates; under OR the index
+        must answer every criterion, so the union is complete.  Timestamps
+        are tried first: they pin the fewest notes.  None means "scan the
+        file".
+        """
+        every = logic == "and"
+        for kind in (NoteIndex, TagIndex, DirIndex, TextIndex, TrigramIndex):
+            pinned = [(t, v) for t, v in criteria if t in kind.ANSWERS and v]
+            if not pinned:
+                continue
+            if not every and len(pinned) != len(criteria):
+                continue
+            index = kind.open(src)
+            if index is None:
+                continue
+            offsets = index.candidates(pinned, every)
+            if offsets is None:
+                continue  # nothing in there it can narrow down
+            if order == "desc":
+                offsets.reverse()
+            return index.notes(offsets)
+        return None
+
+    @classmethod
+    def census(cls, src, pwd):
+        """Return (the notes written in pwd, how many notes there are in all).
+
+        What the plain `jot` listing needs.  With a DirIndex only the notes
+        in pwd are read; the total comes from the index's own tables.
+        Without one, it is a single header-only pass over the file.
+        """
+        index = DirIndex.open(src)
+        if index is not None:
+            offsets = index.candidates([(SearchType.DIRECTORY, pwd)])
+            here = [n for n in index.notes(offsets) if n.pwd == pwd]
+            return here, index.total()
+        here, total = [], 0
+        for inst in cls.iterate(src, headers_only=True):
+            total += 1
+            if inst.pwd == pwd:
+                here.append(inst)
+        return here, total
+
+    @classmethod
+    def lookup(cls, src, timestamps):
+        """Yield every note whose timestamp is in `timestamps`, in file order.
+
+        Seeks straight to each record through the sidecar index when one is
+        available; otherwise falls back to a single scan with a set test, so
+        the cost never grows with the number of timestamps asked for.
+        """
+        timestamps = set(timestamps)
+        index = NoteIndex.open(src)
+        if index is not None:
+            yield from index.notes(index.lookup(timestamps))
+        else:
+            for inst in cls.iterate(src):
+                if inst.now in timestamps:
+                    yield inst
+
+    @staticmethod
+    def rank(source, terms, limit=None, test=None):
+        """Return the `limit` notes of `source` that best match `terms`.
+
+        Notes are scored with BM25 over RANK_FIELDS: a query word counts for
+        more the rarer it is across `source`, and for less the longer the
+        note it turns up in.  Words are the casefolded runs of word
+        characters, as TextIndex has them, and the terms are OR-ed.
+
+        By default a note is eligible once it holds any query word.  Pass
+        `test` (a note -> bool, Note.compile() makes one) to rank exactly
+        the notes it accepts instead, so a ranked search can keep the
+        matching rules of an unranked one; eligible notes without a query
+        word then tie at zero.  Ties go to the newer note.
+
+        One pass over `source` gathers the statistics; only eligible notes
+        are kept, and the best are picked with a heap of `limit` entries, so
+        the cost of ranking a thousand matches for ten results is a thousand
+        heap comparisons, never a sort.  limit=None ranks every eligible
+        note.  Returns a list, best first.
+        """
+        import heapq
+        from collections import Counter
+        from math import log
+
+        words = set().union(*map(TextIndex.words, terms)) if terms else set()
+        count, length, df, kept = 0, 0.0, Counter(), []
+        for inst in source:
+            tf, size = Counter(), 0.0
+            for field, weight in Note.RANK_FIELDS:
+                found = TextIndex.tokens(getattr(inst, field))
+                size += weight * len(found)
+                for word in found:
+                    if word in words:
+                        tf[word] += weight
+            count += 1
+            length += size
+            if test(inst) if test is not None else tf:
+                df.update(tf.keys())
+                kept.append((count, inst, tf, size))
+
+        if not kept or limit == 0:
+            return []
+        k1, b = Note.RANK_K1, Note.RANK_B
+        average = length / count or 1.0
+        idf = {w: log(1 + (count - n + 0.5) / (n + 0.5)) for w, n in df.items()}
+
+        def scored():
+            for seq, inst, tf, size in kept:
+                norm = k1 * (1 - b + b * size / average)
+                score = sum(idf[w] * f * (k1 + 1) / (f + norm) for w, f in tf.items())
+                yield score, seq, inst
+
+        if limit is None:
+            best = sorted(scored(), key=lambda e: e[:2], reverse=True)
+        else:
+            best = heapq.nlargest(limit, scored(), key=lambda e: e[:2])
+        return [inst for _score, _seq, inst in best]
+
+    @classmethod
+    def match_terms(cls, src, terms, every=False, fold=True):
+        """Yield (note, hits) for the notes whose message holds the terms.
+
+        Any one of `terms` will do, or with every=True all of them; hits
+        lists the terms found in that note, in the order given, so a batch
+        of log-derived notes can be sorted by the codes they mention.
+        fold=True compares ignoring case, as MESSAGE_I does, fold=False
+        exactly, as MESSAGE does.
+
+        Each message is read once for all the terms (see Automaton).  The
+        notes come from the same index MESSAGE_I/MESSAGE criteria would use,
+        when there is one, or from a full read otherwise.
+        """
+        machine = Automaton(terms, fold)
+        if not len(machine):
+            return
+        s_type = SearchType.MESSAGE_I if fold else SearchType.MESSAGE
+        criteria = [(s_type, term) for term in machine.terms]
+        source = cls._indexed(src, criteria, "and" if every else "or")
+        if source is None:
+            source = cls.iterate(src)
+        for inst in source:
+            hits = machine.hits(inst.message)
+            if hits and (not every or len(hits) == len(machine)):
+                yield inst, [machine.terms[i] for i in sorted(hits)]
+
+    @classmethod
+    def fuzzy(cls, src, term, reach=None):
+        """Yield the notes of src carrying a tag or message word near `term`.
+
+        "Near" is within `reach` edits (insert, delete or substitute one
+        character), ignoring case; by default the reach grows with the
+        term, from exact for two letters to two edits from six on (see
+        FuzzyIndex.reach).  So `kuberentes` finds notes tagged
+        `kubernetes`, and `kubernetes` those mentioning `Kubernetes`.  The
+        words come from the FuzzyIndex vocabulary, and the notes from an
+        ordinary OR match on them, checked word for word.
+        """
+        vocab = FuzzyIndex.vocabulary(src)
+        tags = set(vocab.expand([term], FuzzyIndex.TAG, reach))
+        words = set(vocab.expand([term], FuzzyIndex.WORD, reach))
+        criteria = [(SearchType.TAG, t) for t in tags]
+        criteria += [(SearchType.MESSAGE_I, w) for w in words]
+        for inst in cls.match(src, criteria, "or"):
+            if not tags.isdisjoint(inst.tag.split()) or not words.isdisjoint(
+                TextIndex.words(inst.message)
+            ):
+                yield inst
+
+
+class NoteTransaction(object):
+    """A batch of deletes, amendments and inserts applied to a notefile at once.
+
+    Obtained from Note.transaction(src) and used as a context manager.  The
+    queued changes are applied when the block exits without an exception;
+    if it raises, nothing is written and the notefile is left untouched.
+
+    How the batch lands depends on what it holds:
+
+      deletes/inserts only — every delete becomes a tombstone and every
+                             insert an ordinary append, in that order.  The
+                             notefile is never rewritten, so queuing 500
+                             deletes costs 500 small appends, not 500 copies
+                             of the file.
+      any amendment        — one streaming pass copies the file to <src>.new,
+                             dropping deleted notes, amending the rest on the
+                             fly and writing the inserts at the end, followed
+                             by a single Note.commit().  Existing tombstones
+                             are folded away along the way.
+
+    Inserts always land after the deletes, so a note re-filed under the
+    timestamp it replaces (as `jot sr` may do) survives its own delete.
+    """
+
+    def __init__(self, src):
+        self.src = src
+        self.deletes = {}  # timestamp -> None; a dict keeps queue order
+        self.amends = {}  # timestamp -> [(context, pwd, tag), ...]
+        self.inserts = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+
+    def delete(self, timestamp):
+        """Queue removal of every note stamped `timestamp`."""
+        self.deletes[int(timestamp)] = None
+
+    def amend(self, timestamp, context=None, pwd=None, tag=None):
+        """Queue a field change for every note stamped `timestamp`.
+
+        Fields follow Note.amend(): a truthy context or pwd replaces the
+        old value, and tag adds a word (or removes one, given "~word").
+        """
+        self.amends.setdefault(int(timestamp), []).append((context, pwd, tag))
+
+    def insert(self, note):
+        """Queue a Note to be appended after everything else is applied.
+
+        Raises:
+            ValueError: if note.message is empty, as Note.append() would.
+        """
+        if not note.message:
+            raise ValueError("Cannot append a note with an empty message")
+        self.inserts.append(note)
+
+    def commit(self):
+        """Apply and then forget every queued change (see the class docstring)."""
+        if self.amends:
+            self._rewrite()
+        else:
+            for timestamp in self.deletes:
+                Note.delete(self.src, timestamp, tombstone=True)
+            for note in self.inserts:
+                Note.append(self.src, note)
+        self.deletes, self.amends, self.inserts = {}, {}, []
+
+    def _rewrite(self):
+        """One pass over src into <src>.new, then a single Note.commit()."""
+        newpath = Note._shadow(self.src)
+        with open(newpath, "wt") as trunc_file:
+            for inst in Note.iterate(self.src):
+                if inst.now in self.deletes:
+                    continue
+                for context, pwd, tag in self.amends.get(inst.now, ()):
+                    if pwd:
+                        inst.pwd = pwd
+                    if tag:
+                        inst.tag = Note._retag(inst.tag, tag)
+                    if context:
+                        inst.context = context
+                trunc_file.write(f"{Note.LABEL_SEP}\n{Note._record_text(inst)}")
+            for note in self.inserts:
+                trunc_file.write(f"{Note.LABEL_SEP}\n{Note._record_text(note)}")
+        Note.commit(self.src)
+
+
+class Automaton(object):
+    """Aho-Corasick automaton: find which of many terms occur in a text.
+
+    Built once per query from the terms, then run over each message in a
+    single left-to-right pass, whatever the number of terms — `jot s --any`
+    with twenty error codes reads each message once, not twenty times.
+    Overlapping terms are all found ("he" and "she" in "ushers").
+
+      machine = Automaton(["E1001", "E2002", "timeout"], fold=True)
+      machine.hits("Request TIMEOUT after E2002")   # -> {1, 2}
+
+    The transitions are kept as a full DFA, {char: state} per state with the
+    failure links already folded in, so the scan is one dict lookup per
+    character.  Each state's output is a bitmask of the terms ending there.
+    With fold=True terms and text are lowercased, the way MESSAGE_I
+    compares.  Empty terms are dropped; terms keeps the rest, deduplicated,
+    in order.
+
+    The walk is Python, one step per character, while `needle in text` is
+    a C loop: on a real message it takes about a hundred terms before one
+    walk beats a hundred `in`s.  Below FAST_TERMS terms hits() asks `in`
+    for each instead, and the automaton is only built when it will be used.
+    """
+
+    FAST_TERMS = 100
+
+    def __init__(self, terms, fold=False):
+        self.fold = fold
+        self.terms = list(dict.fromkeys(t for t in terms if t))
+        self.needles = [t.lower() if fold else t for t in self.terms]
+        self.full = (1 << len(self.terms)) - 1
+        if len(self.terms) < self.FAST_TERMS:
+            return
+        delta, out = [{}], [0]
+        for i, needle in enumerate(self.needles):
+            state = 0
+            for ch in needle:
+                nxt = delta[state].get(ch)
+                if nxt is None:
+                    nxt = delta[state][ch] = len(delta)
+                    delta.append({})
+                    out.append(0)
+                state = nxt
+            out[state] |= 1 << i
+
+        # breadth first, so every failure target is complete before use
+        fail = [0] * len(delta)
+        queue = list(delta[0].values())
+        for state in queue:
+            for ch, nxt in list(delta[state].items()):
+                queue.append(nxt)
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                out[nxt] |= out[fail[nxt]]
+            for ch, target in delta[fail[state]].items():
+                delta[state].setdefault(ch, target)
+        self.delta, self.out = delta, out
+
+    def __len__(self):
+        return len(self.terms)
+
+    def hits(self, text):
+        """Return the set of indexes (into .terms) of every term in text."""
+        if self.fold:
+            text = text.lower()
+        if len(self.terms) < self.FAST_TERMS:
+            return {i for i, needle in enumerate(self.needles) if needle in text}
+        delta, out = self.delta, self.out
+        state, mask = 0, 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                mask |= out[state]
+                if mask == self.full:
+                    break  # every term found: nothing left to learn
+        return {i for i in range(len(self.terms)) if mask >> i & 1}
+
+
+class NoteQuery(object):
+    """A boolean query over note fields, planned and run against a notefile.
+
+      tag:prod AND (msg:timeout OR ctx:kubectl) AND NOT dir:/tmp/*
+
+    Terms are field:value, with the value in double quotes when it holds
+    spaces or parentheses (msg:"connection reset").  Terms combine with AND,
+    OR and NOT (upper case), grouped by parentheses; two terms side by side
+    mean AND, and a bare word is a message search.  The fields:
+
+      tag:word               TAG          tree:/path        TREE
+      msg: / message:        MESSAGE_I    ts: / now:1695..  TIMESTAMP
+      ctx: / context:        CONTEXT_I    ts:A..B           TIME_RANGE (A <= now < B)
+      dir: / pwd:/path       DIRECTORY    since:3d          TIME_RANGE (see `jot since`)
+      dir:/path/*            TREE         until:2026-10-01  TIME_RANGE
+      re: / regex:pattern    REGEX
+
+    The query is compiled into a plan, not interpreted.  Every branch of an
+    AND or OR is priced (COST: what a check costs, header fields cheapest,
+    message bodies dearest) and weighed by how many notes it lets through —
+    counted from a sidecar index when one answers the term, guessed from
+    PASS otherwise.  AND then tries first the branches that cost least per
+    note they turn away, OR those that cost least per note they settle, and
+    both stop at the first decisive answer.  NOT simply inverts.
+
+    Where sidecar indexes answer the terms, the plan also works out which
+    records can possibly match (intersecting under AND, uniting under OR)
+    and reads only those; a term no index answers, or any NOT, leaves that
+    branch to the scan.  Either way every note read goes through the plan.
+    Malformed queries raise ValueError.
+    """
+
+    FIELDS = {
+        "tag": SearchType.TAG,
+        "msg": SearchType.MESSAGE_I,
+        "message": SearchType.MESSAGE_I,
+        "ctx": SearchType.CONTEXT_I,
+        "context": SearchType.CONTEXT_I,
+        "dir": SearchType.DIRECTORY,
+        "pwd": SearchType.DIRECTORY,
+        "tree": SearchType.TREE,
+        "ts": SearchType.TIMESTAMP,
+        "now": SearchType.TIMESTAMP,
+        "since": SearchType.TIME_RANGE,
+        "until": SearchType.TIME_RANGE,
+        "re": SearchType.REGEX,
+        "regex": SearchType.REGEX,
+    }
+    # relative price of checking one note, and the share of notes a term is
+    # assumed to let through when no index can count them
+    COST = {
+        SearchType.TIMESTAMP: 1,
+        SearchType.TIME_RANGE: 1,
+        SearchType.DIRECTORY: 1,
+        SearchType.TREE: 1,
+        SearchType.TAG: 2,
+        SearchType.CONTEXT_I: 3,
+        SearchType.MESSAGE_I: 10,
+        SearchType.REGEX: 20,
+    }
+    PASS = {
+        SearchType.TIMESTAMP: 0.001,
+        SearchType.TIME_RANGE: 0.3,
+        SearchType.DIRECTORY: 0.1,
+        SearchType.TREE: 0.3,
+        SearchType.TAG: 0.05,
+        SearchType.CONTEXT_I: 0.1,
+        SearchType.MESSAGE_I: 0.1,
+        SearchType.REGEX: 0.1,
+    }
+    BODIES = (SearchType.MESSAGE_I, SearchType.REGEX)
+    INDEXES = ("NoteIndex", "TagIndex", "DirIndex", "TextIndex", "TrigramIndex")
+
+    def __init__(self, text):
+        self.text = text
+        self.relative = False  # a time bound resolved against the clock
+        self.tokens = self._tokenize(text)
+        self.tree = self._expr()
+        if self.tokens:
+            raise ValueError(f"unexpected '{self.tokens[0]}'")
+
+    # ── parsing ──────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _tokenize(text):
+        """Split a query into "(", ")" and term/keyword strings."""
+        import re
+
+        token = re.compile(r'\s*(\(|\)|(?:[^\s()"]|"(?:[^"\\]|\\.)*")+)')
+        tokens, pos = [], 0
+        text = text.rstrip()
+        while pos < len(text):
+            found = token.match(text, pos)
+            if found is None:
+                raise ValueError(f"unterminated quote in '{text[pos:].strip()}'")
+            tokens.append(found.group(1))
+            pos = found.end()
+        return tokens
+
+    def _expr(self):
+        branches = [self._conjunction()]
+        while self.tokens and self.tokens[0] == "OR":
+            self.tokens.pop(0)
+            branches.append(self._conjunction())
+        return branches[0] if len(branches) == 1 else ("or", branches)
+
+    def _conjunction(self):
+        branches = [self._unary()]
+        while self.tokens and self.tokens[0] not in ("OR", ")"):
+            if self.tokens[0] == "AND":
+                self.tokens.pop(0)
+            branches.append(self._unary())
+        return branches[0] if len(branches) == 1 else ("and", branches)
+
+    def _unary(self):
+        if not self.tokens:
+            raise ValueError("query ends where a term was expected")
+        token = self.tokens.pop(0)
+        if token == "NOT":
+            return ("not", self._unary())
+        if token == "(":
+            inner = self._expr()
+            if not self.tokens or self.tokens.pop(0) != ")":
+                raise ValueError("missing ')'")
+            return inner
+        if token in (")", "AND", "OR"):
+            raise ValueError(f"unexpected '{token}'")
+        return ("term", self._term(token))
+
+    def _term(self, token):
+        """Turn one field:value token into a (SearchType, value) criterion."""
+        import json
+
+        field, sep, value = token.partition(":")
+        if not sep or field.lower() not in self.FIELDS:
+            field, value = "msg", token
+        field = field.lower()
+        if value.startswith('"') and value.endswith('"') and len(value) > 1:
+            value = json.loads(value)
+        if not value:
+            raise ValueError(f"'{token}' has no value")
+
+        s_type = self.FIELDS[field]
+        if s_type is SearchType.DIRECTORY and value.endswith("*"):
+            return SearchType.TREE, value[:-1]
+        if s_type in (SearchType.TIMESTAMP, SearchType.TIME_RANGE):
+            bounds = value.split("..") if field in ("ts", "now") else [value]
+            self.relative |= any(_relative_when(b) for b in bounds if b)
+        if field == "since":
+            return s_type, (_parse_when(value), None)
+        if field == "until":
+            return s_type, (None, _parse_when(value))
+        if s_type is SearchType.TIMESTAMP:
+            if ".." in value:
+                lo, _dots, hi = value.partition("..")
+                bounds = [_parse_when(b) if b else None for b in (lo, hi)]
+                return SearchType.TIME_RANGE, tuple(bounds)
+            return s_type, _parse_when(value)
+        if s_type is SearchType.REGEX:
+            import re
+
+            try:
+                re.compile(value)
+            except re.error as err:
+                raise ValueError(f"bad pattern '{value}': {err}") from None
+        return s_type, value
+
+    def terms(self, node=None):
+        """Every (SearchType, value) criterion in the query."""
+        node = self.tree if node is None else node
+        if node[0] == "term":
+            return [node[1]]
+        if node[0] == "not":
+            return self.terms(node[1])
+        return [c for branch in node[1] for c in self.terms(branch)]
+
+    # ── planning ─────────────────────────────────────────────────────────────
+
+    def plan(self, src=None):
+        """Compile the query into (test, candidates).
+
+        test is note -> bool with the branches in their planned order;
+        candidates is the sorted record offsets that can match, with the
+        index that can read them, as (offsets, index) — or None when the
+        whole notefile has to be read.  Without src no index is consulted.
+        """
+        self._indexes = {}
+        self._src = src
+        test, _cost, _rate, offsets, _shape = self._compile(self.tree)
+        if offsets is None:
+            return test, None
+        index = next(i for i in self._indexes.values() if i is not None)
+        return test, (sorted(offsets), index)
+
+    def key(self):
+        """The QueryCache key for this query, or None to keep it uncached.
+
+        A relative bound (since:1h, until:today) was turned into an epoch
+        when the query was parsed, so the same text asks for something else
+        a moment later: neither its plan nor its results can be reused.
+        """
+        if self.relative:
+            return None
+        return ("query", self.explain())
+
+    def explain(self, src=None):
+        """The query as the plan will run it: branches in evaluation order."""
+        self._indexes = {}
+        self._src = src
+        return self._compile(self.tree)[4]
+
+    def _index_for(self, s_type):
+        """An open index answering s_type, or None (opened once per plan)."""
+        if self._src is None:
+            return None
+        for name in self.INDEXES:
+            kind = globals()[name]
+            if s_type in kind.ANSWERS:
+                if name not in self._indexes:
+                    self._indexes[name] = kind.open(self._src)
+                if self._indexes[name] is not None:
+                    return self._indexes[name]
+        return None
+
+    def _compile(self, node):
+        """Return (test, cost per note, share passing, offsets|None, shape)."""
+        kind = node[0]
+        if kind == "term":
+            s_type, value = node[1]
+            shape = f"{s_type.name.lower()}:{value!r}"
+            test = Note.compile([node[1]])
+            if test is None:
+                return (lambda inst: False), 0, 0.0, set(), shape
+            rate, offsets = self.PASS[s_type], None
+            index = self._index_for(s_type)
+            if index is not None:
+                found = index.candidates([node[1]], True)
+                if found is not None:
+                    offsets = set(found)
+                    rate = len(offsets) / max(len(index.data["spans"]), 1)
+            return test, self.COST[s_type], rate, offsets, shape
+
+        if kind == "not":
+            inner, cost, rate, _offsets, shape = self._compile(node[1])
+            return (lambda inst: not inner(inst)), cost, 1.0 - rate, None, f"NOT {shape}"
+
+        steps = [self._compile(branch) for branch in node[1]]
+        every = kind == "and"
+        if every:
+            # cheapest per note turned away first
+            steps.sort(key=lambda st: st[1] / max(1.0 - st[2], 1e-9))
+        else:
+            # cheapest per note let through first
+            steps.sort(key=lambda st: st[1] / max(st[2], 1e-9))
+        tests = [st[0] for st in steps]
+        cost, reach = 0.0, 1.0
+        for _test, c, rate, _offsets, _shape in steps:
+            cost += reach * c
+            reach *= rate if every else 1.0 - rate
+        rate = reach if every else 1.0 - reach
+
+        known = [st[3] for st in steps if st[3] is not None]
+        if every:
+            offsets = set.intersection(*known) if known else None
+        else:
+            offsets = set().union(*known) if len(known) == len(steps) else None
+
+        if every:
+
+            def test(inst):
+                for check in tests:
+                    if not check(inst):
+                        return False
+                return True
+
+        else:
+
+            def test(inst):
+                for check in tests:
+                    if check(inst):
+                        return True
+                return False
+
+        shape = f" {kind.upper()} ".join(st[4] for st in steps)
+        return test, cost, rate, offsets, f"({shape})"
+
+    def filter(self, source):
+        """Yield the notes of source (any iterable of Note) the query matches."""
+        test, _candidates = self.plan()
+        return (inst for inst in source if test(inst))
+
+    def run(self, src, time_only=False):
+        """Yield the notes of src matching the query, in file order."""
+        test, candidates = self.plan(src)
+        if candidates is not None:
+            offsets, index = candidates
+            source = index.notes(offsets)
+        else:
+            needs_body = any(t in self.BODIES for t, _v in self.terms())
+            source = Note.iterate(src, headers_only=time_only and not needs_body)
+        for inst in source:
+            if test(inst):
+                yield inst.now if time_only else inst
+
+
+class QueryCache(object):
+    """Results of recent queries, kept for the life of the process.
+
+    Long-lived readers ask the same things over and over: the MCP server
+    the same search_notes words and list_notes directories, GraphQL
+    dashboards the same notes query every few seconds.  Each repeat would
+    otherwise be a full scan (or a sidecar lookup plus hydration).  Entries
+    are keyed by notefile and key() — the criteria with their order,
+    duplicates and needle case normalised away, plus the logic — and hold
+    the matching notes as a list in file order.  Treat those lists as
+    read-only: every caller asking the same question shares one.
+
+    Every lookup first compares the notefile's identity (st_dev, st_ino,
+    st_size, st_mtime_ns) with what the cached results were read from.
+    When it still matches, a hit costs one stat().  When the notefile has
+    only grown, the records appended since are read once (from the mark
+    Note.mark() took, checked by Note._resume() as refresh() checks its
+    own) and only the entries they affect are touched: an entry gains the
+    new notes its test accepts and loses the notes new tombstones bury;
+    every other entry stays as it was.  Anything else — an amend, a
+    rewrite, compaction — drops that notefile's entries.
+
+    Entries are evicted least recently used first once their estimated
+    size passes `budget` bytes (CATJOT_QUERY_CACHE; 0 turns caching off).
+    stats() reports the hit and miss counters, for sizing it.
+    """
+
+    BUDGET = int(getenv("CATJOT_QUERY_CACHE", str(16 << 20)))
+    _SHARED = None
+
+    def __init__(self, budget=None):
+        from collections import OrderedDict
+
+        self.budget = self.BUDGET if budget is None else budget
+        self.entries = OrderedDict()  # (src, key) -> [notes, test, bytes]
+        self.files = {}  # src -> (identity, mark)
+        self.bytes = 0
+        self.hits = self.misses = self.patched = self.dropped = self.evicted = 0
+
+    @classmethod
+    def shared(cls):
+        """The process-wide cache the MCP, GraphQL and `jot llm` readers use."""
+        if cls._SHARED is None:
+            cls._SHARED = cls()
+        return cls._SHARED
+
+    @staticmethod
+    def key(criteria, logic="and"):
+        """A hashable form of (criteria, logic) equal for equivalent queries."""
+        if isinstance(criteria, tuple):
+            criteria = [criteria]
+        folded = set()
+        for s_type, value in criteria:
+            if s_type in (SearchType.CONTEXT_I, SearchType.MESSAGE_I) and value:
+                value = value.lower()
+            folded.add((s_type, value))
+        if len(folded) == 1:
+            logic = "and"  # one criterion means the same under either logic
+        return ("and" if logic == "and" else "or",) + tuple(
+            sorted(folded, key=lambda c: (c[0].value, repr(c[1])))
+        )
+
+    @staticmethod
+    def _identity(src):
+        import os
+
+        src_stat = os.stat(src)
+        return (
+            src_stat.st_dev,
+            src_stat.st_ino,
+            src_stat.st_size,
+            src_stat.st_mtime_ns,
+        )
+
+    @staticmethod
+    def _weigh(notes):
+        """Estimated bytes a result list keeps alive.
+
+        Sized from the record each note came from — the (src, start, end)
+        span of a header-only read, the raw body of a lazy one — never
+        through the message and context properties, which would decode the
+        body or read the record back from disk just to measure it.
+        """
+        size = 64
+        for inst in notes:
+            body = inst._body
+            if isinstance(body, tuple):
+                size += body[2] - body[1]
+            elif body is not None:
+                size += len(body)
+            else:
+                size += len(inst._message or "") + len(inst._context or "")
+            size += 160 + len(inst.tag or "") + len(inst.pwd or "")
+        return size
+
+    def _drop(self, src):
+        for cached in [k for k in self.entries if k[0] == src]:
+            self.bytes -= self.entries.pop(cached)[2]
+            self.dropped += 1
+
+    def _catch_up(self, src):
+        """Bring src's entries up to date; return its identity if stable."""
+        identity = self._identity(src)
+        known = self.files.get(src)
+        if known is not None and known[0] == identity:
+            return identity
+        if known is not None and any(k[0] == src for k in self.entries):
+            resume = Note._resume(src, known[1])
+            offset, dead = resume[0], resume[-1]
+            if offset:
+                reader = Note._iterate_from(src, False, resume)
+                added = []
+                while True:
+                    try:
+                        inst = next(reader)
+                    except StopIteration as done:
+                        mark = done.value
+                        break
+                    added.append(inst)
+                if self._identity(src) == identity:
+                    self._patch(src, added, dead)
+                    self.files[src] = (identity, mark)
+                    return identity
+            self._drop(src)
+        mark = Note.mark(src)
+        if self._identity(src) != identity:
+            self.files.pop(src, None)
+            self._drop(src)
+            return None  # written to while we looked: don't cache this time
+        self.files[src] = (identity, mark)
+        return identity
+
+    def _patch(self, src, added, dead):
+        """Apply appended notes and tombstones to src's affected entries."""
+        for cached, entry in self.entries.items():
+            if cached[0] != src:
+                continue
+            notes, test = entry[0], entry[1]
+            fresh = [inst for inst in added if test(inst)]
+            if dead and any(inst.now in dead for inst in notes):
+                notes = [inst for inst in notes if inst.now not in dead]
+            elif not fresh:
+                continue
+            # a new list: callers may still hold the old one
+            entry[0] = notes + fresh
+            size = self._weigh(entry[0])
+            self.bytes += size - entry[2]
+            entry[2] = size
+            self.patched += 1
+        self._evict()
+
+    def _store(self, src, key, notes, test):
+        size = self._weigh(notes)
+        if size > self.budget:
+            return
+        self.entries[(src, key)] = [notes, test, size]
+        self.bytes += size
+        self._evict()
+
+    def _evict(self):
+        while self.bytes > self.budget and self.entries:
+            _cached, entry = self.entries.popitem(last=False)
+            self.bytes -= entry[2]
+            self.evicted += 1
+
+    def lookup(self, src, key, test, compute):
+        """Return the cached notes under key, or compute() and cache them.
+
+        `test` is the note -> bool the entry's results satisfy (appended
+        notes are run through it); `compute` returns them for src as it
+        stands, in file order.  A key of None means "don't cache": the
+        notes are computed every time.
+        """
+        if self.budget <= 0 or key is None:
+            return list(compute())
+        identity = self._catch_up(src)
+        entry = self.entries.get((src, key))
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end((src, key))
+            return entry[0]
+        self.misses += 1
+        notes = list(compute())
+        if identity is not None and self._identity(src) == identity:
+            self._store(src, key, notes, test)
+        return notes
+
+    def match(self, src, criteria, logic="and", source=None):
+        """Note.match(src, criteria, logic) as a list, through the cache.
+
+        `source`, when given, is a callable returning the notes of src to
+        filter on a miss (e.g. Note.current) instead of reading the file.
+        """
+        test = Note.compile(criteria, logic)
+        if test is None:
+            return []
+
+        def compute():
+            if source is not None:
+                return Note.filter(source(), criteria, logic)
+            return Note.match(src, criteria, logic)
+
+        return self.lookup(src, self.key(criteria, logic), test, compute)
+
+    def match_many(self, src, queries, source=None):
+        """match() for many (criteria, logic) queries; misses share one pass."""
+        if self.budget <= 0:
+            if source is not None:
+                return Note.filter_many(source(), queries)
+            return Note.match_many(src, queries)
+        identity = self._catch_up(src)
+        found, missing = [], []
+        for n, (criteria, logic) in enumerate(queries):
+            entry = self.entries.get((src, self.key(criteria, logic)))
+            if entry is not None:
+                self.hits += 1
+                self.entries.move_to_end((src, self.key(criteria, logic)))
+                found.append(entry[0])
+            else:
+                self.misses += 1
+                found.append(None)
+                missing.append(n)
+        if missing:
+            asked = [queries[n] for n in missing]
+            if source is not None:
+                answers = Note.filter_many(source(), asked)
+            else:
+                answers = Note.match_many(src, asked)
+            stable = identity is not None and self._identity(src) == identity
+            for n, notes in zip(missing, answers):
+                found[n] = notes
+                test = Note.compile(*queries[n])
+                if stable and test is not None:
+                    self._store(src, self.key(*queries[n]), notes, test)
+        return found
+
+    def stats(self):
+        """Counters for sizing the cache: hits, misses and what it holds."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "patched": self.patched,
+            "dropped": self.dropped,
+            "evicted": self.evicted,
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "budget": self.budget,
+        }
+
+    def clear(self):
+        """Forget every entry (the counters are kept)."""
+        self.entries.clear()
+        self.files.clear()
+        self.bytes = 0
+
+
+# ── Sidecar indexes ──────────────────────────────────────────────────────────
+#
+# A sidecar is a derived file kept beside the notefile (<notefile><SUFFIX>)
+# that lets a query seek straight to the records it needs instead of parsing
+# the whole notefile.  The notefile stays the single source of truth: every
+# sidecar can be rebuilt from it at any time, and is rebuilt automatically
+# whenever it no longer describes the notefile byte-for-byte.
+
+
+class _Sidecar(object):
+    """Base class for persistent, self-validating notefile sidecars.
+
+    On disk a sidecar is a stream of marshal objects: one snapshot header
+
+      (MAGIC, VERSION, st_dev, st_ino, covered_bytes, payload_bytes)
+
+    then the payload, marshalled on its own in `payload_bytes` bytes (so it
+    is read with a single marshal.loads(), many times faster than letting
+    marshal.load() pull a big object out of a file piece by piece), then
+    zero or more deltas appended by Note.append():
+
+      ("+", start, end, value)   — the record at [start, end) was appended
+      ("=", cut, size, values)   — the file was truncated at `cut` and refilled
+                                   up to `size` (Note.amend's tail splice);
+                                   values is [(start, end, value), ...] for
+                                   the records now in that tail
+
+    A sidecar is trusted only when its deltas chain contiguously from the
+    snapshot, the chain ends exactly at the notefile's current size, the
+    inode matches, and the sidecar is no older than the notefile.  Anything
+    else — an edit in $EDITOR, a commit swapping in a new file, a crash
+    between writing a note and its delta — makes it stale, and it is rebuilt
+    from a single scan on next use.
+
+    Subclasses set SUFFIX and implement empty(), value(), add() and drop().
+    One whose value() needs nothing past the Context: line sets HEADERS_ONLY
+    so rebuild() can skip the message bodies.
+    """
+
+    MAGIC = "catjot-sidecar"
+    VERSION = 4
+    SUFFIX = None
+    HEADERS_ONLY = False
+
+    # Set CATJOT_INDEX=0 to never read, build or maintain sidecars.
+    ENABLED = getenv("CATJOT_INDEX", "1") != "0"
+    # Below this size a missing sidecar is not worth building: a scan of a
+    # small notefile is faster than loading any index.
+    MIN_BYTES = int(getenv("CATJOT_INDEX_MIN", str(1 << 20)))
+    # Fold the delta chain back into a fresh snapshot once it gets this long.
+    MAX_DELTAS = 256
+    # Each appended record starts right after its "^-^" separator line.
+    SEP_BYTES = len(f"{Note.LABEL_SEP}\n".encode("utf-8"))
+
+    def __init__(self, src):
+        self.src = src
+        self.path = src + self.SUFFIX
+        self.data = self.empty()
+        self.covered = 0
+
+    # ── subclass hooks ───────────────────────────────────────────────────────
+
+    def empty(self):
+        """Return the payload of a sidecar describing an empty notefile."""
+        raise NotImplementedError
+
+    def value(self, note):
+        """Reduce a loaded record (see Note._load) to what this sidecar stores."""
+        raise NotImplementedError
+
+    def add(self, start, end, value):
+        """Fold one record's value() into self.data.
+
+        `value` is None for a record Note._load() rejects — the phantom
+        Note.iterate() yields as Note(None) — so sidecars that mirror the
+        parse can keep its place; the rest just ignore it.
+        """
+        raise NotImplementedError
+
+    def drop(self, cut):
+        """Forget every record starting at or after byte offset `cut`."""
+        raise NotImplementedError
+
+    # ── lifecycle ────────────────────────────────────────────────────────────
+
+    @classmethod
+    def kinds(cls):
+        """Every concrete sidecar type, in the order they are maintained."""
+        return [
+            NoteIndex,
+            TagIndex,
+            DirIndex,
+            TextIndex,
+            TrigramIndex,
+            FuzzyIndex,
+            NoteCache,
+        ]
+
+    @staticmethod
+    def stamp(src):
+        """Return src's mtime in ns, or None when it doesn't exist yet."""
+        import os
+
+        try:
+            return os.stat(src).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def open(cls, src):
+        """Return a fresh sidecar for src, building it if needed, or None.
+
+        None means "no index here, scan instead": sidecars are disabled, or
+        the notefile is below MIN_BYTES and no sidecar was ever built for it.
+        Raises FileNotFoundError when src itself is missing, exactly as a
+        scan would.
+        """
+        import os
+
+        if not cls.ENABLED:
+            return None
+        size = os.stat(src).st_size
+        sidecar = cls(src)
+        if not os.path.exists(sidecar.path) and size < cls.MIN_BYTES:
+            return None
+        if not sidecar.load():
+            sidecar.rebuild()
+        return sidecar
+
+    def load(self):
+        """Read the snapshot and deltas from disk; True only if still fresh."""
+        import marshal
+        import os
+
+        try:
+            src_stat = os.stat(self.src)
+            with open(self.path, "rb") as file:
+                if os.fstat(file.fileno()).st_mtime_ns < src_stat.st_mtime_ns:
+                    return False  # notefile written behind our back
+                magic, version, dev, ino, covered, length = marshal.load(file)
+                if (magic, version) != (self.MAGIC, self.VERSION):
+                    return False
+                if (dev, ino) != (src_stat.st_dev, src_stat.st_ino):
+                    return False
+                self.data = marshal.loads(file.read(length))
+                deltas = 0
+                while True:
+                    try:
+                        op, start, end, value = marshal.load(file)
+                    except EOFError:
+                        break
+                    if op == "=" and start <= covered:
+                        self.drop(start)
+                        for record in value:
+                            self.add(*record)
+                    elif op != "+" or start != covered + self.SEP_BYTES:
+                        return False  # a write never reached this sidecar
+                    else:
+                        self.add(start, end, value)
+                    covered = end
+                    deltas += 1
+        except (OSError, EOFError, ValueError, TypeError):
+            return False
+
+        if covered != src_stat.st_size:
+            return False
+        self.covered = covered
+        if deltas > self.MAX_DELTAS:
+            self.save(src_stat)
+        return True
+
+    def rebuild(self):
+        """Re-derive the payload from one full scan of the notefile and save it."""
+        import os
+
+        # stat first: if the file grows mid-scan the snapshot under-claims
+        # its coverage and is simply rebuilt again on the next open()
+        src_stat = os.stat(self.src)
+        self.data = self.empty()
+        light = self.HEADERS_ONLY
+        for start, end, record in Note._records(self.src, light):
+            note = Note._load(record, (self.src, start, end) if light else None)
+            self.add(start, end, None if note is None else self.value(note))
+        self.save(src_stat)
+
+    def save(self, src_stat):
+        """Atomically replace the on-disk sidecar with a snapshot of self.
+
+        `src_stat` is the notefile's os.stat() as of the data being saved.
+        """
+        import marshal
+        import os
+
+        tmp = self.path + ".tmp"
+        payload = marshal.dumps(self.data)
+        with open(tmp, "wb") as file:
+            marshal.dump(
+                (
+                    self.MAGIC,
+                    self.VERSION,
+                    src_stat.st_dev,
+                    src_stat.st_ino,
+                    src_stat.st_size,
+                    len(payload),
+                ),
+                file,
+            )
+            file.write(payload)
+        os.replace(tmp, self.path)
+        self.covered = src_stat.st_size
+
+    @classmethod
+    def appended(cls, src, stamp, start, end, body):
+        """Record a just-appended note in every sidecar that exists for src.
+
+        `stamp` is src's mtime from *before* the append: a sidecar older than
+        that already missed a write, so it gets no delta and stays stale.
+        The delta is a single small append — the sidecar is never read here.
+        """
+        import marshal
+        import os
+
+        if not cls.ENABLED:
+            return
+        note = None
+        for kind in cls.kinds():
+            path = src + kind.SUFFIX
+            try:
+                if os.stat(path).st_mtime_ns < (stamp or 0):
+                    continue
+            except FileNotFoundError:
+                continue
+            if note is None:
+                if not cls._lands_cleanly(src, start, body):
+                    return
+                note = Note._load(Note._split_lines(body))
+                if note is None:
+                    return
+            with open(path, "ab") as file:
+                marshal.dump(("+", start, end, kind(src).value(note)), file)
+
+    @classmethod
+    def _lands_cleanly(cls, src, start, body):
+        """True if `body`, appended at `start`, parses as exactly one record.
+
+        A delta only describes the file if the new "^-^" line really is a
+        boundary — the line before it blank, or nothing before it at all —
+        and the message doesn't smuggle in a boundary of its own.  When in
+        doubt the answer is False: no delta is written, the sidecar goes
+        stale and is rebuilt from a scan on next use.
+        """
+        records = list(Note._scan(Note._lines_in(body, 0, start)))
+        if [r[:2] for r in records] != [(start, start + len(body))]:
+            return False
+        sep = start - cls.SEP_BYTES
+        if sep == 0:
+            return True
+        with open(src, "rb") as file:
+            lo = max(0, sep - 4096)
+            file.seek(lo)
+            before = file.read(sep - lo)
+        if not before.endswith(b"\n"):
+            return False
+        prev = before.rfind(b"\n", 0, len(before) - 1) + 1
+        if prev == 0 and lo > 0:
+            return False  # that line runs on past what was read
+        return before[prev:].decode("utf-8", "replace").strip() == ""
+
+    @classmethod
+    def rewritten(cls, src, stamp, cut, tail):
+        """Record that src was truncated at `cut` and `tail` written after it.
+
+        Same freshness rule as appended(): sidecars older than `stamp` are
+        left stale.  The tail starts right after a record boundary, so its
+        records are parsed on their own — nothing before `cut` is read.
+        """
+        import marshal
+        import os
+
+        if not cls.ENABLED:
+            return
+        records = None
+        for kind in cls.kinds():
+            path = src + kind.SUFFIX
+            try:
+                if os.stat(path).st_mtime_ns < (stamp or 0):
+                    continue
+            except FileNotFoundError:
+                continue
+            if records is None:
+                records = []
+                for start, end, lines in Note._scan(Note._lines_in(tail, 0, cut)):
+                    records.append((start, end, Note._load(lines)))
+            sidecar = kind(src)
+            values = [
+                (s, e, None if n is None else sidecar.value(n)) for s, e, n in records
+            ]
+            with open(path, "ab") as file:
+                marshal.dump(("=", cut, cut + len(tail), values), file)
+
+    @classmethod
+    def discard(cls, src):
+        """Remove every sidecar of src (after a commit swapped the file).
+
+        Rebuilding them all here would cost a scan plus the indexing work
+        of each, most of it for indexes nothing may ask for again soon;
+        open() rebuilds just the one it is asked for instead (as long as
+        src is still MIN_BYTES or more).
+        """
+        import os
+
+        for kind in cls.kinds():
+            try:
+                os.remove(src + kind.SUFFIX)
+            except FileNotFoundError:
+                pass
+
 
-        Writes one complete record — separator, all four header fields, and
-        the message body — in a single open/write/close cycle.  The file is
-        opened in append mode ("at") so concurrent writers don't clobber each
-        other's notes (though concurrent *deletes* are not safe).
+class NoteIndex(_Sidecar):
+    """Sidecar mapping each note's timestamp to its record's byte span.
 
-        Args:
-            src:  path to the .catjot file (created if it doesn't exist).
-            note: a Note object; its message must be non-empty.
+    Stored as <notefile>.idx.  With it, `jot ts`, `jot r`, `jot pl <ts>` and
+    the MCP get_note tool read one record instead of parsing the whole file:
 
-        Raises:
-            ValueError: if note.message is falsy (empty string).
-        """
-        if not note.message:
-            raise ValueError("Cannot append a note with an empty message")
+      index = NoteIndex.open(NOTEFILE)      # None → just scan instead
+      for note in index.notes(index.lookup([1694747662])):
+          print(note)
 
-        # tag and context each occupy a single line in the record format;
-        # collapse any embedded newlines defensively so a Note built outside
-        # of Note.jot() (e.g. directly from a dict) can't desync the parser.
-        with open(src, "at") as file:
-            file.write(f"{Note.LABEL_SEP}\n")
-            file.write(f"{Note.LABEL_PWD}{note.pwd}\n")
-            file.write(f"{Note.LABEL_NOW}{note.now}\n")
-            file.write(f"{Note.LABEL_TAG}{Note._single_line(note.tag)}\n")
-            file.write(f"{Note.LABEL_CTX}{Note._single_line(note.context)}\n")
-            file.write(f"{Note.LABEL_ARG}{note.message}\n\n")
+    The payload is {"spans": {start: end}, "now": {timestamp: [start, ...]},
+    "order": [timestamp, ...], "dead": {timestamp: start}}; several notes
+    may share a timestamp, so each maps to a list of spans.  "order" is the
+    distinct timestamps sorted, so a TIME_RANGE bisects straight to its
+    first and last timestamp: O(log n + k), however out of order the notes
+    were written — `jot newsr` schedules reviews in the future, and
+    Note.jot(now=...) can backdate.  "dead" holds the offset of the last
+    tombstone for a timestamp: lookups drop every span before it, exactly
+    as Note.iterate() hides the notes a tombstone buries.
+    """
 
-    @classmethod
-    def delete(cls, src, timestamp):
-        """Write a shadow copy of the note file with matching notes omitted.
+    SUFFIX = ".idx"
+    HEADERS_ONLY = True
+    # the SearchTypes candidates() can pin down (see Note._indexed())
+    ANSWERS = (SearchType.TIMESTAMP, SearchType.TIME_RANGE)
 
-        Does NOT modify src in place.  Instead it creates <src>.new containing
-        every note whose timestamp does NOT equal `timestamp`.  Call
-        Note.commit(src) afterward to atomically replace src with the new file
-        and keep a backup at <src>.old.
+    def empty(self):
+        return {"spans": {}, "now": {}, "order": [], "dead": {}}
 
-        If multiple notes share the same timestamp (unusual but possible if
-        notes are constructed with an explicit `now` value) all of them will be
-        omitted — timestamp is the only identity key the format provides.
+    def value(self, note):
+        return note.now, note.pwd == Note.TOMBSTONE_PWD
 
-        Args:
-            src:       path to the source note file.
-            timestamp: int epoch value of the note(s) to remove.
+    def add(self, start, end, value):
+        if value is None:
+            return
+        now, tombstone = value
+        if tombstone:
+            self.data["dead"][now] = start
+            return
+        self.data["spans"][start] = end
+        by_now = self.data["now"]
+        if now not in by_now:
+            by_now[now] = []
+            order = self.data["order"]
+            if order and order[-1] > now:
+                from bisect import insort
+
+                insort(order, now)
+            else:
+                order.append(now)
+        by_now[now].append(start)
+
+    def drop(self, cut):
+        spans = self.data["spans"]
+        for start in [s for s in spans if s >= cut]:
+            del spans[start]
+        by_now = self.data["now"]
+        for now in list(by_now):
+            kept = [s for s in by_now[now] if s < cut]
+            if kept:
+                by_now[now] = kept
+            else:
+                del by_now[now]
+        if len(by_now) != len(self.data["order"]):
+            self.data["order"] = [now for now in self.data["order"] if now in by_now]
+        dead = self.data["dead"]
+        for now in [n for n, s in dead.items() if s >= cut]:
+            del dead[now]
+
+    def candidates(self, pinned, every=True):
+        """Offsets of the notes that could meet the (SearchType, value) criteria.
+
+        Under AND (`every`) the notes must meet them all, otherwise any one.
+        None means the index can't narrow these criteria down at all, or
+        that a time range takes in most of the file.
         """
-        newpath = src + ".new"
-        with open(newpath, "wt") as trunc_file:
-            for inst in cls.iterate(src):
-                if int(inst.now) != int(timestamp):
-                    trunc_file.write(f"{Note.LABEL_SEP}\n")
-                    trunc_file.write(f"{Note.LABEL_PWD}{inst.pwd}\n")
-                    trunc_file.write(f"{Note.LABEL_NOW}{inst.now}\n")
-                    trunc_file.write(f"{Note.LABEL_TAG}{inst.tag}\n")
-                    trunc_file.write(f"{Note.LABEL_CTX}{inst.context}\n")
-                    trunc_file.write(f"{Note.LABEL_ARG}{inst.message}\n\n")
+        found = None
+        for s_type, value in pinned:
+            if s_type is SearchType.TIME_RANGE:
+                offsets = set(self.lookup(self.between(*value)))
+            else:
+                offsets = set(self.lookup([value]))
+            if found is None:
+                found = offsets
+            elif every:
+                found &= offsets
+            else:
+                found |= offsets
+        wide = len(found) * 2 > len(self.data["spans"])
+        if wide and any(t is SearchType.TIME_RANGE for t, _v in pinned):
+            return None  # a wide range: one pass beats a seek per note
+        return sorted(found)
+
+    def between(self, since=None, until=None):
+        """The distinct timestamps t with since <= t < until, by bisection."""
+        from bisect import bisect_left
+
+        order = self.data["order"]
+        lo = 0 if since is None else bisect_left(order, since)
+        hi = len(order) if until is None else bisect_left(order, until)
+        return order[lo:hi]
+
+    def buried(self):
+        """Return the offsets of every note a tombstone hides."""
+        by_now = self.data["now"]
+        return {
+            start
+            for now, grave in self.data["dead"].items()
+            for start in by_now.get(now, ())
+            if start < grave
+        }
 
-    @classmethod
-    def amend(cls, src, context=None, pwd=None, tag=None):
-        """Rewrite the *last* note in the file with updated field values.
+    def lookup(self, timestamps):
+        """Return the sorted record offsets of every live note in `timestamps`."""
+        by_now = self.data["now"]
+        dead = self.data["dead"]
+        offsets = set()
+        for ts in timestamps:
+            grave = dead.get(ts, -1)
+            offsets.update(start for start in by_now.get(ts, ()) if start > grave)
+        return sorted(offsets)
+
+    def notes(self, offsets):
+        """Yield a Note for each record offset, reading only those records."""
+        spans = self.data["spans"]
+        with open(self.src, "rb") as file:
+            for start in offsets:
+                file.seek(start)
+                record = Note._split_lines(file.read(spans[start] - start))
+                note = Note._load(record)
+                yield note if note is not None else Note(None)
+
+
+class TagIndex(NoteIndex):
+    """Sidecar mapping each tag word to the records that carry it.
+
+    Stored as <notefile>.tags.  `jot t <tag>`, `jot convo continue` and any
+    match() on TAG criteria read just the tagged records instead of the
+    whole notefile — a roleplay chain reloading its one tag every turn no
+    longer pays for every other note ever jotted:
+
+      index = TagIndex.open(NOTEFILE)       # None → just scan instead
+      for note in index.notes(index.tagged(["project1"])):
+          print(note)
+
+    A NoteIndex with one more table: the payload adds "tags", {word:
+    [start, ...]}, and keeps NoteIndex's spans, timestamps and tombstones
+    so buried notes drop out of a lookup the same way.
+    """
 
-        Like delete(), this is a two-phase operation: it produces <src>.new and
-        requires a subsequent Note.commit() call to finalise.  All notes other
-        than the last are copied verbatim; the last note gets whichever fields
-        are provided as non-None arguments.
+    SUFFIX = ".tags"
+    ANSWERS = (SearchType.TAG,)
 
-        Tag handling is additive by default — passing tag="new_label" appends
-        to the existing tag string rather than replacing it.  To *remove* a
-        tag, prefix it with "~": tag="~old_label" strips "old_label" from
-        the existing tags.
+    def empty(self):
+        return dict(super().empty(), tags={})
 
-        Args:
-            src:     path to the source note file.
-            context: new context string for the last note, or None to keep
-                     the existing value.
-            pwd:     new directory path for the last note, or None to keep
-                     the existing value.
-            tag:     tag to add (plain string) or remove ("~tagname"), or None
-                     to leave the tag field untouched.
+    def value(self, note):
+        return note.now, note.pwd == Note.TOMBSTONE_PWD, note.tag
+
+    def add(self, start, end, value):
+        if value is None:
+            return
+        now, tombstone, tag = value
+        super().add(start, end, (now, tombstone))
+        if not tombstone:
+            for word in set(tag.split()):
+                self.data["tags"].setdefault(word, []).append(start)
+
+    def drop(self, cut):
+        super().drop(cut)
+        by_tag = self.data["tags"]
+        for word in list(by_tag):
+            kept = [s for s in by_tag[word] if s < cut]
+            if kept:
+                by_tag[word] = kept
+            else:
+                del by_tag[word]
+
+    def tagged(self, tags, every=False):
+        """Return the sorted offsets of live notes with all (or any) of `tags`.
+
+        `every` asks for notes carrying every tag word, as TAG criteria do
+        under AND; otherwise any one of them will do.
         """
-        last_record = None
-        for inst in cls.iterate(src):
-            last_record = inst
+        by_tag = self.data["tags"]
+        found = None
+        for tag in set(tags):
+            starts = set(by_tag.get(tag, ()))
+            if found is None:
+                found = starts
+            elif every:
+                found &= starts
+            else:
+                found |= starts
+        return sorted(found - self.buried())
 
-        newpath = src + ".new"
-        with open(newpath, "wt") as trunc_file:
-            for inst in cls.iterate(src):
-                trunc_file.write(f"{Note.LABEL_SEP}\n")
+    def candidates(self, pinned, every=True):
+        return self.tagged([v for _t, v in pinned], every)
 
-                if pwd and int(inst.now) == int(last_record.now):
-                    # new pwd provided and this is the matching record time
-                    trunc_file.write(f"{Note.LABEL_PWD}{pwd}\n")
-                else:
-                    trunc_file.write(f"{Note.LABEL_PWD}{inst.pwd}\n")
 
-                trunc_file.write(f"{Note.LABEL_NOW}{inst.now}\n")
+class DirIndex(NoteIndex):
+    """Sidecar mapping each directory to the notes written there.
 
-                if tag and int(inst.now) == int(last_record.now):
-                    all_tags = inst.tag.split(" ")
-                    if tag.startswith("~"):
-                        try:
-                            all_tags.remove(tag[1:])
-                        except ValueError:
-                            pass  # don't care if its not in there
-                    else:
-                        if tag not in all_tags:
-                            all_tags.append(tag)
-                    tag_str = " ".join(all_tags)
-                    trunc_file.write(f"{Note.LABEL_TAG}{tag_str}\n")
-                else:
-                    trunc_file.write(f"{Note.LABEL_TAG}{inst.tag}\n")
+    Stored as <notefile>.dirs.  The plain `jot` listing reads only the
+    notes of the current directory and takes its "N total notes" footer
+    from the index's tables, and DIRECTORY and TREE criteria (GraphQL
+    pwd and pwdtree, `jot l`, `jot stray`'s callers, ...) read only the
+    notes under the paths asked for — a project directory lists at once,
+    however many notes were jotted everywhere else.
 
-                if context and int(inst.now) == int(last_record.now):
-                    # new contxt provided and this is the matching record time
-                    trunc_file.write(f"{Note.LABEL_CTX}{context}\n")
-                else:
-                    trunc_file.write(f"{Note.LABEL_CTX}{inst.context}\n")
+    The payload adds "dirs", {pwd: [start, ...]}, and "phantoms", the
+    offsets of records the parser rejects (iterate()'s Note(None), which
+    claims whatever directory it is read from), to NoteIndex's tables.
+    A subtree is the run of sorted directories sharing the prefix, found
+    by bisection — TREE is a plain string prefix, so "/story" also takes
+    in "/storybook", exactly as the scan does.
+    """
+
+    SUFFIX = ".dirs"
+    ANSWERS = (SearchType.DIRECTORY, SearchType.TREE)
+
+    def empty(self):
+        return dict(super().empty(), dirs={}, phantoms=[])
+
+    def value(self, note):
+        return note.now, note.pwd == Note.TOMBSTONE_PWD, note.pwd
+
+    def add(self, start, end, value):
+        if value is None:
+            self.data["phantoms"].append(start)
+            self.data["spans"][start] = end
+            return
+        now, tombstone, pwd = value
+        super().add(start, end, (now, tombstone))
+        if not tombstone:
+            self.data["dirs"].setdefault(pwd, []).append(start)
+
+    def drop(self, cut):
+        super().drop(cut)
+        by_dir = self.data["dirs"]
+        for pwd in list(by_dir):
+            kept = [s for s in by_dir[pwd] if s < cut]
+            if kept:
+                by_dir[pwd] = kept
+            else:
+                del by_dir[pwd]
+        phantoms = self.data["phantoms"]
+        while phantoms and phantoms[-1] >= cut:
+            phantoms.pop()
+
+    def under(self, prefix):
+        """Return every indexed directory starting with `prefix`, sorted."""
+        from bisect import bisect_left
+
+        dirs = sorted(self.data["dirs"])
+        found = []
+        for pwd in dirs[bisect_left(dirs, prefix) :]:
+            if not pwd.startswith(prefix):
+                break
+            found.append(pwd)
+        return found
+
+    def candidates(self, pinned, every=True):
+        by_dir = self.data["dirs"]
+        found = None
+        for s_type, path in pinned:
+            paths = [path] if s_type is SearchType.DIRECTORY else self.under(path)
+            starts = {s for pwd in paths for s in by_dir.get(pwd, ())}
+            if found is None:
+                found = starts
+            elif every:
+                found &= starts
+            else:
+                found |= starts
+        # a phantom's directory is wherever it's read from: let the filter
+        # decide, as the scan would
+        found = (found - self.buried()).union(self.data["phantoms"])
+        return sorted(found)
+
+    def total(self):
+        """How many notes Note.iterate() would yield, phantoms included."""
+        return len(self.data["spans"]) - len(self.buried())
+
+
+class TextIndex(NoteIndex):
+    """Sidecar of word postings for message and context searches.
+
+    Stored as <notefile>.words.  `jot s`, `jot m` and the GraphQL message
+    and context arguments read only the notes that could hold what they
+    look for, instead of lowercasing every message in the file.  Set
+    CATJOT_FULLTEXT=0 to do without it.
+
+    The payload adds "message" and "context" to NoteIndex's tables, each
+    {word: [start, ...]}, where the words are the runs of word characters
+    in the casefolded field.  The searches keep their substring semantics:
+    each word-character run of the (casefolded) needle must sit inside one
+    word of a matching note, so the candidates are the notes holding, for
+    each run, some word that contains it — "cat" finds "concatenate".  A word-level
+    needle narrows the search to a handful of notes; one with no word
+    characters at all ("^-^", say) isn't narrowed, and is left to the scan.
+    Either way every candidate still goes through the ordinary filter.
+    """
 
-                trunc_file.write(f"{Note.LABEL_ARG}{inst.message}\n\n")
+    SUFFIX = ".words"
+    HEADERS_ONLY = False
+    ANSWERS = (
+        SearchType.MESSAGE,
+        SearchType.MESSAGE_I,
+        SearchType.CONTEXT,
+        SearchType.CONTEXT_I,
+    )
+    USE = getenv("CATJOT_FULLTEXT", "1") != "0"
 
     @classmethod
-    def pop(cls, src, path):
-        """Delete the most recently written note for a given directory.
+    def open(cls, src):
+        if not cls.USE:
+            return None
+        return super().open(src)
 
-        Iterates every note that matches the exact directory path and tracks
-        the last one seen.  After the loop completes, that final timestamp is
-        passed to Note.delete() to produce the <src>.new shadow file.
+    @staticmethod
+    def words(text):
+        """The distinct words a field is indexed under (or a needle needs)."""
+        import re
 
-        Still requires Note.commit(src) to apply the deletion.
+        return set(re.findall(r"\w+", text.casefold()))
 
-        Args:
-            src:  path to the note file.
-            path: exact directory string to match (SearchType.DIRECTORY).
+    @staticmethod
+    def tokens(text):
+        """Every word of a field, repeats included, as rank() counts them."""
+        import re
 
-        Raises:
-            TypeError: if no notes are found for `path` (last_record stays
-                       None and delete(src, None) will raise).
-        """
-        last_record = None
-        for inst in Note.match(src, [(SearchType.DIRECTORY, path)]):
-            last_record = inst.now
-        cls.delete(src, last_record)
+        return re.findall(r"\w+", text.casefold())
 
-    @classmethod
-    def commit(cls, src):
-        """Atomically replace the note file with the pending shadow copy.
+    def empty(self):
+        return dict(super().empty(), message={}, context={})
 
-        The two-step rename sequence is:
-          1. src        → src.old   (previous version kept as one-step backup)
-          2. src.new    → src       (shadow copy becomes the live file)
+    def value(self, note):
+        tombstone = note.pwd == Note.TOMBSTONE_PWD
+        if tombstone:
+            return note.now, tombstone, [], []
+        return (
+            note.now,
+            tombstone,
+            sorted(self.words(note.message)),
+            sorted(self.words(note.context)),
+        )
 
-        Always pair this with a prior Note.delete(), Note.amend(), or
-        Note.pop() call that produced the src.new file.  Calling commit()
-        without a preceding write-phase will raise FileNotFoundError because
-        src.new won't exist — the cat doesn't like committing to nothing.
-        """
-        import shutil
+    def add(self, start, end, value):
+        if value is None:
+            return
+        now, tombstone, message, context = value
+        super().add(start, end, (now, tombstone))
+        for field, words in (("message", message), ("context", context)):
+            postings = self.data[field]
+            for word in words:
+                postings.setdefault(word, []).append(start)
+
+    def drop(self, cut):
+        super().drop(cut)
+        for field in ("message", "context"):
+            postings = self.data[field]
+            for word in list(postings):
+                kept = [s for s in postings[word] if s < cut]
+                if kept:
+                    postings[word] = kept
+                else:
+                    del postings[word]
+
+    def candidates(self, pinned, every=True):
+        found = None
+        for s_type, needle in pinned:
+            field = "message"
+            if s_type in (SearchType.CONTEXT, SearchType.CONTEXT_I):
+                field = "context"
+            if s_type in (SearchType.MESSAGE_I, SearchType.CONTEXT_I):
+                needle = needle.lower()
+            runs = self.words(needle)
+            if not runs:
+                if every:
+                    continue  # leave it to the filter
+                return None
+            postings = self.data[field]
+            starts = None
+            for run in runs:
+                hits = {s for word in postings if run in word for s in postings[word]}
+                starts = hits if starts is None else starts & hits
+            if found is None:
+                found = starts
+            elif every:
+                found &= starts
+            else:
+                found |= starts
+        if found is None:
+            return None
+        if len(found) * 2 > len(self.data["spans"]):
+            return None  # common words: one pass beats a seek per note
+        return sorted(found - self.buried())
+
+
+class TrigramIndex(NoteIndex):
+    """Sidecar of three-character postings for substring and regex searches.
+
+    Stored as <notefile>.tri, and only once CATJOT_TRIGRAM=1 asks for it:
+    it costs several times what TextIndex does to build.  It answers what
+    a word index can't narrow — needles that are all punctuation, phrases
+    across word boundaries, and `jot re` patterns — by intersecting the
+    postings of every trigram the needle holds.  A regex contributes the
+    runs of plain characters it can't match without (see literals()).
+
+    The payload adds "grams", {trigram: postings}, to NoteIndex's tables,
+    over the casefolded message and context of each note — one table for
+    both fields, a superset for either.  Postings are kept packed as
+    native 8-byte integers, so loading the sidecar doesn't rebuild millions
+    of int objects; a list only turns up for the few trigrams a query or a
+    delta touches.  As everywhere else, the filter has the final word.
+    """
 
-        shutil.move(src, src + ".old")
-        shutil.move(src + ".new", src)
+    SUFFIX = ".tri"
+    HEADERS_ONLY = False
+    ANSWERS = TextIndex.ANSWERS + (SearchType.REGEX,)
+    USE = getenv("CATJOT_TRIGRAM", "0") == "1"
+    TYPECODE = "q"
 
     @classmethod
-    def iterate(cls, src):
-        """Yield every Note in the file, in order of appearance.
-
-        This is the foundation of all read operations.  Note.match() calls
-        this generator and filters its output; nothing else should need to
-        open the note file directly.
+    def open(cls, src):
+        if not cls.USE:
+            return None
+        return super().open(src)
 
-        The parser recognises a record boundary as a blank line immediately
-        followed by a "^-^" line (LABEL_SEP).  Records do not need a trailing
-        separator at the end of the file — the final record is flushed when
-        EOF is reached.
+    @staticmethod
+    def grams(text):
+        """The distinct trigrams of casefolded text."""
+        text = text.casefold()
+        return {text[i : i + 3] for i in range(len(text) - 2)}
 
-        Fault tolerance
-        ───────────────
-        If the first line of a new record doesn't look like a Directory:
-        header (which happens when a raw "^-^" separator ends up inside a
-        previous note's message body, e.g. from `cat file.jot | jot`), the
-        malformed fragment is silently discarded so it doesn't poison the
-        rest of the file.  Parsing resumes at the next valid record boundary.
+    @staticmethod
+    def literals(pattern):
+        """Return strings every match of regex `pattern` must contain.
 
-        Yields:
-            Note objects, one per valid record.
+        The runs of literal characters in the pattern's top-level sequence:
+        anything else (a class, a repeat, a group, an alternation) ends a
+        run.  Nothing at all for a case-insensitive pattern, whose letters
+        may match characters that casefold differently.
         """
+        import re
 
-        def parse(record):
-            """Convert a list of raw lines into a Note-constructor dict.
+        try:
+            from re import _parser as sre_parse
+        except ImportError:  # Python < 3.11
+            import sre_parse
+
+        parsed = sre_parse.parse(pattern)
+        if parsed.state.flags & re.IGNORECASE:
+            return []
+        runs, run = [], []
+        for op, av in parsed:
+            if op is sre_parse.LITERAL:
+                run.append(chr(av))
+                continue
+            if run:
+                runs.append("".join(run))
+            run = []
+        if run:
+            runs.append("".join(run))
+        return runs
+
+    def empty(self):
+        return dict(super().empty(), grams={})
+
+    def value(self, note):
+        tombstone = note.pwd == Note.TOMBSTONE_PWD
+        if tombstone:
+            return note.now, tombstone, []
+        return note.now, tombstone, sorted(self.grams(f"{note.message}\n{note.context}"))
+
+    def _postings(self, gram):
+        """The offsets of notes holding `gram`, unpacked into a list."""
+        from array import array
+
+        postings = self.data["grams"].get(gram, [])
+        if isinstance(postings, bytes):
+            postings = array(self.TYPECODE, postings).tolist()
+        return postings
+
+    def add(self, start, end, value):
+        if value is None:
+            return
+        now, tombstone, grams = value
+        super().add(start, end, (now, tombstone))
+        table = self.data["grams"]
+        for gram in grams:
+            postings = table.get(gram)
+            if not isinstance(postings, list):
+                postings = table[gram] = self._postings(gram)
+            postings.append(start)
+
+    def drop(self, cut):
+        from array import array
+
+        super().drop(cut)
+        table = self.data["grams"]
+        size = array(self.TYPECODE).itemsize
+        for gram in list(table):
+            postings = table[gram]
+            if isinstance(postings, bytes):
+                postings = array(self.TYPECODE, postings[-size:])
+            if postings[-1] < cut:
+                continue  # offsets ascend: nothing here reaches the cut
+            kept = [s for s in self._postings(gram) if s < cut]
+            if kept:
+                table[gram] = kept
+            else:
+                del table[gram]
+
+    def save(self, src_stat):
+        from array import array
+
+        table = self.data["grams"]
+        for gram, postings in table.items():
+            if isinstance(postings, list):
+                table[gram] = array(self.TYPECODE, postings).tobytes()
+        super().save(src_stat)
+
+    def candidates(self, pinned, every=True):
+        found = None
+        for s_type, needle in pinned:
+            if s_type is SearchType.REGEX:
+                runs = self.literals(needle)
+            elif s_type in (SearchType.MESSAGE_I, SearchType.CONTEXT_I):
+                runs = [needle.lower()]
+            else:
+                runs = [needle]
+            grams = set().union(*(self.grams(run) for run in runs))
+            if not grams:
+                if every:
+                    continue  # leave it to the filter
+                return None
+            table = self.data["grams"]
+            starts = None
+            # rarest first, so the intersection shrinks as fast as it can
+            for gram in sorted(grams, key=lambda g: len(table.get(g, ""))):
+                hits = set(self._postings(gram))
+                starts = hits if starts is None else starts & hits
+                if not starts:
+                    break
+            if found is None:
+                found = starts
+            elif every:
+                found &= starts
+            else:
+                found |= starts
+        if found is None:
+            return None
+        if len(found) * 2 > len(self.data["spans"]):
+            return None  # common text: one pass beats a seek per note
+        return sorted(found - self.buried())
+
+
+class FuzzyIndex(_Sidecar):
+    """Sidecar vocabulary of tag and message words, for typo-tolerant search.
+
+    Stored as <notefile>.vocab, and built the first time `jot ft` or a fuzzy
+    search_notes call needs it.  near() finds the words within a few edits
+    of a term without measuring the distance to every word there is: each
+    word is filed under the bigrams of "^word$", and a word within k edits
+    of the term must share all but 2k of the term's distinct bigrams (one
+    edit spoils at most two), so only words passing that count — and a
+    length check — have their distance measured.  Terms too short to pass
+    the count narrow by length alone.
+
+    The payload is {"words": [word, ...], "kind": [bits, ...], "grams":
+    {bigram: [word id, ...]}, "lengths": {length: [word id, ...]}}, where
+    bit TAG marks a tag (kept as written; tags are case-sensitive) and bit
+    WORD a casefolded message word.  The vocabulary only ever grows: words
+    of a popped or amended note linger, and simply find no notes when
+    expanded.
+    """
 
-            Pops lines from the front of `record` in FIELDS_TO_PARSE order,
-            strips the field label prefix, and accumulates the remainder as
-            the message body.  Returns None (implicitly) if the header lines
-            don't match the expected labels, causing the caller to skip the
-            malformed record silently.
+    SUFFIX = ".vocab"
+    TAG = 1
+    WORD = 2
 
-            Args:
-                record: list of raw file lines for one record (mutable;
-                        lines are pop(0)'ed during parsing).
+    def empty(self):
+        return {"words": [], "kind": [], "grams": {}, "lengths": {}}
 
-            Returns:
-                dict suitable for Note(**d), or None on parse failure.
-            """
-            current_read = {}
-            for field, label in cls.FIELDS_TO_PARSE:  # enforce header ordering
-                try:
-                    current_read[field] = record.pop(0).split(label, 1)[1].strip()
-                except IndexError:
-                    break  # header line missing or out of order — skip record
-            else:
-                # `for…else` fires only when the loop completed without a break,
-                # meaning all four header fields were parsed successfully.
-                message = "".join(record).rstrip() + "\n"
-                current_read["message"] = message
-                return current_read
+    def value(self, note):
+        if note.pwd == Note.TOMBSTONE_PWD:
+            return None
+        return sorted(set(note.tag.split())), sorted(TextIndex.words(note.message))
 
-        current_record = []
-        last_line = ""
+    @staticmethod
+    def grams(word):
+        """The distinct bigrams of a casefolded word, ends marked."""
+        word = f"^{word.casefold()}$"
+        return {word[i : i + 2] for i in range(len(word) - 1)}
 
-        with open(src, "r") as file:
-            for line in file:
-                if last_line == "" and line.strip() == Note.LABEL_SEP:
-                    # Blank line + separator = end of previous record.
-                    # Flush whatever we accumulated and start fresh.
-                    if len(current_record):
-                        yield Note(parse(current_record))
-                    current_record = []
-                else:
-                    if current_record and Note.LABEL_PWD not in current_record[0]:
-                        # We're mid-record but the first line doesn't look like
-                        # a Directory: header — a separator landed inside the
-                        # previous note's data.  Drop this fragment silently
-                        # and wait for the next valid record boundary.
-                        current_record = []
-                        last_line = ""
-                        continue
-
-                    current_record.append(line)
-                    last_line = line.strip()
-            # End of file: no trailing separator, so flush the last record
-            # manually if one is in progress.
-            if last_line == "" and len(current_record):
-                yield Note(parse(current_record))
+    @staticmethod
+    def distance(a, b, reach):
+        """Levenshtein distance of a and b, or reach + 1 once it is beyond reach."""
+        if abs(len(a) - len(b)) > reach:
+            return reach + 1
+        row = list(range(len(b) + 1))
+        for i, ca in enumerate(a, 1):
+            prev, row[0] = row[0], i
+            for j, cb in enumerate(b, 1):
+                prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (ca != cb))
+            if min(row) > reach:
+                return reach + 1
+        return row[-1]
+
+    @staticmethod
+    def reach(term):
+        """How many edits a term of this length tolerates by default."""
+        return 0 if len(term) < 3 else 1 if len(term) < 6 else 2
+
+    def _ids(self):
+        """{word: id} for the payload in hand, rebuilt whenever it is replaced."""
+        words = self.data["words"]
+        if getattr(self, "_ids_of", None) is not words:
+            self._ids_of, self._id_map = words, {w: i for i, w in enumerate(words)}
+        return self._id_map
+
+    def add(self, start, end, value):
+        if value is None:
+            return
+        ids = self._ids()
+        tags, words = value
+        for bit, entries in ((self.TAG, tags), (self.WORD, words)):
+            for word in entries:
+                i = ids.get(word)
+                if i is None:
+                    i = ids[word] = len(self.data["words"])
+                    self.data["words"].append(word)
+                    self.data["kind"].append(0)
+                    for gram in self.grams(word):
+                        self.data["grams"].setdefault(gram, []).append(i)
+                    self.data["lengths"].setdefault(len(word), []).append(i)
+                self.data["kind"][i] |= bit
+
+    def drop(self, cut):
+        pass  # see the class docstring: stale words are harmless
+
+    def near(self, term, reach=None, kind=TAG | WORD):
+        """Return [(word, distance)] for words of `kind` within `reach` edits.
+
+        Closest first.  Distances are between casefolded words, so a tag
+        differing from the term only in case is at distance 0.
+        """
+        from collections import Counter
+
+        folded = term.casefold()
+        if reach is None:
+            reach = self.reach(folded)
+        words, kinds = self.data["words"], self.data["kind"]
+        grams = self.grams(folded)
+        need = len(grams) - 2 * reach
+        lengths = range(len(folded) - reach, len(folded) + reach + 1)
+        if need > 0:
+            shared = Counter()
+            for gram in grams:
+                shared.update(self.data["grams"].get(gram, ()))
+            ids = [i for i, n in shared.items() if n >= need]
+        else:
+            ids = [i for n in lengths for i in self.data["lengths"].get(n, ())]
+        found = []
+        for i in ids:
+            if kinds[i] & kind and len(words[i]) in lengths:
+                gap = self.distance(folded, words[i].casefold(), reach)
+                if gap <= reach:
+                    found.append((words[i], gap))
+        return sorted(found, key=lambda wd: (wd[1], wd[0]))
+
+    def expand(self, terms, kind=TAG | WORD, reach=None):
+        """Every word of `kind` near any of `terms`, closest first, once each."""
+        found = {}
+        for term in terms:
+            for word, gap in self.near(term, reach, kind):
+                found[word] = min(gap, found.get(word, gap))
+        return sorted(found, key=lambda w: (found[w], w))
 
     @classmethod
-    def match(cls, src, criteria, logic="and", time_only=False):
-        """Yield notes from src that satisfy the given search criteria.
+    def vocabulary(cls, src):
+        """The vocabulary of src: the sidecar, or one gathered by a scan.
 
-        Criteria are expressed as (SearchType, value) tuples.  For
-        convenience a single tuple may be passed directly (without wrapping
-        it in a list) — this method normalises it automatically.
+        A notefile too small for sidecars is simply read through once.
+        Raises FileNotFoundError when src is missing.
+        """
+        vocab = cls.open(src)
+        if vocab is None:
+            vocab = cls(src)
+            vocab.data = vocab.empty()
+            for inst in Note.iterate(src):
+                vocab.add(0, 0, vocab.value(inst))
+        return vocab
+
+
+class NoteCache(_Sidecar):
+    """Sidecar holding every record already parsed, for full reads.
+
+    Stored as <notefile>.cache.  Note.iterate() loads it with one
+    marshal.load() instead of splitting, decoding and stripping every line
+    of the notefile, so `jot`, `jot d`, tag listings and the searches over
+    a big, rarely-edited notefile skip the parser entirely.  It follows
+    the usual sidecar rules: trusted only while inode, size and mtime still
+    match, extended in place by Note.append and amend, rebuilt from one
+    scan otherwise.
+
+    Optional, and off unless CATJOT_CACHE=1: loading it holds every message
+    of the file in memory at once, where a parse streams them, and building
+    it writes a second copy of the notefile from a read.  Header-only reads
+    (see Note.iterate()) skip it either way.
+
+    The payload is {"records": [(start, end, fields), ...]} in file order,
+    where fields is (pwd, now, tag, context, message) or None for a record
+    the parser drops.  Tombstones are kept like any other record and
+    applied when the notes are handed out, exactly as iterate() would.
+    """
 
-        AND mode (default)
-        ──────────────────
-        A note is yielded only when it satisfies *every* criterion.  The
-        yield happens as soon as the running match count reaches len(criteria),
-        which means the generator is safe to partially consume (e.g. next()).
+    SUFFIX = ".cache"
+    USE = getenv("CATJOT_CACHE", "0") == "1"
 
-        OR mode
-        ───────
-        A note is yielded as soon as *any single* criterion is satisfied,
-        then the inner loop breaks so the note is never yielded twice.
+    @classmethod
+    def open(cls, src):
+        if not cls.USE:
+            return None
+        return super().open(src)
 
-        Empty criteria list always yields nothing — an explicit match
-        against nothing is treated as "no results", not "everything".
+    def empty(self):
+        return {"records": []}
 
-        Falsy values (empty string, 0) are skipped and never increment the
-        match counter, EXCEPT for SearchType.ALL which always matches and
-        always increments regardless of its value.
+    def value(self, note):
+        return note.pwd, note.now, note.tag, note.context, note.message
 
-        Args:
-            src:       path to the note file.
-            criteria:  list of (SearchType, value) tuples, or a single tuple.
-            logic:     "and" (all must match) or "or" (any must match).
-            time_only: if True, yield note.now (int) instead of the Note object.
+    def add(self, start, end, value):
+        self.data["records"].append((start, end, value))
 
-        Yields:
-            Note objects (or int timestamps if time_only=True) in file order.
-        """
-        if isinstance(criteria, tuple):
-            criteria = [criteria]  # normalise bare tuple → single-element list
+    def drop(self, cut):
+        records = self.data["records"]
+        while records and records[-1][0] >= cut:
+            records.pop()
 
-        if logic == "and":
-            for inst in cls.iterate(src):
-                CRITERIA_MET = 0
-                for s_type, s_text in criteria:
-                    if s_type is SearchType.ALL:
-                        CRITERIA_MET += 1  # ALL, match all
-                    elif not s_text:
-                        pass  # no matching, no incrementing
-                    elif s_type is SearchType.DIRECTORY:
-                        CRITERIA_MET += 1 if inst.pwd == s_text else 0
-                    elif s_type is SearchType.TREE:
-                        CRITERIA_MET += 1 if inst.pwd.startswith(s_text) else 0
-                    elif s_type is SearchType.MESSAGE:
-                        CRITERIA_MET += 1 if s_text in inst.message else 0
-                    elif s_type is SearchType.MESSAGE_I:
-                        CRITERIA_MET += (
-                            1 if s_text.lower() in inst.message.lower() else 0
-                        )
-                    elif s_type is SearchType.CONTEXT:
-                        CRITERIA_MET += 1 if s_text in inst.context else 0
-                    elif s_type is SearchType.CONTEXT_I:
-                        CRITERIA_MET += (
-                            1 if s_text.lower() in inst.context.lower() else 0
-                        )
-                    elif s_type is SearchType.TIMESTAMP:
-                        CRITERIA_MET += 1 if inst.now == s_text else 0
-                    elif s_type is SearchType.TAG:
-                        CRITERIA_MET += 1 if s_text in inst.tag.split() else 0
-
-                    if CRITERIA_MET == len(criteria):
-                        if time_only:
-                            yield inst.now
-                        else:
-                            yield inst
-        else:
-            for inst in cls.iterate(src):
-                CRITERIA_MET = 0
-                for s_type, s_text in criteria:
-                    if s_type is SearchType.ALL:
-                        CRITERIA_MET += 1
-                    elif not s_text:
-                        pass  # no matching, no incrementing
-                    elif s_type is SearchType.DIRECTORY:
-                        CRITERIA_MET += 1 if inst.pwd == s_text else 0
-                    elif s_type is SearchType.TREE:
-                        CRITERIA_MET += 1 if inst.pwd.startswith(s_text) else 0
-                    elif s_type is SearchType.MESSAGE:
-                        CRITERIA_MET += 1 if s_text in inst.message else 0
-                    elif s_type is SearchType.MESSAGE_I:
-                        CRITERIA_MET += (
-                            1 if s_text.lower() in inst.message.lower() else 0
-                        )
-                    elif s_type is SearchType.CONTEXT:
-                        CRITERIA_MET += 1 if s_text in inst.context else 0
-                    elif s_type is SearchType.CONTEXT_I:
-                        CRITERIA_MET += (
-                            1 if s_text.lower() in inst.context.lower() else 0
-                        )
-                    elif s_type is SearchType.TIMESTAMP:
-                        CRITERIA_MET += 1 if inst.now == s_text else 0
-                    elif s_type is SearchType.TAG:
-                        CRITERIA_MET += 1 if s_text in inst.tag.split() else 0
-
-                    if CRITERIA_MET:
-                        if time_only:
-                            yield inst.now
-                        else:
-                            yield inst
-                        break
+    def notes(self):
+        """Yield the Notes Note.iterate() would, straight from the snapshot.
+
+        Returns (stop, flushed, live, live_now) for Note.iterate()'s mark.  The
+        snapshot holds closed records only, so when something follows the
+        last of them the mark falls back to offset 0.
+        """
+        records = self.data["records"]
+        live, live_now = 0, None
+        dead = {}
+        for start, _end, fields in records:
+            if fields is not None and fields[0] == Note.TOMBSTONE_PWD:
+                dead[fields[1]] = start
+        for start, _end, fields in records:
+            if fields is None:
+                yield Note(None)
+            elif not dead or (
+                fields[0] != Note.TOMBSTONE_PWD and start >= dead.get(fields[1], -1)
+            ):
+                note = Note.__new__(Note)
+                note.pwd, note.now, note.tag, note._context, note._message = fields
+                note._body = None
+                yield note
+            else:
+                continue
+            live, live_now = start, fields and fields[1]
+        if records and records[-1][1] == self.covered:
+            return self.covered, True, live, live_now
+        return 0, False, 0, None
 
 
 class ContextBundle(object):
@@ -1032,30 +4454,54 @@ class ContextBundle(object):
             seen.add(id(n))
             yield n
 
+    @staticmethod
+    def _all_notes():
+        """Return every note in Note.NOTEFILE, via Note.current().
+
+        Bundles come and go as terms are added and removed, so the parsed
+        file is kept by Note.current() — only what was appended since the
+        last bundle gets parsed.  A missing or unreadable notefile is left
+        to NoteContext, which handles it the way every other reader does.
+        """
+        try:
+            return Note.current(Note.NOTEFILE)
+        except (FileNotFoundError, ValueError):
+            with NoteContext(Note.NOTEFILE, (SearchType.ALL, "")) as notes:
+                return notes
+
     def _regen_notes(self):
-        """Rebuild self.notes by re-reading Note.NOTEFILE from disk.
+        """Rebuild self.notes from the current contents of Note.NOTEFILE.
 
         Called every time a matching term is added or removed (via +=/-=) to
         keep the in-memory note list consistent with the declared terms.
-        Uses NoteContext (which in turn calls Note.match) so the same search
-        logic applies here as everywhere else.
+        The notefile is brought up to date once (see _all_notes()), then
+        every term is answered together by Note.filter_many, in one pass
+        over the notes however many terms the bundle holds.
 
         Notes are de-duplicated: a note that matches on both a tag and a
-        directory is only stored once.
+        directory is only stored once.  "The same note" means what Note's
+        __eq__ says it means; the key below is exactly the fields it
+        compares, so the check is a set lookup rather than a list scan.
         """
         self.notes = []
-
-        def add_notes(search_type, values):
-            for value in values:
-                with NoteContext(Note.NOTEFILE, (search_type, value)) as notes:
-                    for n in notes:
-                        if n not in self.notes:
-                            self.notes.append(n)
+        seen = set()
 
         # Regenerate notes based on tags, directories, and timestamps
-        add_notes(SearchType.TAG, self.tags)
-        add_notes(SearchType.DIRECTORY, self.dirs)
-        add_notes(SearchType.TIMESTAMP, self.ts)
+        queries = [
+            ((search_type, value), "and")
+            for search_type, values in (
+                (SearchType.TAG, self.tags),
+                (SearchType.DIRECTORY, self.dirs),
+                (SearchType.TIMESTAMP, self.ts),
+            )
+            for value in values
+        ]
+        for found in Note.filter_many(self._all_notes(), queries):
+            for n in found:
+                key = (n.message.strip(), n.pwd, n.now, n.context.strip(), n.tag)
+                if key not in seen:
+                    seen.add(key)
+                    self.notes.append(n)
 
     @property
     def active_tags(self):
@@ -1124,6 +4570,12 @@ class NoteContext:
     The `with` block receives a plain list, so len(), indexing (nc[0]),
     and multiple passes all work without rewinding a generator.
 
+    With stream=True it receives a NoteStream instead: the notes are read
+    as the loop asks for them (see Note.stream()), so the first one prints
+    at once and a huge notefile is never held in memory.  It can be looped
+    over once; len() counts the notes seen so far, which after the loop is
+    the total the footers print.
+
     First-run behaviour
     ───────────────────
     If the note file doesn't exist yet, NoteContext prints a friendly ASCII
@@ -1143,16 +4595,50 @@ class NoteContext:
    ((,-'    ((,|
 """
 
-    def __init__(self, notefile, search_criteria):
+    def __init__(
+        self,
+        notefile,
+        search_criteria,
+        newest=None,
+        headers_only=False,
+        limit=None,
+        order="asc",
+        stream=False,
+        after=None,
+    ):
         """Store the file path and search criteria for use in __enter__.
 
         Args:
             notefile:        path to the .catjot note file.
             search_criteria: (SearchType, value) tuple, or list of tuples,
                              or an empty list (yields zero results).
+            newest:          if given, keep only the last `newest` matches.
+                             Shorthand for limit=newest, order="desc", but
+                             the notes still come back in file order,
+                             oldest first.
+            headers_only:    skip the message bodies while reading (see
+                             Note.iterate()); for callers that only print
+                             `-d` timestamps or count the results.
+            limit:           keep only the first `limit` matches, in
+                             `order`; the read stops once they are found.
+            order:           "asc" reads from the top of the file, "desc"
+                             backwards from EOF (see Note.match()).
+            stream:          hand out a NoteStream rather than a list; with
+                             it, `limit` is the page size and `after` the
+                             cursor, (timestamp, record start), of the note
+                             the page starts after (see Note.cursor()).
+                             newest and order don't apply.
         """
         self.notefile = notefile
         self.criteria = search_criteria
+        self.limit = limit
+        self.order = order
+        self.reverse = newest is not None
+        if self.reverse:
+            self.limit, self.order = newest, "desc"
+        self.headers_only = headers_only
+        self.stream = stream
+        self.after = after
 
     def __enter__(self):
         """Execute the search and return the result as a list.
@@ -1164,10 +4650,30 @@ class NoteContext:
             FileNotFoundError → prints ASCII cat, creates the file, sys.exit(1)
             ValueError        → prints type-mismatch message, sys.exit(3)
         """
+        import os
         import sys
 
         try:
-            return list(Note.match(self.notefile, self.criteria))
+            if self.stream:
+                os.stat(self.notefile)
+                Note.compile(self.criteria)  # a bad value fails here, not mid-loop
+                found = Note._stream(
+                    self.notefile,
+                    self.criteria,
+                    headers_only=self.headers_only,
+                    after=self.after,
+                )
+                return NoteStream(found, self.limit)
+            found = list(
+                Note.match(
+                    self.notefile,
+                    self.criteria,
+                    order=self.order,
+                    headers_only=self.headers_only,
+                    limit=self.limit,
+                )
+            )
+            return found[::-1] if self.reverse else found
         except FileNotFoundError:
             print(f"Waking up the cat at {self.notefile}. Now, try again.")
             for line in self.NEWCAT.split("\n")[0:-2]:
@@ -1185,6 +4691,37 @@ class NoteContext:
         pass
 
 
+class NoteStream(object):
+    """The notes of a NoteContext(stream=True), counted as they go by.
+
+    Iterate it once.  len() is the number of notes handed out so far;
+    `cursor` is (timestamp, record start) of the latest of them, where the
+    next page starts after (see Note.cursor()); and `more` says whether a
+    page (`limit` notes) stopped short of the end — found by reading one
+    note past it.  `notes` yields (record start, note) pairs, as
+    Note._stream() does.
+    """
+
+    def __init__(self, notes, limit=None):
+        self.notes = notes
+        self.limit = limit
+        self.count = 0
+        self.cursor = None
+        self.more = False
+
+    def __iter__(self):
+        for start, inst in self.notes:
+            if self.limit is not None and self.count >= self.limit:
+                self.more = True
+                break
+            self.count += 1
+            self.cursor = (int(inst.now), start)
+            yield inst
+
+    def __len__(self):
+        return self.count
+
+
 class catjot_graphql(object):
     """Optional GraphQL interface over the catjot note file.
 
@@ -1192,9 +4729,14 @@ class catjot_graphql(object):
     query endpoint.  Useful when you want to drive catjot from tooling that
     speaks GraphQL (dashboards, notebooks, external scripts).
 
-    All filtering runs in O(n) time over the note file — there is no index.
-    For interactive use this is fine; for very large note files consider
-    batching queries or pre-filtering with Note.match() directly.
+    Filtering goes through Note.match(), so the sidecar indexes answer what
+    they can: timestamps and time ranges (NoteIndex), tags (TagIndex),
+    directories and subtrees (DirIndex) and message or context substrings
+    (TextIndex, TrigramIndex) read just the records they point at.  Any
+    other query, or a note file smaller than _Sidecar.MIN_BYTES, falls back
+    to an O(n) scan of the whole file.  Repeat queries are served from
+    QueryCache.shared(), and `last` reads backwards from the end of the
+    file.
 
     Quickstart:
         gql = catjot_graphql()
@@ -1209,8 +4751,8 @@ class catjot_graphql(object):
     # Default GraphQL query — returns all five note fields.
     # Use as a template; narrow the field selection if you only need a subset.
     QUERY = """
-    query ($pwd: String, $now: Int, $tag: [String], $context: String, $message: String, $pwdtree: String, $logic: String) {
-      notes(pwd: $pwd, now: $now, tag: $tag, context: $context, message: $message, pwdtree: $pwdtree, logic: $logic) {
+    query ($pwd: String, $now: Int, $nowFrom: Int, $nowTo: Int, $tag: [String], $context: String, $message: String, $pwdtree: String, $logic: String, $last: Int, $query: String) {
+      notes(pwd: $pwd, now: $now, nowFrom: $nowFrom, nowTo: $nowTo, tag: $tag, context: $context, message: $message, pwdtree: $pwdtree, logic: $logic, last: $last, query: $query) {
         pwd
         now
         tag
@@ -1233,6 +4775,7 @@ class catjot_graphql(object):
         """
         from graphql import (
             graphql_sync,
+            GraphQLArgument,
             GraphQLSchema,
             GraphQLObjectType,
             GraphQLList,
@@ -1262,11 +4805,15 @@ class catjot_graphql(object):
                     args={  # Query arguments for filtering
                         "pwd": GraphQLString,
                         "now": GraphQLInt,
+                        "nowFrom": GraphQLArgument(GraphQLInt, out_name="now_from"),
+                        "nowTo": GraphQLArgument(GraphQLInt, out_name="now_to"),
                         "tag": GraphQLList(GraphQLString),
                         "context": GraphQLString,
                         "message": GraphQLString,
                         "pwdtree": GraphQLString,
                         "logic": GraphQLString,
+                        "last": GraphQLInt,
+                        "query": GraphQLString,
                     },
                     resolve=self.resolve_notes,
                 ),
@@ -1283,6 +4830,9 @@ class catjot_graphql(object):
                 {"tag": ["project", "urgent"], "logic": "and"}
                 {"pwdtree": "/home/user/project"}
                 {"message": "deployment", "context": "prod"}
+                {"nowFrom": 1727740800, "nowTo": 1728345600}
+                {"pwdtree": "/home/user/project", "last": 5}
+                {"query": "tag:prod AND NOT dir:/tmp/*", "last": 5}
             query: GraphQL query string; defaults to QUERY (returns all fields).
 
         Returns:
@@ -1314,11 +4864,15 @@ class catjot_graphql(object):
         info,
         pwd=None,
         now=None,
+        now_from=None,
+        now_to=None,
         tag=None,
         context=None,
         message=None,
         pwdtree=None,
         logic="or",
+        last=None,
+        query=None,
     ):
         """GraphQL resolver: translate query args into Note.match() criteria.
 
@@ -1332,14 +4886,22 @@ class catjot_graphql(object):
             info:    resolver context (unused).
             pwd:     exact directory match.
             now:     exact timestamp match.
+            now_from, now_to:
+                     (nowFrom/nowTo in the query) timestamp range,
+                     now_from <= now < now_to; give either or both.
             tag:     single tag string or list of tag strings.
             context: case-insensitive context substring.
             message: case-insensitive message substring.
             pwdtree: directory prefix match (note and all children).
             logic:   "or" (default) or "and".
+            last:    keep only the newest `last` matches (still oldest
+                     first), read backwards from the end of the file.
+            query:   a NoteQuery string (tag:prod AND NOT dir:/tmp/*); the
+                     other arguments, if any, must then hold as well.
 
         Returns:
-            list of Note objects satisfying the criteria.
+            list of Note objects satisfying the criteria.  Without `last`,
+            the results come from (and go into) QueryCache.shared().
         """
 
         criteria = []
@@ -1353,6 +4915,9 @@ class catjot_graphql(object):
         if now:
             criteria.append((SearchType.TIMESTAMP, now))
 
+        if now_from is not None or now_to is not None:
+            criteria.append((SearchType.TIME_RANGE, (now_from, now_to)))
+
         if tag:
             if isinstance(tag, list):
                 for i in tag:
@@ -1366,7 +4931,31 @@ class catjot_graphql(object):
         if message:
             criteria.append((SearchType.MESSAGE_I, message))
 
-        return list(Note.match(self.NOTEFILE, criteria, logic))
+        if query:
+            parsed = NoteQuery(query)
+            found = QueryCache.shared().lookup(
+                self.NOTEFILE,
+                parsed.key(),
+                parsed.plan()[0],
+                lambda: parsed.run(self.NOTEFILE),
+            )
+            test = Note.compile(criteria, logic) if criteria else None
+            if test is not None:
+                found = (inst for inst in found if test(inst))
+            elif criteria:
+                found = ()  # the other arguments can never match
+            found = list(found)
+            if last is not None:
+                found = found[max(len(found) - max(last, 0), 0) :]
+            return found
+
+        if last is not None:
+            found = Note.match(
+                self.NOTEFILE, criteria, logic, order="desc", limit=max(last, 0)
+            )
+            return list(found)[::-1]
+        # a polling dashboard asks this again and again (see QueryCache)
+        return QueryCache.shared().match(self.NOTEFILE, criteria, logic)
 
 
 # END: CLASSES
@@ -1661,6 +5250,12 @@ _FIELD_SEARCH_TYPES = {
 }
 _SEARCH_FIELDS = list(_FIELD_SEARCH_TYPES)
 
+# The fields a fuzzy search can widen, and the vocabulary each draws on.
+_FUZZY_KINDS = {
+    SearchType.TAG: FuzzyIndex.TAG,
+    SearchType.MESSAGE_I: FuzzyIndex.WORD,
+}
+
 
 def make_field_search_handler(search_type):
     """Return a handler that searches one note field via *search_type*.
@@ -1671,14 +5266,39 @@ def make_field_search_handler(search_type):
     returns them as a JSON array string — the format ``aggregate_note_ids``
     expects.  One factory covers all four note fields; the field is chosen by
     the SearchType passed in.
+
+    With *fuzzy*, a tag or message search first swaps each word for the
+    tags (or message words) within a few typos of it (FuzzyIndex), so
+    ``kuberentes`` still finds the ``kubernetes`` notes; the other fields
+    ignore it.  Each word's matches are kept in the QueryCache, so a session
+    asking about the same words again doesn't rescan the notes.
+    Given a *limit*, the same matches are ranked instead (Note.rank(), BM25
+    over tag, context and message) and only the IDs of the best *limit*
+    come back, best first — a common word then costs the final answer pass
+    a handful of notes rather than thousands.
     """
 
-    def handler(query: str) -> str:
+    def handler(query: str, limit: int = None, fuzzy: bool = False) -> str:
         seen = []
-        for word in query.split():
-            for note in Note.match(Note.NOTEFILE, [(search_type, word)], logic="or"):
-                if note.now not in seen:
-                    seen.append(note.now)
+        terms = query.split()
+        if fuzzy and search_type in _FUZZY_KINDS:
+            vocab = FuzzyIndex.vocabulary(Note.NOTEFILE)
+            terms = vocab.expand(terms, _FUZZY_KINDS[search_type])
+        if limit is not None:
+            criteria = [(search_type, word) for word in terms]
+            test = Note.compile(criteria, logic="or")
+            if test is None:
+                return json.dumps(seen)
+            notes = Note.current(Note.NOTEFILE)  # a session searches many times
+            ranked = Note.rank(notes, terms, int(limit), test)
+            return json.dumps([inst.now for inst in ranked])
+        # words asked before come from the cache; the rest share one pass
+        # over the notes (see Note.filter_many)
+        queries = [([(search_type, word)], "or") for word in terms]
+        found = QueryCache.shared().match_many(
+            Note.NOTEFILE, queries, source=lambda: Note.current(Note.NOTEFILE)
+        )
+        seen = list(dict.fromkeys(inst.now for hits in found for inst in hits))
         return json.dumps(seen)
 
     return handler
@@ -1696,7 +5316,9 @@ def make_search_notes_handler():
         for field, st in _FIELD_SEARCH_TYPES.items()
     }
 
-    def handler(field: str, query: str) -> str:
+    def handler(
+        field: str, query: str, limit: int = None, fuzzy: bool = False
+    ) -> str:
         sub = field_handlers.get(field)
         if sub is None:
             return json.dumps(
@@ -1705,7 +5327,7 @@ def make_search_notes_handler():
                     "hint": "field must be one of: " + ", ".join(_SEARCH_FIELDS),
                 }
             )
-        return sub(query)
+        return sub(query, limit, fuzzy)
 
     return handler
 
@@ -1729,6 +5351,21 @@ _SEARCH_NOTES_SCHEMA = {
             "type": "string",
             "description": "Space-separated search terms to look up in that field.",
         },
+        "limit": {
+            "type": "integer",
+            "description": (
+                "Optional. Return only this many note IDs, the most relevant "
+                "first, instead of every match in file order."
+            ),
+        },
+        "fuzzy": {
+            "type": "boolean",
+            "description": (
+                "Optional, for the 'tag' and 'message' fields. Also match "
+                "tags or words within a few typos of each term, e.g. "
+                "'kuberentes' for 'kubernetes'."
+            ),
+        },
     },
     "required": ["field", "query"],
 }
@@ -1786,9 +5423,10 @@ def aggregate_note_ids(messages):
 def fetch_notes_by_ids(note_ids):
     """Hydrate a set of note IDs into full note dicts for the final LLM pass.
 
-    After ``aggregate_note_ids`` builds the candidate set, this function reads
-    through ``Note.NOTEFILE`` once via ``NoteContext`` and plucks out every note
-    whose ``note.now`` timestamp is in *note_ids*.
+    After ``aggregate_note_ids`` builds the candidate set, this function pulls
+    every note whose ``note.now`` timestamp is in *note_ids* via
+    ``Note.lookup`` — straight from the sidecar index when one exists,
+    otherwise in a single pass over ``Note.NOTEFILE``.
 
     Each result dict contains: ``now``, ``tag``, ``context``, ``directory``,
     and ``message`` — everything the LLM needs to write a grounded summary.
@@ -1796,19 +5434,17 @@ def fetch_notes_by_ids(note_ids):
     Returns a list of dicts (order follows the on-disk note order).
     """
     results = []
-    with NoteContext(Note.NOTEFILE, (SearchType.ALL, "")) as nc:
-        for note in nc:
-            if note.now in note_ids:
-                results.append(
-                    {
-                        "now": note.now,
-                        "tag": note.tag,
-                        "context": note.context,
-                        "directory": note.pwd,
-                        "message": note.message,
-                    }
-                )
-        return results
+    for note in Note.lookup(Note.NOTEFILE, note_ids):
+        results.append(
+            {
+                "now": note.now,
+                "tag": note.tag,
+                "context": note.context,
+                "directory": note.pwd,
+                "message": note.message,
+            }
+        )
+    return results
 
 
 def _searched_field(fn_name, fn_args):
@@ -2188,12 +5824,17 @@ SHORTCUTS = {
     "MOST_RECENTLY_WRITTEN_HERE": ["last", "l"],
     "MATCH_NOTE_NAIVE": ["match", "m"],
     "MATCH_NOTE_NAIVE_I": ["search", "s", "mi"],
+    "MATCH_NOTE_REGEX": ["regex", "re"],
+    "MATCH_NEAR_WORDS": ["fuzzy", "ft"],
+    "MATCH_QUERY": ["query", "q"],
     "DELETE_MOST_RECENT_PWD": ["pop", "p"],
     "BULK_MANAGE_NOTES": ["scoop", "cherry-pick"],
     "NOTES_REFERENCING_ABSENT_DIRS": ["str", "stra", "stray", "strays"],
     "SHOW_ALL": ["dump", "display", "d"],
     "MATCH_TIMESTAMP": ["timestamp", "ts"],
+    "MATCH_TIME_RANGE": ["since"],
     "REMOVE_BY_TIMESTAMP": ["remove", "r"],
+    "COMPACT": ["compact"],
     "HOMENOTES": ["home"],
     "SHOW_TAG": ["tagged", "tag", "t"],
     "AMEND": ["amend", "a"],
@@ -2256,6 +5897,99 @@ def _arity_error(args):
     sys.exit(2)
 
 
+def _parse_when(text):
+    """Turn a `jot since` bound into an epoch timestamp; ValueError if it isn't one.
+
+    Accepts an epoch timestamp (1695220591), an ISO date or date and time
+    in local time (2026-10-01, 2026-10-01T14:30), today / yesterday, a
+    weekday name (midnight of its most recent occurrence before today), or
+    an age: a number followed by m, h, d or w (90m, 36h, 3d, 2w ago).
+    """
+    from datetime import date, datetime, timedelta
+    from time import time
+
+    text = text.strip().lower()
+    if text.isdigit():
+        return int(text)
+    ages = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+    if text[:-1].isdigit() and text[-1:] in ages:
+        return int(time()) - int(text[:-1]) * ages[text[-1]]
+    days = [
+        "monday",
+        "tuesday",
+        "wednesday",
+        "thursday",
+        "friday",
+        "saturday",
+        "sunday",
+    ]
+    today = date.today()
+    if text in ("today", "yesterday"):
+        day = today - timedelta(days=text == "yesterday")
+    elif text in days:
+        day = today - timedelta(days=(today.weekday() - days.index(text) - 1) % 7 + 1)
+    else:
+        return int(datetime.fromisoformat(text.upper()).timestamp())
+    return int(datetime.combine(day, datetime.min.time()).timestamp())
+
+
+def _relative_when(text):
+    """True if _parse_when(text) depends on when it is called.
+
+    Epoch timestamps and ISO dates are fixed; ages, today / yesterday and
+    weekday names are counted back from now.
+    """
+    from datetime import datetime
+
+    text = text.strip().lower()
+    if text.isdigit():
+        return False
+    try:
+        datetime.fromisoformat(text.upper())
+    except ValueError:
+        return True
+    return False
+
+
+def _show_newest(args, notefile, criteria):
+    """Shared body of `jot last` and `jot head`: the newest matching notes.
+
+    `<verb>` prints the newest match, `<verb> N` the newest N in file order,
+    and `<verb> ~N` only the Nth newest (nothing if there are fewer).  Notes
+    are read backwards from EOF, so the cost follows N, not the file size.
+    """
+    if len(args.additional_args) == 1:
+        with NoteContext(notefile, criteria, newest=1, headers_only=args.d) as nc:
+            last_note = nc[-1] if nc else None
+        if last_note is None:
+            print("No notes to show.")
+        else:
+            printout(last_note, time_only=args.d)
+    elif len(args.additional_args) == 2:
+        record_count_to_show = 1
+        user_tilde_given = False
+        try:
+            record_count_to_show = int(args.additional_args[1])
+        except ValueError:
+            # if user includes ~ (tilde), show ONLY the one note, counting backwards
+            if args.additional_args[1].startswith("~"):
+                record_count_to_show = int(args.additional_args[1][1:])
+                user_tilde_given = True
+
+        with NoteContext(
+            notefile, criteria, newest=record_count_to_show, headers_only=args.d
+        ) as nc:
+            last_notes = nc
+
+        if not user_tilde_given:
+            for inst in last_notes:
+                printout(inst, time_only=args.d)
+        elif record_count_to_show and len(last_notes) == record_count_to_show:
+            printout(last_notes[0], time_only=args.d)
+    else:
+        _arity_error(args)
+
+
 class Ctx:
     """Shared per-invocation state handed to every cmd_* handler."""
 
@@ -2318,7 +6052,9 @@ def cmd_flag_context(ctx):
     if sys.stdin.isatty():  # interactive tty, no pipe!
         # jot -c observations
         # not intending to amend instead means match by context field
-        with NoteContext(NOTEFILE, (SearchType.CONTEXT_I, params["context"])) as nc:
+        with NoteContext(
+            NOTEFILE, (SearchType.CONTEXT_I, params["context"]), headers_only=args.d
+        ) as nc:
             for inst in nc:
                 printout(inst, time_only=args.d)
     else:  # yes pipe!
@@ -2336,7 +6072,9 @@ def cmd_flag_tag(ctx):
     if sys.stdin.isatty():  # interactive tty, no pipe!
         # jot -t project2
         # not intending to amend instead means match by tag field
-        with NoteContext(NOTEFILE, (SearchType.TAG, params["tag"])) as nc:
+        with NoteContext(
+            NOTEFILE, (SearchType.TAG, params["tag"]), headers_only=args.d
+        ) as nc:
             for inst in nc:
                 printout(inst, time_only=args.d)
     else:  # yes pipe!
@@ -2354,7 +6092,9 @@ def cmd_flag_pwd(ctx):
     if sys.stdin.isatty():  # interactive tty, no pipe!
         # jot -p /home/user
         # not intending to amend instead means match by pwd field
-        with NoteContext(NOTEFILE, (SearchType.DIRECTORY, params["pwd"])) as nc:
+        with NoteContext(
+            NOTEFILE, (SearchType.DIRECTORY, params["pwd"]), headers_only=args.d
+        ) as nc:
             for inst in nc:
                 printout(inst, time_only=args.d)
     else:  # yes pipe!
@@ -2603,7 +6343,9 @@ def cmd_convo(ctx):
             # OUTPUT: select by tag, include up to timestamp, truncate after
             # jot continue 2345678
             # determine tag based on timestamp
-            with NoteContext(NOTEFILE, (SearchType.TIMESTAMP, timestamp)) as nc:
+            with NoteContext(
+                NOTEFILE, (SearchType.TIMESTAMP, timestamp), limit=1
+            ) as nc:
                 for inst in nc:
                     if inst.now == timestamp:
                         params["tag"] = inst.tag
@@ -2845,17 +6587,18 @@ def cmd_default(ctx):
     params = ctx.params()
     # show all notes originating from this PWD
     if sys.stdin.isatty():
-        with NoteContext(NOTEFILE, (SearchType.ALL, "")) as nc:
-            match_count = 0
-            non_match_count = 0
-            total_count = 0
-            for inst in nc:
-                total_count += 1
-                if getcwd() == inst.pwd:
-                    match_count += 1
-                    printout(inst, time_only=args.d)
-                else:
-                    non_match_count += 1
+        # the other directories' notes are only counted: from the .dirs
+        # index when there is one, else by a header-only pass
+        try:
+            here, total_count = Note.census(NOTEFILE, getcwd())
+        except (FileNotFoundError, ValueError):
+            # a missing or unreadable notefile is NoteContext's to report
+            with NoteContext(NOTEFILE, (SearchType.ALL, ""), headers_only=True):
+                raise
+        for inst in here:
+            printout(inst, time_only=args.d)
+        match_count = len(here)
+        non_match_count = total_count - match_count
 
         if not args.d:
             print(f"{Note.LABEL_SEP}")
@@ -2870,92 +6613,14 @@ def cmd_default(ctx):
 
 def cmd_last(ctx):
     """MOST_RECENTLY_WRITTEN_HERE: `jot last` / `jot last N` / `jot last ~N`."""
-    args = ctx.args
-    NOTEFILE = ctx.notefile
-    if len(args.additional_args) == 1:
-        # only display the most recently created note in this PWD
-        last_note = None
-        with NoteContext(NOTEFILE, (SearchType.DIRECTORY, getcwd())) as nc:
-            for inst in nc:
-                last_note = inst
-        if last_note is None:
-            print("No notes to show.")
-        else:
-            printout(last_note, time_only=args.d)
-    elif len(args.additional_args) == 2:
-        # only display the most recently created n notes in this PWD
-        from collections import deque
-
-        record_count_to_show = 1
-        user_tilde_given = False
-        try:
-            record_count_to_show = int(args.additional_args[1])
-        except ValueError:
-            # if user includes ~ (tilde), show ONLY the one note, counting backwards
-            if args.additional_args[1].startswith("~"):
-                record_count_to_show = int(args.additional_args[1][1:])
-                user_tilde_given = True
-
-        last_notes = deque(maxlen=record_count_to_show)
-        with NoteContext(NOTEFILE, (SearchType.DIRECTORY, getcwd())) as nc:
-            for inst in nc:
-                last_notes.append(inst)
-
-        if not user_tilde_given:
-            for inst in last_notes:
-                printout(inst, time_only=args.d)
-        else:
-            try:
-                printout(last_notes[-record_count_to_show], time_only=args.d)
-            except IndexError:
-                pass
-    else:
-        _arity_error(args)
+    # only notes created in this PWD
+    _show_newest(ctx.args, ctx.notefile, (SearchType.DIRECTORY, getcwd()))
 
 
 def cmd_head(ctx):
     """MOST_RECENTLY_WRITTEN_ALLTIME: `jot head` / `jot head N` / `jot head ~N`."""
-    args = ctx.args
-    NOTEFILE = ctx.notefile
-    if len(args.additional_args) == 1:
-        # only display the most recently created note in this PWD
-        last_note = None
-        with NoteContext(NOTEFILE, (SearchType.ALL, "")) as nc:
-            for inst in nc:
-                last_note = inst
-        if last_note is None:
-            print("No notes to show.")
-        else:
-            printout(last_note, time_only=args.d)
-    elif len(args.additional_args) == 2:
-        # only display the most n recently, of all locations
-        from collections import deque
-
-        record_count_to_show = 1
-        user_tilde_given = False
-        try:
-            record_count_to_show = int(args.additional_args[1])
-        except ValueError:
-            # if user includes ~ (tilde), show ONLY the one note, counting backwards
-            if args.additional_args[1].startswith("~"):
-                record_count_to_show = int(args.additional_args[1][1:])
-                user_tilde_given = True
-
-        last_notes = deque(maxlen=record_count_to_show)
-        with NoteContext(NOTEFILE, (SearchType.ALL, "")) as nc:
-            for inst in nc:
-                last_notes.append(inst)
-
-        if not user_tilde_given:
-            for inst in last_notes:
-                printout(inst, time_only=args.d)
-        else:
-            try:
-                printout(last_notes[-record_count_to_show], time_only=args.d)
-            except IndexError:
-                pass
-    else:
-        _arity_error(args)
+    # notes of all locations
+    _show_newest(ctx.args, ctx.notefile, (SearchType.ALL, ""))
 
 
 def cmd_pop(ctx):
@@ -2966,8 +6631,7 @@ def cmd_pop(ctx):
         _arity_error(args)
     # always deletes the most recently created note in this PWD
     try:
-        Note.pop(NOTEFILE, getcwd())
-        Note.commit(NOTEFILE)
+        Note.pop(NOTEFILE, getcwd(), tombstone=True)
     except FileNotFoundError:
         print(f"No notefile found at {NOTEFILE}")
         sys.exit(1)
@@ -2987,7 +6651,7 @@ def cmd_home(ctx):
     # if piped to, save as home note
     if sys.stdin.isatty():
         with NoteContext(
-            NOTEFILE, (SearchType.DIRECTORY, environ["HOME"])
+            NOTEFILE, (SearchType.DIRECTORY, environ["HOME"]), headers_only=args.d
         ) as nc:
             for inst in nc:
                 printout(inst, time_only=args.d)
@@ -3009,14 +6673,49 @@ def cmd_dump(ctx):
     NOTEFILE = ctx.notefile
     if len(args.additional_args) != 1:
         _arity_error(args)
-    # show all notes, from everywhere, everywhen
-    with NoteContext(NOTEFILE, (SearchType.ALL, "")) as nc:
+    # show all notes, from everywhere, everywhen — streamed, so the first
+    # prints at once however big the notefile is; --page-size/--after page
+    paged = args.page_size is not None or args.after is not None
+    if args.page_size is not None and args.page_size < 1:
+        print(
+            f"jot: page size must be at least 1, got {args.page_size}",
+            file=sys.stderr,
+        )
+        sys.exit(2)
+    after = None
+    if args.after is not None:
+        try:
+            after = Note.cursor(NOTEFILE, args.after)
+        except FileNotFoundError:
+            after = None  # NoteContext wakes the cat
+        except ValueError as err:
+            print(f"jot: bad --after '{args.after}': {err}", file=sys.stderr)
+            sys.exit(2)
+    with NoteContext(
+        NOTEFILE,
+        (SearchType.ALL, ""),
+        headers_only=args.d,
+        stream=True,
+        limit=args.page_size,
+        after=after,
+    ) as nc:
         for inst in nc:
             printout(inst, time_only=args.d)
 
         if not args.d:
             print(f"{Note.LABEL_SEP}")
-            print(f"{len(nc)} notes in total")
+            if not paged:
+                print(f"{len(nc)} notes in total")
+            else:
+                print(f"{len(nc)} notes on this page")
+        if paged and nc.more:
+            # under -d stdout is timestamps only: the cursor goes to stderr
+            ts, start = nc.cursor
+            flags = f"{'-d ' if args.d else ''}--page-size {args.page_size}"
+            print(
+                f"next: jot d {flags} --after {ts}@{start}",
+                file=sys.stderr if args.d else sys.stdout,
+            )
 
 
 def cmd_payload(ctx):
@@ -3025,10 +6724,8 @@ def cmd_payload(ctx):
     NOTEFILE = ctx.notefile
     if len(args.additional_args) == 1:
         # returns the last message, message only (no pwd, no timestamp, no context).
-        last_note = None
-        with NoteContext(NOTEFILE, (SearchType.ALL, "")) as nc:
-            for inst in nc:
-                last_note = inst
+        with NoteContext(NOTEFILE, (SearchType.ALL, ""), newest=1) as nc:
+            last_note = nc[-1] if nc else None
         if last_note is None:
             print("No notes to show.")
         else:
@@ -3058,7 +6755,9 @@ def cmd_payload(ctx):
 
             # always displays the most recently created note in this PWD
             last_note = None
-            with NoteContext(NOTEFILE, (SearchType.DIRECTORY, getcwd())) as nc:
+            with NoteContext(
+                NOTEFILE, (SearchType.DIRECTORY, getcwd()), newest=1
+            ) as nc:
                 for inst in nc:
                     last_note = inst
             if last_note is None:
@@ -3188,22 +6887,30 @@ def cmd_scoop(ctx):
         with NoteContext(NOTEFILE, (SearchType.TIMESTAMP, record_ts)) as nc:
             ret_notes.extend(nc)
 
-    for record_ts in to_delete:
-        with NoteContext(NOTEFILE, (SearchType.TIMESTAMP, record_ts)) as nc:
-            for inst in nc:
-                print(f"Removing records matching timestamp: {record_ts}")
-                Note.delete(NOTEFILE, record_ts)
-                Note.commit(NOTEFILE)
+    with Note.transaction(NOTEFILE) as txn:
+        if to_delete:
+            # one pass finds every doomed note, however many were marked
+            from collections import Counter
 
-    if len(ret_notes):
-        # return at the end a space-separated list of the picked notes
-        from time import time
+            doomed = [(SearchType.TIMESTAMP, ts) for ts in to_delete]
+            found = Counter(
+                Note.match(NOTEFILE, doomed, logic="or", time_only=True)
+            )
+            for record_ts in to_delete:
+                for _ in range(found[record_ts]):
+                    print(f"Removing records matching timestamp: {record_ts}")
+                if found[record_ts]:
+                    txn.delete(record_ts)
+
+        if len(ret_notes):
+            # return at the end a space-separated list of the picked notes
+            from time import time
 
-        retval = "\n".join(str(n.now) for n in ret_notes)
-        params["now"] = int(time())
-        params["tag"] = params.get("tag", f"bundle-{params['now']}")
-        params["context"] = "bundled notes from jot scoop"
-        Note.append(NOTEFILE, Note.jot(retval, **params))
+            retval = "\n".join(str(n.now) for n in ret_notes)
+            params["now"] = int(time())
+            params["tag"] = params.get("tag", f"bundle-{params['now']}")
+            params["context"] = "bundled notes from jot scoop"
+            txn.insert(Note.jot(retval, **params))
 
 
 def cmd_stray(ctx):
@@ -3214,7 +6921,8 @@ def cmd_stray(ctx):
         _arity_error(args)
     import os
 
-    with NoteContext(NOTEFILE, (SearchType.ALL, "")) as nc:
+    # headers only: strays are rare, so nearly every note is just counted
+    with NoteContext(NOTEFILE, (SearchType.ALL, ""), headers_only=True) as nc:
         matches = 0
         for inst in nc:
             if not os.path.exists(inst.pwd):
@@ -3239,8 +6947,8 @@ def cmd_graphql(ctx):
 
     # Trimmed projection: omit pwd/now fields the CLI doesn't display.
     CLI_QUERY = """
-    query ($pwd: String, $now: Int, $tag: [String], $context: String, $message: String, $pwdtree: String, $logic: String) {
-      notes(pwd: $pwd, now: $now, tag: $tag, context: $context, message: $message, pwdtree: $pwdtree, logic: $logic) {
+    query ($pwd: String, $now: Int, $nowFrom: Int, $nowTo: Int, $tag: [String], $context: String, $message: String, $pwdtree: String, $logic: String, $last: Int, $query: String) {
+      notes(pwd: $pwd, now: $now, nowFrom: $nowFrom, nowTo: $nowTo, tag: $tag, context: $context, message: $message, pwdtree: $pwdtree, logic: $logic, last: $last, query: $query) {
         tag
         context
         message
@@ -3390,9 +7098,11 @@ def cmd_sr(ctx):
                         "is the correct answer",
                         f"✗ Next note appearance: {datetime.fromtimestamp(new_obj.now)}",
                     )
-                Note.append(NOTEFILE, new_obj)
-                Note.delete(NOTEFILE, int(inst.now))
-                Note.commit(NOTEFILE)
+                # one small transaction per card: a review survives even if
+                # the session is abandoned halfway through the deck
+                with Note.transaction(NOTEFILE) as txn:
+                    txn.delete(inst.now)
+                    txn.insert(new_obj)
         else:  # at end of iterating notes
             print("Done for today")
 
@@ -3432,6 +7142,8 @@ def cmd_match(ctx):
     """MATCH_NOTE_NAIVE: case-sensitive message search."""
     args = ctx.args
     NOTEFILE = ctx.notefile
+    if args.any or args.all:
+        return _multi_search(ctx, fold=False)
     if len(args.additional_args) != 2:
         _arity_error(args)
     # match if "term [+term2] [..]" exists in any line of the note
@@ -3449,8 +7161,12 @@ def cmd_search(ctx):
     """MATCH_NOTE_NAIVE_I: case-insensitive message search."""
     args = ctx.args
     NOTEFILE = ctx.notefile
+    if args.any or args.all:
+        return _multi_search(ctx, fold=True)
     if len(args.additional_args) != 2:
         _arity_error(args)
+    if args.rank:
+        return _ranked_search(ctx)
     # match if "term [+term2] [..]" exists in any line of the note
     flattened = flatten(args.additional_args[1:])
     with NoteContext(NOTEFILE, (SearchType.MESSAGE_I, flattened)) as nc:
@@ -3462,6 +7178,163 @@ def cmd_search(ctx):
             print(f"{len(nc)} notes matching '{flattened}'")
 
 
+def _multi_search(ctx, fold):
+    """`jot s|m --any/--all t1 t2 ..`: notes holding any/all terms, and which.
+
+    Each note found is followed by the terms it holds; with -d, each line
+    is the timestamp and then those terms, ready for sort/grep/awk.
+    """
+    from collections import Counter
+
+    args = ctx.args
+    NOTEFILE = ctx.notefile
+    terms = args.additional_args[1:]
+    if not terms or (args.any and args.all):
+        _arity_error(args)
+    tally = Counter()
+    found = 0
+    try:
+        for inst, hits in Note.match_terms(NOTEFILE, terms, args.all, fold):
+            found += 1
+            tally.update(hits)
+            if args.d:
+                print(inst.now, *hits)
+            else:
+                printout(inst)
+                print(f"matched: {', '.join(hits)}")
+    except FileNotFoundError:
+        pass
+
+    if not args.d:
+        print(f"{Note.LABEL_SEP}")
+        mode = "all" if args.all else "any"
+        print(f"{found} notes matching {mode} of {len(set(terms))} terms")
+        for term in dict.fromkeys(terms):
+            print(f"  {tally[term]:>6}  {term}")
+
+
+def _ranked_search(ctx):
+    """`jot s --rank`: the best BM25 matches for the words given, best first."""
+    args = ctx.args
+    NOTEFILE = ctx.notefile
+    terms = args.additional_args[1:]
+    limit = Note.RANK_LIMIT if args.n is None else args.n
+    try:
+        ranked = Note.rank(Note.iterate(NOTEFILE), terms, limit)
+    except FileNotFoundError:
+        ranked = []
+    for inst in ranked:
+        printout(inst, time_only=args.d)
+
+    if not args.d:
+        print(f"{Note.LABEL_SEP}")
+        print(f"{len(ranked)} best notes matching '{flatten(terms)}'")
+
+
+def cmd_regex(ctx):
+    """MATCH_NOTE_REGEX: regular-expression message search."""
+    import re
+
+    args = ctx.args
+    NOTEFILE = ctx.notefile
+    if len(args.additional_args) != 2:
+        _arity_error(args)
+    # match if the pattern re.search()es anywhere in the note
+    pattern = args.additional_args[1]
+    try:
+        re.compile(pattern)
+    except re.error as err:
+        print(f"jot: bad pattern '{pattern}': {err}", file=sys.stderr)
+        sys.exit(2)
+    with NoteContext(NOTEFILE, (SearchType.REGEX, pattern)) as nc:
+        for inst in nc:
+            printout(inst, time_only=args.d)
+
+        if not args.d:
+            print(f"{Note.LABEL_SEP}")
+            print(f"{len(nc)} notes matching /{pattern}/")
+
+
+def cmd_fuzzy(ctx):
+    """MATCH_NEAR_WORDS: typo-tolerant tag and message-word search."""
+    args = ctx.args
+    NOTEFILE = ctx.notefile
+    if len(args.additional_args) not in (2, 3):
+        _arity_error(args)
+    # match tags and message words within a few edits of the term
+    term = args.additional_args[1]
+    reach = FuzzyIndex.reach(term)
+    if len(args.additional_args) == 3:
+        edits = args.additional_args[2]
+        if not edits.isdigit():
+            print(f"jot: edit distance must be a number, got '{edits}'", file=sys.stderr)
+            sys.exit(2)
+        reach = int(edits)
+    try:
+        found = list(Note.fuzzy(NOTEFILE, term, reach))
+    except FileNotFoundError:
+        found = []
+    for inst in found:
+        printout(inst, time_only=args.d)
+
+    if not args.d:
+        print(f"{Note.LABEL_SEP}")
+        print(f"{len(found)} notes within {reach} edits of '{term}'")
+
+
+def cmd_query(ctx):
+    """MATCH_QUERY: show notes matching a boolean field query."""
+    args = ctx.args
+    NOTEFILE = ctx.notefile
+    if len(args.additional_args) < 2:
+        _arity_error(args)
+    # match if the planned query holds, e.g. tag:prod AND NOT dir:/tmp/*
+    text = flatten(args.additional_args[1:])
+    try:
+        query = NoteQuery(text)
+    except ValueError as err:
+        print(f"jot: bad query '{text}': {err}", file=sys.stderr)
+        sys.exit(2)
+    try:
+        found = list(query.run(NOTEFILE))
+    except FileNotFoundError:
+        found = []
+    for inst in found:
+        printout(inst, time_only=args.d)
+
+    if not args.d:
+        print(f"{Note.LABEL_SEP}")
+        print(f"{len(found)} notes matching {text}")
+
+
+def cmd_since(ctx):
+    """MATCH_TIME_RANGE: show notes written since (and before) a point in time."""
+    args = ctx.args
+    NOTEFILE = ctx.notefile
+    if len(args.additional_args) not in (2, 3):
+        _arity_error(args)
+    # match if since <= timestamp < until
+    bounds = args.additional_args[1:] + [None]
+    try:
+        since, until = [None if b is None else _parse_when(b) for b in bounds[:2]]
+    except ValueError:
+        print(
+            f"jot: expected a date, timestamp or age (3d), got '{flatten(args.additional_args[1:])}'",
+            file=sys.stderr,
+        )
+        sys.exit(2)
+    with NoteContext(
+        NOTEFILE, (SearchType.TIME_RANGE, (since, until)), headers_only=args.d
+    ) as nc:
+        for inst in nc:
+            printout(inst, time_only=args.d)
+
+        if not args.d:
+            print(f"{Note.LABEL_SEP}")
+            span = f"since '{bounds[0]}'" + (f" until '{bounds[1]}'" if until else "")
+            print(f"{len(nc)} notes {span}")
+
+
 def cmd_ts(ctx):
     """MATCH_TIMESTAMP: show notes matching a timestamp."""
     args = ctx.args
@@ -3477,7 +7350,9 @@ def cmd_ts(ctx):
             file=sys.stderr,
         )
         sys.exit(2)
-    with NoteContext(NOTEFILE, (SearchType.TIMESTAMP, flattened)) as nc:
+    with NoteContext(
+        NOTEFILE, (SearchType.TIMESTAMP, flattened), headers_only=args.d
+    ) as nc:
         for inst in nc:
             printout(inst, time_only=args.d)
 
@@ -3501,9 +7376,34 @@ def cmd_remove(ctx):
         sys.exit(2)
 
     with NoteContext(NOTEFILE, (SearchType.TIMESTAMP, flattened)) as nc:
-        for inst in nc:
-            Note.delete(NOTEFILE, int(args.additional_args[1]))
-            Note.commit(NOTEFILE)
+        if nc:
+            # one delete covers every note sharing the timestamp
+            with Note.transaction(NOTEFILE) as txn:
+                txn.delete(flattened)
+
+
+def cmd_compact(ctx):
+    """COMPACT: fold tombstoned deletes away; `jot compact` / `jot compact <ratio>`."""
+    args = ctx.args
+    NOTEFILE = ctx.notefile
+    if len(args.additional_args) not in (1, 2):
+        _arity_error(args)
+    ratio = None
+    if len(args.additional_args) == 2:
+        try:
+            ratio = float(args.additional_args[1])
+        except ValueError:
+            print(
+                f"jot: expected a ratio like 0.25, got '{args.additional_args[1]}'",
+                file=sys.stderr,
+            )
+            sys.exit(2)
+
+    dead, total = Note.compact(NOTEFILE, ratio)
+    if dead:
+        print(f"Compacted {dead} of {total} records out of {NOTEFILE}")
+    else:
+        print(f"Nothing to compact in {NOTEFILE} ({total} records)")
 
 
 def cmd_show_tag(ctx):
@@ -3514,7 +7414,9 @@ def cmd_show_tag(ctx):
         _arity_error(args)
     # show all notes with tag
     flattened = args.additional_args[1]
-    with NoteContext(NOTEFILE, (SearchType.TAG, flattened)) as nc:
+    with NoteContext(
+        NOTEFILE, (SearchType.TAG, flattened), headers_only=args.d
+    ) as nc:
         for inst in nc:
             printout(inst, time_only=args.d)
 
@@ -3544,7 +7446,7 @@ def cmd_sbs(ctx):
     if args.additional_args[1] in SHORTCUTS["MOST_RECENTLY_WRITTEN_HERE"]:
         # only display the most recently created note in this PWD
         with NoteContext(
-            NOTEFILE, (SearchType.DIRECTORY, os.getcwd())
+            NOTEFILE, (SearchType.DIRECTORY, os.getcwd()), newest=1
         ) as nc:
             for inst in nc:
                 last_note = inst
@@ -3553,7 +7455,7 @@ def cmd_sbs(ctx):
         in SHORTCUTS["MOST_RECENTLY_WRITTEN_ALLTIME"]
     ):
         # last written note
-        with NoteContext(NOTEFILE, (SearchType.ALL, "")) as nc:
+        with NoteContext(NOTEFILE, (SearchType.ALL, ""), newest=1) as nc:
             for inst in nc:
                 last_note = inst
     else:
@@ -3565,13 +7467,17 @@ def cmd_sbs(ctx):
                 file=sys.stderr,
             )
             sys.exit(2)
-        with NoteContext(NOTEFILE, (SearchType.ALL, "")) as nc:
-            for inst in nc:
-                last_note = inst
-                # falls back to very last note written if provided int
-                # doesnt match any existing note
-                if inst.now == user_timestamp:
-                    break
+        with NoteContext(
+            NOTEFILE, (SearchType.TIMESTAMP, user_timestamp), limit=1
+        ) as nc:
+            found = nc
+        if not found:
+            # falls back to very last note written if provided int
+            # doesnt match any existing note
+            with NoteContext(NOTEFILE, (SearchType.ALL, ""), newest=1) as nc:
+                found = nc
+        for inst in found:
+            last_note = inst
 
     try:
         if not last_note.message.strip():  # falsy message
@@ -3652,12 +7558,17 @@ COMMANDS = {
     "MOST_RECENTLY_WRITTEN_HERE": cmd_last,
     "MATCH_NOTE_NAIVE": cmd_match,
     "MATCH_NOTE_NAIVE_I": cmd_search,
+    "MATCH_NOTE_REGEX": cmd_regex,
+    "MATCH_NEAR_WORDS": cmd_fuzzy,
+    "MATCH_QUERY": cmd_query,
     "DELETE_MOST_RECENT_PWD": cmd_pop,
     "BULK_MANAGE_NOTES": cmd_scoop,
     "NOTES_REFERENCING_ABSENT_DIRS": cmd_stray,
     "SHOW_ALL": cmd_dump,
     "MATCH_TIMESTAMP": cmd_ts,
+    "MATCH_TIME_RANGE": cmd_since,
     "REMOVE_BY_TIMESTAMP": cmd_remove,
+    "COMPACT": cmd_compact,
     "HOMENOTES": cmd_home,
     "SHOW_TAG": cmd_show_tag,
     "MESSAGE_ONLY": cmd_payload,
@@ -3736,6 +7647,8 @@ def main():
         "  jot c 16952...   (catgpt)/send note matching timestamp to openai endpoint.\n"
         "  jot cat a1 b2 .. (catenate) all notes matching each of the provided tags to a convo\n"
         "  jot d            (dump)/show all notes from all time, everywhere\n"
+        "  jot d --page-size 100 [--after 16952...@1234]\n"
+        "                   (dump) 100 notes at a time, starting after the cursor the last page printed\n"
         "  jot h            show note (head)--show the last 1 note written, among all notes\n"
         "  jot h 3          show note (head)--show the last n notes written, among all notes\n"
         "  jot h ~3         show note (head)--show n-th from last note, among all notes\n"
@@ -3747,11 +7660,26 @@ def main():
         "  jot p            (pop)/delete the last-written note in this pwd\n"
         "  jot pl           show last-written note, message (payload) only, omitting headers\n"
         "  jot pl 16952...  show note matching timestamp/s, concatenated, message (payload) only\n\n"
+        "  jot re 'ta+bby'  (regex) python regular expression <pattern> within message payload\n"
+        "  jot ft tabyy     (fuzzy) tags and message words within a few typos of <term>; `jot ft tabyy 1` sets the edits\n"
+        "  jot q 'tag:prod AND (msg:timeout OR ctx:kubectl) AND NOT dir:/tmp/*'\n"
+        "                   (query) fields tag: msg: ctx: dir: tree: ts: since: until: re: joined by\n"
+        "                   AND/OR/NOT and parentheses; cheapest, most selective terms run first\n"
         "  jot r 16952...   (remove) note/s matching timestamp value\n"
+        "  jot compact      (compact) rewrite the notefile without removed notes, once\n"
+        "                   they pass CATJOT_COMPACT_RATIO; `jot compact 0` always folds\n"
         "  jot s tabby      (search) case-insensitive <term> within message payload\n"
+        "  jot s --any E1001 E2002 timeout\n"
+        "                   (search) notes holding any (--all: every one) of the terms, each with the terms\n"
+        "                   it holds; with -d one `timestamp term..` line per note. `jot m --any` for exact case\n"
+        "  jot s --rank 'tabby cat'\n"
+        "                   (search) the 10 notes most relevant to any of the words, best first; -n N for N\n"
         "  jot scoop        (scoop) list all notes in $EDITOR, allowing bulk deleting of records\n"
         "  jot stray        display all (strays) which are notes whose pwd no longer exist in this filesystem\n"
-        "  jot ts 16952...  search all notes, filtering by (timestamp)\n\n"
+        "  jot ts 16952...  search all notes, filtering by (timestamp)\n"
+        "  jot since 2026-10-01 [2026-10-08]\n"
+        "                   notes written (since) a date, timestamp, weekday or age (3d, 12h),\n"
+        "                   and before the optional second one\n\n"
         "  jot chat xxxx    (chat) with catgpt, sending a single line/jot/pipe to an openai api endpoint.\n"
         "                   you can also pipe to it: `cat myfile | jot chat summarize this for me`\n"
         "  jot convo        (convo) have an extended conversation, where each user prompt and gpt reply\n"
@@ -3797,11 +7725,40 @@ def main():
         help="use this jotfile for all reads/writes (supersedes CATJOT_FILE)",
     )
     parser.add_argument("additional_args", nargs="*", help="argument values")
+    parser.add_argument(
+        "--any",
+        action="store_true",
+        help="search for several terms at once; notes holding any of them",
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="search for several terms at once; notes holding all of them",
+    )
+    parser.add_argument(
+        "--rank",
+        action="store_true",
+        help="rank search results by relevance (BM25), best first",
+    )
+    parser.add_argument(
+        "-n", type=int, default=None, help="show at most n ranked results"
+    )
+    parser.add_argument(
+        "--page-size", type=int, default=None, help="jot d: show notes n at a time"
+    )
+    parser.add_argument(
+        "--after",
+        type=str,
+        default=None,
+        help="jot d: start after this note; the cursor a page's footer prints, "
+        "or a timestamp",
+    )
     parser.add_argument(
         "-d", action="store_true", help="only return (date)/timestamps for match"
     )
 
-    args = parser.parse_args()
+    # intermixed, so flags may follow the verb: `jot s --rank tabby`
+    args = parser.parse_intermixed_args()
 
     NOTEFILE = Note.NOTEFILE
 
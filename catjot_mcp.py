@@ -133,6 +133,13 @@ _FIELD_SEARCH_TYPES = {
 }
 
 
+_QUERY_HINT = (
+    "terms are field:value with field one of tag, msg, ctx, dir, tree, ts, "
+    'since, until, re; quote values holding spaces (msg:"disk full"); '
+    "combine with AND, OR, NOT and parentheses"
+)
+
+
 def _hydrate(note):
     """Project a Note into the flat dict shape MCP callers consume."""
     return {
@@ -144,23 +151,49 @@ def _hydrate(note):
     }
 
 
-def _read_notes(criteria, logic="and"):
+def _notes():
+    """Return every note in ``Note.NOTEFILE``, current as of this call.
+
+    The server lives as long as the host session and answers every call from
+    the same notefile, so it reads through ``Note.current``: the file is
+    parsed once, and each later call only parses what was appended since.
+    Raises like ``Note.match`` would (``FileNotFoundError`` and all).
+    """
+    return Note.current(Note.NOTEFILE)
+
+
+def _cache():
+    """The query cache shared by the read tools (see ``catjot.QueryCache``)."""
+    return catjot.QueryCache.shared()
+
+
+def _read_notes(criteria, logic="and", limit=None, order="asc"):
     """Return hydrated notes matching *criteria*, tolerating a missing file.
 
-    Reads via ``Note.match`` directly (not ``NoteContext``) so a
+    Reads via ``Note.filter`` over ``_notes()`` (not ``NoteContext``) so a
     ``FileNotFoundError`` surfaces as an ordinary exception the caller can turn
     into an error string, rather than ``NoteContext``'s stdout-printing
     ``sys.exit``.  ``bind_notefile`` already touch-creates the file, so this is
-    belt-and-suspenders.
+    belt-and-suspenders.  The matches go through ``QueryCache``, so asking
+    the same thing twice reads the notes once.  *order* "desc" lists them
+    newest first and *limit* keeps that many, as for ``Note.match``.
     """
-    return [_hydrate(n) for n in Note.match(Note.NOTEFILE, criteria, logic=logic)]
+    from itertools import islice
+
+    found = _cache().match(Note.NOTEFILE, criteria, logic, source=_notes)
+    if order == "desc":
+        found = reversed(found)
+    return [_hydrate(n) for n in islice(found, limit)]
 
 
-def _handle_mcp_search_notes(field, query):
+def _handle_mcp_search_notes(field, query, limit=None, fuzzy=False):
     """Search one note field and return the full matching notes as JSON.
 
     OR-combines whitespace-split terms within the field, de-duplicating by
-    timestamp while preserving on-disk order.
+    timestamp while preserving on-disk order.  With *limit*, the matches are
+    ranked by ``Note.rank`` (BM25) and only the best *limit* are hydrated,
+    most relevant first.  *fuzzy* widens a tag or message search to the
+    words within a few typos of each term, as for ``jot llm``.
     """
     st = _FIELD_SEARCH_TYPES.get(field)
     if st is None:
@@ -171,16 +204,62 @@ def _handle_mcp_search_notes(field, query):
             }
         )
     seen = {}
-    for word in query.split():
-        for note in Note.match(Note.NOTEFILE, [(st, word)], logic="or"):
+    terms = query.split()
+    if fuzzy and st in catjot._FUZZY_KINDS:
+        vocab = catjot.FuzzyIndex.vocabulary(Note.NOTEFILE)
+        terms = vocab.expand(terms, catjot._FUZZY_KINDS[st])
+    if limit is not None:
+        test = Note.compile([(st, word) for word in terms], logic="or")
+        if test is None:
+            return json.dumps([])
+        ranked = Note.rank(_notes(), terms, int(limit), test)
+        return json.dumps([_hydrate(n) for n in ranked])
+    # cached words answer at once; the rest share one pass over the notes
+    queries = [([(st, word)], "or") for word in terms]
+    for found in _cache().match_many(Note.NOTEFILE, queries, source=_notes):
+        for note in found:
             seen.setdefault(note.now, note)
     return json.dumps([_hydrate(n) for n in seen.values()])
 
 
-def _handle_mcp_list_notes(directory, tree=False):
-    """Return every note written from *directory* (or its subtree when tree)."""
+def _handle_mcp_query_notes(query, limit=None, order="asc"):
+    """Return the notes matching a boolean field query (see ``NoteQuery``).
+
+    *query* reads like ``tag:prod AND (msg:timeout OR ctx:kubectl) AND NOT
+    dir:/tmp/*``; a malformed one comes back as an error object naming the
+    problem.  *limit* and *order* behave as for ``list_notes``.
+    """
+    from itertools import islice
+
+    if order not in ("asc", "desc"):
+        return json.dumps({"error": f"order must be 'asc' or 'desc', got: {order!r}"})
+    try:
+        parsed = catjot.NoteQuery(query)
+    except ValueError as err:
+        return json.dumps({"error": f"bad query: {err}", "hint": _QUERY_HINT})
+    found = _cache().lookup(
+        Note.NOTEFILE,
+        parsed.key(),
+        parsed.plan()[0],
+        lambda: parsed.filter(_notes()),
+    )
+    if order == "desc":
+        found = reversed(found)
+    limit = None if limit is None else max(int(limit), 0)
+    return json.dumps([_hydrate(n) for n in islice(found, limit)])
+
+
+def _handle_mcp_list_notes(directory, tree=False, limit=None, order="asc"):
+    """Return every note written from *directory* (or its subtree when tree).
+
+    *limit* caps the list; *order* "desc" lists newest first, so
+    ``limit=5, order="desc"`` is the five latest notes.
+    """
+    if order not in ("asc", "desc"):
+        return json.dumps({"error": f"order must be 'asc' or 'desc', got: {order!r}"})
     st = SearchType.TREE if tree else SearchType.DIRECTORY
-    return json.dumps(_read_notes([(st, directory)]))
+    limit = None if limit is None else max(int(limit), 0)
+    return json.dumps(_read_notes([(st, directory)], limit=limit, order=order))
 
 
 def _handle_mcp_get_note(timestamp):
@@ -226,7 +305,8 @@ def register_note_tools(allow_writes=False):
             "notes. A note has four searchable fields — 'tag' (space-separated "
             "labels), 'context' (the command or summary that produced the "
             "note), 'message' (the free-form body), and 'directory' (the path "
-            "it was written from). Whitespace-separated terms are OR-combined."
+            "it was written from). Whitespace-separated terms are OR-combined. "
+            "Pass 'limit' to get only the best-ranked few."
         ),
         parameters={
             "type": "object",
@@ -240,11 +320,60 @@ def register_note_tools(allow_writes=False):
                     "type": "string",
                     "description": "Space-separated search terms.",
                 },
+                "limit": {
+                    "type": "integer",
+                    "description": (
+                        "Return only this many notes, the most relevant "
+                        "first, instead of every match in file order."
+                    ),
+                },
+                "fuzzy": {
+                    "type": "boolean",
+                    "description": (
+                        "For 'tag' and 'message': also match tags or words "
+                        "within a few typos of each term."
+                    ),
+                },
             },
             "required": ["field", "query"],
         },
         handler=_handle_mcp_search_notes,
     )
+    register_tool(
+        name="query_notes",
+        description=(
+            "Find catjot notes with a boolean query over their fields, e.g. "
+            "'tag:prod AND (msg:timeout OR ctx:kubectl) AND NOT dir:/tmp/*'. "
+            "Fields: tag, msg (message body), ctx (context), dir (exact "
+            "directory; a trailing * takes the subtree), ts (timestamp, or "
+            "A..B range), since/until (date, timestamp or age like 3d), re "
+            "(regex on the message). Text matches are case-insensitive "
+            "substrings. Quote values holding spaces."
+        ),
+        parameters={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "The boolean query.",
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Return at most this many notes.",
+                },
+                "order": {
+                    "type": "string",
+                    "enum": ["asc", "desc"],
+                    "description": (
+                        "'asc' (default) lists oldest first, 'desc' newest "
+                        "first; with limit, 'desc' gives the latest matches."
+                    ),
+                },
+            },
+            "required": ["query"],
+        },
+        handler=_handle_mcp_query_notes,
+    )
     register_tool(
         name="list_notes",
         description=(
@@ -262,6 +391,18 @@ def register_note_tools(allow_writes=False):
                     "type": "boolean",
                     "description": "Include the whole subtree, not just this exact directory.",
                 },
+                "limit": {
+                    "type": "integer",
+                    "description": "Return at most this many notes.",
+                },
+                "order": {
+                    "type": "string",
+                    "enum": ["asc", "desc"],
+                    "description": (
+                        "'asc' (default) lists oldest first, 'desc' newest "
+                        "first; with limit, 'desc' gives the latest notes."
+                    ),
+                },
             },
             "required": ["directory"],
         },
@@ -480,6 +621,7 @@ def serve(notefile=None, allow_writes=False, stdin=None):
         response = handle_message(msg)
         if response is not None:
             _write(response)
+    log("query cache:", json.dumps(_cache().stats()))
 
 
 def main(argv=None):
@@ -27,20 +27,53 @@ def strip_ansi_codes(text):
     return ansi_escape.sub("", text)
 
 
+class NotefileCase(unittest.TestCase):
+    """Base for tests that work on a private copy of a notefile.
+
+    setUp() copies FIXTURE (None: start with no file) to self.jotfile, named
+    NAME, inside a TemporaryDirectory (self.tmpdir).  With INDEXED, the
+    fixtures are tiny, so _Sidecar.MIN_BYTES is patched to 0 to build
+    sidecars regardless.  All of it is undone by cleanups.
+    """
+
+    FIXTURE = FIXED_CATNOTE
+    NAME = "notes.jot"
+    INDEXED = False
+
+    def setUp(self):
+        import shutil
+        import tempfile
+        import catjot
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.jotfile = os.path.join(self.tmpdir.name, self.NAME)
+        if self.FIXTURE is not None:
+            shutil.copy(self.FIXTURE, self.jotfile)
+        if self.INDEXED:
+            self.patch(catjot._Sidecar, "MIN_BYTES", 0)
+
+    def patch(self, target, attribute, value):
+        """patch.object() for the rest of the test."""
+        patcher = patch.object(target, attribute, value)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
 class TestTaker(unittest.TestCase):
     def setup(self):
         pass
 
     def tearDown(self):
-        try:
-            remove(TMP_CATNOTE)
-        except FileNotFoundError:
-            pass
+        import glob
 
-        try:
-            remove(f"{TMP_CATNOTE}.new")
-        except FileNotFoundError:
-            pass
+        # the notefile and everything written beside it: .new, .old,
+        # .journal from commits, and any sidecar index
+        for leftover in glob.glob(f"{TMP_CATNOTE}*"):
+            try:
+                remove(leftover)
+            except FileNotFoundError:
+                pass
 
         import shutil, os
 
@@ -1336,6 +1369,25 @@ class TestFieldSearchHandlers(unittest.TestCase):
             [1694747662, 1694747797, 1694747841, 1694748108],
         )
 
+    def test_limit_ranks_matches(self):
+        from catjot import make_field_search_handler, _FIELD_SEARCH_TYPES
+
+        handler = make_field_search_handler(_FIELD_SEARCH_TYPES["directory"])
+        everything = json.loads(handler("/home/user"))
+        ranked = json.loads(handler("/home/user", limit=2))
+        # no query word in any note: equal scores, the newest two win
+        self.assertEqual(ranked, sorted(everything, reverse=True)[:2])
+        handler = make_field_search_handler(_FIELD_SEARCH_TYPES["message"])
+        self.assertEqual(json.loads(handler("hello", limit=5)), [1694747662])
+
+    def test_fuzzy_widens_tag_and_message(self):
+        from catjot import make_search_notes_handler
+
+        handler = make_search_notes_handler()
+        self.assertEqual(json.loads(handler("tag", "projcet1")), [])
+        self.assertEqual(json.loads(handler("tag", "projcet1", fuzzy=True)), [1694747662])
+        self.assertEqual(json.loads(handler("message", "helo", fuzzy=True)), [1694747662])
+
     def test_search_notes_handler_routes_by_field(self):
         from catjot import make_search_notes_handler
 
@@ -1734,5 +1786,1794 @@ class TestCliBadInput(unittest.TestCase):
         self.assertNotIn("jot:", result.stderr)
 
 
+class TestNoteIndex(NotefileCase):
+    """The <notefile>.idx sidecar: seek-based timestamp lookups kept in sync."""
+
+    NAME = "indexed.jot"
+    INDEXED = True
+
+    def setUp(self):
+        import catjot
+
+        super().setUp()
+        self.NoteIndex = catjot.NoteIndex
+
+    def test_lookup_matches_scan(self):
+        scanned = list(Note.iterate(self.jotfile))
+        for expected in scanned:
+            found = list(Note.match(self.jotfile, (SearchType.TIMESTAMP, expected.now)))
+            self.assertEqual(found, [expected])
+        self.assertTrue(os.path.exists(self.jotfile + ".idx"))
+
+        found = list(Note.lookup(self.jotfile, {1694747797, 1694955555, 1}))
+        self.assertEqual([n.now for n in found], [1694747797, 1694955555])
+
+    def test_spans_reproduce_fault_tolerant_parse(self):
+        import shutil
+        import catjot
+
+        for fixture in ("tests/broken.jot", "tests/broken2.jot", "tests/edgecase.jot"):
+            shutil.copy(fixture, self.jotfile)
+            index = self.NoteIndex.open(self.jotfile)
+            offsets = sorted(index.data["spans"])
+            with patch.object(catjot.NoteCache, "USE", False):  # parse, not cache
+                expected = list(Note.iterate(fixture))
+            self.assertEqual(list(index.notes(offsets)), expected)
+
+    def test_append_extends_index_without_rebuild(self):
+        self.NoteIndex.open(self.jotfile)
+        Note.append(self.jotfile, Note.jot("indexed append", now=1700000000))
+
+        index = self.NoteIndex(self.jotfile)
+        self.assertTrue(index.load())  # delta chain still valid: no rebuild
+        self.assertEqual(
+            [n.message for n in index.notes(index.lookup([1700000000]))],
+            ["indexed append\n"],
+        )
+
+    def test_external_write_makes_index_stale(self):
+        self.NoteIndex.open(self.jotfile)
+        with open(self.jotfile, "a") as f:
+            f.write("^-^\nDirectory:/tmp\nDate:1700000001\nTag:\nContext:\nMessage:by hand\n\n")
+
+        self.assertFalse(self.NoteIndex(self.jotfile).load())
+        found = list(Note.match(self.jotfile, (SearchType.TIMESTAMP, 1700000001)))
+        self.assertEqual([n.message for n in found], ["by hand\n"])
+        self.assertTrue(self.NoteIndex(self.jotfile).load())
+
+    def test_commit_discards_index(self):
+        self.NoteIndex.open(self.jotfile)
+        Note.delete(self.jotfile, 1694747797)
+        Note.commit(self.jotfile)
+        self.assertFalse(os.path.exists(self.jotfile + ".idx"))
+
+        index = self.NoteIndex.open(self.jotfile)  # rebuilt on demand
+        self.assertTrue(self.NoteIndex(self.jotfile).load())
+        self.assertEqual(index.lookup([1694747797]), [])
+        self.assertEqual(
+            len(list(Note.match(self.jotfile, (SearchType.TIMESTAMP, 1694747841)))), 1
+        )
+
+    def test_disabled_index_scans(self):
+        import catjot
+
+        with patch.object(catjot._Sidecar, "ENABLED", False):
+            found = list(Note.match(self.jotfile, (SearchType.TIMESTAMP, 1694747662)))
+        self.assertEqual(len(found), 1)
+        self.assertFalse(os.path.exists(self.jotfile + ".idx"))
+
+
+class TestNoteCache(NotefileCase):
+    """The <notefile>.cache snapshot: full reads without parsing."""
+
+    NAME = "cached.jot"
+    INDEXED = True
+
+    def setUp(self):
+        import catjot
+
+        super().setUp()
+        self.patch(catjot.NoteCache, "USE", True)
+        self.NoteCache = catjot.NoteCache
+
+    def _parsed(self):
+        with patch.object(self.NoteCache, "USE", False):
+            return [(n, n.context, n.message) for n in Note.iterate(self.jotfile)]
+
+    def _cached(self):
+        notes = list(Note.iterate(self.jotfile))
+        self.assertTrue(self.NoteCache(self.jotfile).load())
+        return [(n, n.context, n.message) for n in notes]
+
+    def test_same_notes_as_parse(self):
+        import shutil
+
+        for fixture in ("tests/broken.jot", "tests/broken2.jot", "tests/edgecase.jot"):
+            shutil.copy(fixture, self.jotfile)
+            self.assertEqual(self._cached(), self._parsed())
+            # second read comes straight from the snapshot
+            self.assertEqual(self._cached(), self._parsed())
+
+    def test_append_delete_and_amend_keep_cache_fresh(self):
+        self._cached()
+        Note.append(self.jotfile, Note.jot("cached append", now=1700000000))
+        self.assertTrue(self.NoteCache(self.jotfile).load())
+        Note.delete(self.jotfile, 1694747662, tombstone=True)
+        self.assertTrue(self.NoteCache(self.jotfile).load())
+        Note.amend(self.jotfile, context="spliced")
+        Note.commit(self.jotfile)
+        self.assertTrue(self.NoteCache(self.jotfile).load())
+        self.assertEqual(self._cached(), self._parsed())
+        self.assertEqual(list(Note.iterate(self.jotfile))[-1].context, "spliced")
+
+    def test_writes_it_cannot_describe_go_stale(self):
+        self._cached()
+        with open(self.jotfile, "a") as f:
+            f.write("^-^\nDirectory:/tmp\nDate:1700000001\nTag:\nContext:\nMessage:x\n\n")
+        self.assertFalse(self.NoteCache(self.jotfile).load())
+        self.assertEqual(self._cached(), self._parsed())
+
+        # a message carrying its own record boundary is two records on disk
+        smuggled = "one\n\n^-^\nDirectory:/tmp\nDate:1700000002\nTag:\nContext:\nMessage:two"
+        Note.append(self.jotfile, Note.jot(smuggled, now=1700000003))
+        self.assertFalse(self.NoteCache(self.jotfile).load())
+        self.assertEqual(self._cached(), self._parsed())
+
+    def test_disabled_cache_parses(self):
+        with patch.object(self.NoteCache, "USE", False):
+            list(Note.iterate(self.jotfile))
+        self.assertFalse(os.path.exists(self.jotfile + ".cache"))
+
+    def test_header_only_reads_skip_cache(self):
+        light = list(Note.iterate(self.jotfile, headers_only=True))
+        self.assertFalse(os.path.exists(self.jotfile + ".cache"))
+        expected = [(n, n.context, n.message) for n in light]
+        self._cached()
+        with patch.object(self.NoteCache, "notes", side_effect=AssertionError):
+            light = list(Note.iterate(self.jotfile, headers_only=True))
+        self.assertEqual([(n, n.context, n.message) for n in light], expected)
+
+
+class TestTagIndex(NotefileCase):
+    """The <notefile>.tags sidecar: tag queries read only tagged records."""
+
+    FIXTURE = "tests/bellvue.jot"
+    NAME = "tagged.jot"
+    INDEXED = True
+
+    def setUp(self):
+        import catjot
+
+        super().setUp()
+        self.TagIndex = catjot.TagIndex
+
+    def _scanned(self, criteria, logic="and"):
+        return list(Note.filter(Note.iterate(self.jotfile), criteria, logic))
+
+    def test_tag_queries_match_scan(self):
+        self.TagIndex.open(self.jotfile)  # built by one scan, then never again
+        for criteria, logic in (
+            ((SearchType.TAG, "system_role"), "and"),
+            ([(SearchType.TAG, "secret"), (SearchType.TAG, "garden")], "and"),
+            ([(SearchType.TAG, "secret"), (SearchType.TAG, "facade")], "or"),
+            ([(SearchType.TAG, "secret"), (SearchType.TREE, "/story")], "and"),
+            ((SearchType.TAG, "no-such-tag"), "and"),
+        ):
+            expected = self._scanned(criteria, logic)
+            with patch.object(Note, "_records", side_effect=AssertionError):
+                found = list(Note.match(self.jotfile, criteria, logic))
+            self.assertEqual(found, expected, criteria)
+        self.assertTrue(os.path.exists(self.jotfile + ".tags"))
+
+    def test_writes_keep_index_fresh(self):
+        self.TagIndex.open(self.jotfile)
+        Note.append(self.jotfile, Note.jot("new", tag="fresh system_role", now=1))
+        victim = self._scanned((SearchType.TAG, "system_role"))[0].now
+        Note.delete(self.jotfile, victim, tombstone=True)
+        Note.amend(self.jotfile, tag="amended")
+        Note.commit(self.jotfile)
+
+        index = self.TagIndex(self.jotfile)
+        self.assertTrue(index.load())
+        for tag in ("fresh", "system_role", "amended"):
+            expected = self._scanned((SearchType.TAG, tag))
+            self.assertTrue(expected)
+            self.assertEqual(list(index.notes(index.tagged([tag]))), expected)
+        survivors = index.notes(index.tagged(["system_role"]))
+        self.assertNotIn(victim, [n.now for n in survivors])
+
+
+class TestDirIndex(NotefileCase):
+    """The <notefile>.dirs sidecar: directory queries and `jot` counts."""
+
+    FIXTURE = None
+    NAME = "dirs.jot"
+    INDEXED = True
+
+    def setUp(self):
+        import catjot
+
+        super().setUp()
+        with open(self.jotfile, "w") as out:
+            for path in ("tests/bellvue.jot", "tests/broken.jot"):
+                with open(path) as f:
+                    out.write(f.read())
+        self.DirIndex = catjot.DirIndex
+        self.DirIndex.open(self.jotfile)
+
+    def _scanned(self, criteria, logic="and"):
+        return list(Note.filter(Note.iterate(self.jotfile), criteria, logic))
+
+    def test_directory_queries_match_scan(self):
+        for criteria, logic in (
+            ((SearchType.DIRECTORY, "/story/character"), "and"),
+            ((SearchType.TREE, "/story"), "and"),
+            ((SearchType.TREE, "/story/loc"), "and"),
+            ([(SearchType.TREE, "/story"), (SearchType.DIRECTORY, "/home/user")], "or"),
+            ([(SearchType.TREE, "/system"), (SearchType.MESSAGE_I, "the")], "and"),
+        ):
+            expected = self._scanned(criteria, logic)
+            self.assertTrue(expected, criteria)
+            with patch.object(Note, "_records", side_effect=AssertionError):
+                found = list(Note.match(self.jotfile, criteria, logic))
+            self.assertEqual(found, expected, criteria)
+
+    def test_census_counts_like_a_scan(self):
+        victim = self._scanned((SearchType.DIRECTORY, "/story/character"))[0].now
+        Note.delete(self.jotfile, victim, tombstone=True)
+        Note.append(self.jotfile, Note.jot("here", pwd="/story/character", now=1))
+        self.assertTrue(self.DirIndex(self.jotfile).load())
+
+        everything = list(Note.iterate(self.jotfile))
+        for pwd in ("/story/character", os.getcwd(), "/nowhere"):
+            expected = [n for n in everything if n.pwd == pwd]
+            with patch.object(Note, "_records", side_effect=AssertionError):
+                here, total = Note.census(self.jotfile, pwd)
+            self.assertEqual((here, total), (expected, len(everything)), pwd)
+        self.assertNotIn(victim, [n.now for n in here])
+
+
+class TestTextIndex(NotefileCase):
+    """The <notefile>.words sidecar: substring searches through word postings."""
+
+    FIXTURE = "tests/bellvue.jot"
+    NAME = "words.jot"
+    INDEXED = True
+
+    def setUp(self):
+        import catjot
+
+        super().setUp()
+        self.TextIndex = catjot.TextIndex
+        self.TextIndex.open(self.jotfile)
+
+    def _scanned(self, criteria, logic="and"):
+        return list(Note.filter(Note.iterate(self.jotfile), criteria, logic))
+
+    def test_searches_match_scan_without_parsing(self):
+        for criteria, logic in (
+            ((SearchType.MESSAGE_I, "RAVENWOOD"), "and"),
+            ((SearchType.MESSAGE_I, "avenwoo"), "and"),  # inside a word
+            ((SearchType.MESSAGE, "Ravenwood Manor"), "and"),
+            ((SearchType.MESSAGE, "ravenwood manor"), "and"),
+            ([(SearchType.MESSAGE_I, "hedge"), (SearchType.MESSAGE_I, "ivy")], "or"),
+            ([(SearchType.MESSAGE_I, "manor"), (SearchType.MESSAGE, "hedge")], "and"),
+        ):
+            expected = self._scanned(criteria, logic)
+            with patch.object(Note, "_records", side_effect=AssertionError):
+                found = list(Note.match(self.jotfile, criteria, logic))
+            self.assertEqual(found, expected, criteria)
+        self.assertTrue(self._scanned((SearchType.MESSAGE_I, "avenwoo")))
+
+    def test_needles_without_words_are_scanned(self):
+        index = self.TextIndex(self.jotfile)
+        self.assertTrue(index.load())
+        self.assertIsNone(index.candidates([(SearchType.MESSAGE, " ... ")]))
+        criteria = (SearchType.MESSAGE, ". ")
+        found = list(Note.match(self.jotfile, criteria))
+        self.assertEqual(found, self._scanned(criteria))
+
+    def test_writes_keep_index_fresh(self):
+        Note.append(self.jotfile, Note.jot("Zebras graze", context="ΣΟΦΙΑ", now=1))
+        Note.amend(self.jotfile, context="sofia")
+        Note.commit(self.jotfile)
+        index = self.TextIndex(self.jotfile)
+        self.assertTrue(index.load())
+        for criteria in ((SearchType.MESSAGE_I, "zebra"), (SearchType.CONTEXT, "sofi")):
+            offsets = index.candidates([criteria])
+            self.assertEqual(list(index.notes(offsets)), self._scanned(criteria))
+        self.assertEqual(index.candidates([(SearchType.CONTEXT_I, "σοφ")]), [])
+
+
+class TestTrigramIndex(NotefileCase):
+    """The <notefile>.tri sidecar and `jot re`: exact substring/regex search."""
+
+    FIXTURE = "tests/bellvue.jot"
+    NAME = "grams.jot"
+    INDEXED = True
+
+    def setUp(self):
+        import catjot
+
+        super().setUp()
+        self.patch(catjot.TrigramIndex, "USE", True)
+        self.patch(catjot.TextIndex, "USE", False)
+        self.TrigramIndex = catjot.TrigramIndex
+        self.TrigramIndex.open(self.jotfile)
+
+    def _scanned(self, criteria, logic="and"):
+        return list(Note.filter(Note.iterate(self.jotfile), criteria, logic))
+
+    def test_literals_every_match_needs(self):
+        literals = self.TrigramIndex.literals
+        self.assertEqual(literals(r"ravenwood\s+manor"), ["ravenwood", "manor"])
+        self.assertEqual(literals(r"hedge(s|row)?"), ["hedge"])
+        self.assertEqual(literals(r"ivy|moss"), [])
+        self.assertEqual(literals(r"(?i)manor"), [])
+
+    def test_searches_match_scan_without_parsing(self):
+        for criteria, logic in (
+            ((SearchType.REGEX, r"Ravenwood\s+Manor"), "and"),
+            ((SearchType.REGEX, r"hedges?\b"), "and"),
+            ((SearchType.MESSAGE, "d, ov"), "and"),
+            ((SearchType.CONTEXT_I, "GARDEN"), "and"),
+            ([(SearchType.REGEX, "ivy"), (SearchType.MESSAGE, "Manor")], "or"),
+        ):
+            expected = self._scanned(criteria, logic)
+            with patch.object(Note, "_records", side_effect=AssertionError):
+                found = list(Note.match(self.jotfile, criteria, logic))
+            self.assertEqual(found, expected, criteria)
+        self.assertTrue(self._scanned((SearchType.REGEX, r"hedges?\b")))
+
+    def test_unnarrowed_patterns_are_scanned(self):
+        for pattern in (r"(?i)MANOR", r"iv[y]|mo+ss", "^The"):
+            criteria = (SearchType.REGEX, pattern)
+            found = list(Note.match(self.jotfile, criteria))
+            self.assertEqual(found, self._scanned(criteria), pattern)
+
+    def test_writes_keep_index_fresh(self):
+        Note.append(self.jotfile, Note.jot("a ~~~ line", now=1))
+        Note.amend(self.jotfile, context="[[spliced]]")
+        Note.commit(self.jotfile)
+        index = self.TrigramIndex(self.jotfile)
+        self.assertTrue(index.load())
+        for criteria in ((SearchType.MESSAGE, "~~~"), (SearchType.CONTEXT, "[[s")):
+            offsets = index.candidates([criteria])
+            self.assertEqual(list(index.notes(offsets)), self._scanned(criteria))
+
+    def test_regex_command(self):
+        import subprocess
+
+        def jot(*cli_args):
+            return subprocess.run(
+                [sys.executable, "catjot.py", "-f", self.jotfile] + list(cli_args),
+                capture_output=True,
+                text=True,
+            )
+
+        result = jot("re", r"hedges?\b")
+        self.assertEqual(result.returncode, 0)
+        count = len(self._scanned((SearchType.REGEX, r"hedges?\b")))
+        self.assertIn(f"{count} notes matching /hedges?\\b/", result.stdout)
+        result = jot("re", "ivy(")
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("bad pattern", result.stderr)
+
+
+class TestRankedSearch(unittest.TestCase):
+    """Note.rank: BM25 top-k over tag, context and message."""
+
+    def setUp(self):
+        self.notes = [
+            Note.jot("the cat sat on the mat", now=1),
+            Note.jot("the dog chased the cat round the whole garden", now=2),
+            Note.jot("a dog", tag="cat", now=3),
+            Note.jot("the the the", now=4),
+            Note.jot("a cat", now=5),
+        ]
+
+    def _ranked(self, terms, limit=None, test=None):
+        return [n.now for n in Note.rank(self.notes, terms, limit, test)]
+
+    def test_scores_order_the_matches(self):
+        # a tag counts double; a short note beats a long one; a word in
+        # every note but one ("the") adds less than a rare one ("sat")
+        self.assertEqual(self._ranked(["cat"]), [3, 5, 1, 2])
+        self.assertEqual(self._ranked(["the", "sat"])[0], 1)
+        self.assertEqual(self._ranked(["CAT!"]), self._ranked(["cat"]))
+        self.assertEqual(self._ranked(["walrus"]), [])
+
+    def test_limit_keeps_the_best(self):
+        notes = list(Note.iterate("tests/bellvue.jot"))
+        for terms in (["the"], ["manor", "garden"], ["hedges ivy"]):
+            every = Note.rank(notes, terms)
+            self.assertTrue(every, terms)
+            for limit in (0, 1, 3, len(every) + 5):
+                self.assertEqual(Note.rank(notes, terms, limit), every[:limit])
+
+    def test_test_decides_eligibility(self):
+        # eligible notes without a query word tie at zero, newest first
+        test = Note.compile([(SearchType.MESSAGE_I, "dog")])
+        self.assertEqual(self._ranked(["cat"], test=test), [3, 2])
+        self.assertEqual(self._ranked(["walrus"], test=test), [3, 2])
+        self.assertEqual(self._ranked(["walrus"], 1, test), [3])
+
+    def test_rank_command(self):
+        import subprocess
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmp:
+            jotfile = os.path.join(tmp, "ranked.jot")
+            for inst in self.notes:
+                Note.append(jotfile, inst)
+
+            def jot(*cli_args):
+                return subprocess.run(
+                    [sys.executable, "catjot.py", "-f", jotfile] + list(cli_args),
+                    capture_output=True,
+                    text=True,
+                )
+
+            result = jot("s", "--rank", "cat", "-n", "2", "-d")
+            self.assertEqual(result.returncode, 0)
+            self.assertEqual(result.stdout.split(), ["3", "5"])
+            result = jot("s", "--rank", "cat")
+            self.assertIn("4 best notes matching 'cat'", result.stdout)
+
+
+class TestFuzzySearch(NotefileCase):
+    """FuzzyIndex and Note.fuzzy: tags and words within a few edits."""
+
+    FIXTURE = None
+    NAME = "fuzzy.jot"
+
+    def setUp(self):
+        super().setUp()
+        for message, tag, now in (
+            ("rolled the Kubernetes cluster", "ops", 1),
+            ("drained a node", "kubernetes k8s-prod", 2),
+            ("fed the tabby", "cats", 3),
+        ):
+            Note.append(self.jotfile, Note.jot(message, tag=tag, now=now))
+
+    def _fuzzy(self, term, reach=None):
+        return [n.now for n in Note.fuzzy(self.jotfile, term, reach)]
+
+    def test_near_matches_every_word_measured(self):
+        import random
+        from catjot import FuzzyIndex
+
+        random.seed(7)
+        vocab = FuzzyIndex(self.jotfile)
+        rand = lambda: "".join(random.choices("abcD", k=random.randint(1, 7)))
+        for _ in range(300):
+            vocab.add(0, 0, ([rand()], [rand().casefold(), rand().casefold()]))
+        for _ in range(100):
+            term = rand()
+            for reach in (0, 1, 2):
+                expected = sorted(
+                    (w, d)
+                    for w in vocab.data["words"]
+                    for d in [FuzzyIndex.distance(term.casefold(), w.casefold(), 9)]
+                    if d <= reach
+                )
+                found = vocab.near(term, reach)
+                self.assertEqual(sorted(found), expected, (term, reach))
+                self.assertEqual(found, sorted(found, key=lambda wd: (wd[1], wd[0])))
+
+    def test_typos_find_tags_and_words(self):
+        self.assertEqual(self._fuzzy("kuberentes"), [1, 2])
+        self.assertEqual(self._fuzzy("KUBERNETES", 0), [1, 2])
+        self.assertEqual(self._fuzzy("taby"), [3])
+        self.assertEqual(self._fuzzy("kuberentes", 1), [])
+        self.assertEqual(self._fuzzy("walrus"), [])
+
+    def test_sidecar_kept_current(self):
+        import catjot
+
+        with patch.object(catjot._Sidecar, "MIN_BYTES", 0):
+            catjot.FuzzyIndex.open(self.jotfile)
+            self.assertTrue(os.path.exists(self.jotfile + ".vocab"))
+            Note.append(self.jotfile, Note.jot("a tortoiseshell", now=4))
+            vocab = catjot.FuzzyIndex(self.jotfile)
+            self.assertTrue(vocab.load())
+            self.assertEqual(vocab.near("tortoiseshel"), [("tortoiseshell", 1)])
+            self.assertEqual(self._fuzzy("tortoiseshel"), [4])
+
+    def test_fuzzy_command(self):
+        import subprocess
+
+        def jot(*cli_args):
+            return subprocess.run(
+                [sys.executable, "catjot.py", "-f", self.jotfile] + list(cli_args),
+                capture_output=True,
+                text=True,
+            )
+
+        result = jot("ft", "kuberentes", "-d")
+        self.assertEqual(result.stdout.split(), ["1", "2"])
+        result = jot("ft", "kuberentes", "1")
+        self.assertIn("0 notes within 1 edits of 'kuberentes'", result.stdout)
+        self.assertEqual(jot("ft", "tabby", "x").returncode, 2)
+
+
+class TestTimeRange(NotefileCase):
+    """SearchType.TIME_RANGE, its bisected index and `jot since`."""
+
+    FIXTURE = "tests/bellvue.jot"
+    NAME = "ranged.jot"
+    INDEXED = True
+
+    def setUp(self):
+        import catjot
+
+        super().setUp()
+        self.NoteIndex = catjot.NoteIndex
+        self.stamps = sorted(n.now for n in Note.iterate(self.jotfile))
+
+    def _scanned(self, criteria, logic="and"):
+        return list(Note.filter(Note.iterate(self.jotfile), criteria, logic))
+
+    def test_bounds_are_half_open(self):
+        lo, hi = self.stamps[2], self.stamps[5]
+        nows = lambda c, logic="and": sorted(n.now for n in self._scanned(c, logic))
+        self.assertEqual(nows((SearchType.TIME_RANGE, (lo, hi))), self.stamps[2:5])
+        self.assertEqual(nows((SearchType.TIME_RANGE, (None, lo))), self.stamps[:2])
+        self.assertEqual(nows((SearchType.TIME_RANGE, (hi, None))), self.stamps[5:])
+        both = [(SearchType.TIME_RANGE, (lo, None)), (SearchType.TIME_RANGE, (None, hi))]
+        self.assertEqual(nows(both), self.stamps[2:5])
+        either = [(SearchType.TIME_RANGE, (None, lo)), (SearchType.TIME_RANGE, (hi, None))]
+        self.assertEqual(nows(either, "or"), self.stamps[:2] + self.stamps[5:])
+        self.assertIsNone(Note.compile([(SearchType.TIME_RANGE, (hi, lo))]))
+
+    def test_index_answers_out_of_order_writes(self):
+        self.NoteIndex.open(self.jotfile)
+        # a review scheduled far ahead, a backdated note, a buried one
+        Note.append(self.jotfile, Note.jot("future review", now=4102444800))
+        Note.append(self.jotfile, Note.jot("backdated", now=self.stamps[5] - 1))
+        Note.delete(self.jotfile, self.stamps[4], tombstone=True)
+        index = self.NoteIndex(self.jotfile)
+        self.assertTrue(index.load())
+        self.assertEqual(index.data["order"], sorted(index.data["order"]))
+
+        for since, until in (
+            (self.stamps[3], self.stamps[6]),
+            (self.stamps[-1] + 1, None),
+            (self.stamps[5] - 1, self.stamps[5]),
+        ):
+            criteria = (SearchType.TIME_RANGE, (since, until))
+            expected = self._scanned(criteria)
+            self.assertTrue(expected)
+            with patch.object(Note, "_records", side_effect=AssertionError):
+                self.assertEqual(list(Note.match(self.jotfile, criteria)), expected)
+        # most of the file: left to the scan
+        self.assertIsNone(index.candidates([(SearchType.TIME_RANGE, (None, None))]))
+
+    def test_parse_when(self):
+        from time import time
+        from catjot import _parse_when
+
+        self.assertEqual(_parse_when("1695220591"), 1695220591)
+        self.assertEqual(
+            _parse_when("2026-10-01T12:00") - _parse_when("2026-10-01"), 12 * 3600
+        )
+        self.assertAlmostEqual(_parse_when("3d"), time() - 3 * 86400, delta=5)
+        for day in ("yesterday", "tuesday", "SUNDAY"):
+            self.assertLess(_parse_when(day), _parse_when("today"))
+            self.assertGreaterEqual(_parse_when(day), _parse_when("today") - 7 * 86400)
+        for bad in ("soon", "3y", ""):
+            with self.assertRaises(ValueError):
+                _parse_when(bad)
+
+    def test_since_command(self):
+        import subprocess
+
+        def jot(*cli_args):
+            return subprocess.run(
+                [sys.executable, "catjot.py", "-f", self.jotfile] + list(cli_args),
+                capture_output=True,
+                text=True,
+            )
+
+        bounds = str(self.stamps[2]), str(self.stamps[5])
+        result = jot("since", *bounds, "-d")
+        self.assertEqual(sorted(map(int, result.stdout.split())), self.stamps[2:5])
+        result = jot("since", bounds[0])
+        self.assertIn(f"{len(self.stamps) - 2} notes since '{bounds[0]}'", result.stdout)
+        self.assertEqual(jot("since", "whenever").returncode, 2)
+
+
+class TestLimitPushdown(unittest.TestCase):
+    """Note.match(limit=, order=) and NoteContext stop reading early."""
+
+    def setUp(self):
+        self.jotfile = "tests/bellvue.jot"
+        self.notes = list(Note.iterate(self.jotfile))
+
+    def _nows(self, **kwargs):
+        found = Note.match(self.jotfile, (SearchType.ALL, ""), **kwargs)
+        return [n.now for n in found]
+
+    def test_limit_and_order(self):
+        nows = [n.now for n in self.notes]
+        self.assertEqual(self._nows(limit=3), nows[:3])
+        self.assertEqual(self._nows(order="desc", limit=3), nows[::-1][:3])
+        self.assertEqual(self._nows(order="desc", limit=0), [])
+        self.assertEqual(self._nows(limit=len(nows) + 5), nows)
+
+        garden = [(SearchType.MESSAGE_I, "garden")]
+        everything = list(Note.match(self.jotfile, garden, time_only=True))
+        newest = Note.match(self.jotfile, garden, time_only=True, order="desc", limit=2)
+        self.assertEqual(list(newest), everything[::-1][:2])
+
+    def test_desc_limit_reads_only_the_tail(self):
+        real = Note.reverse_iterate
+        read = []
+
+        def counted(src, headers_only=False):
+            for inst in real(src, headers_only):
+                read.append(inst.now)
+                yield inst
+
+        with patch.object(Note, "reverse_iterate", side_effect=counted), patch.object(
+            Note, "iterate", side_effect=AssertionError
+        ):
+            self.assertEqual(len(self._nows(order="desc", limit=2)), 2)
+        self.assertEqual(len(read), 2)
+
+    def test_note_context_limit_order_and_newest(self):
+        criteria = (SearchType.ALL, "")
+        with NoteContext(self.jotfile, criteria, limit=2, order="desc") as nc:
+            self.assertEqual(nc, self.notes[::-1][:2])
+        with NoteContext(self.jotfile, criteria, newest=2) as nc:
+            self.assertEqual(nc, self.notes[-2:])
+        with NoteContext(self.jotfile, criteria, limit=2) as nc:
+            self.assertEqual(nc, self.notes[:2])
+
+
+class TestBatchMatch(unittest.TestCase):
+    """Note.filter_many / match_many answer many queries in one pass."""
+
+    def setUp(self):
+        self.jotfile = "tests/bellvue.jot"
+        self.notes = list(Note.iterate(self.jotfile))
+        first = self.notes[0]
+        self.queries = [
+            ((SearchType.TAG, "garden"), "and"),
+            ([(SearchType.TAG, "system_role")], "or"),
+            ([(SearchType.DIRECTORY, first.pwd)], "and"),
+            ([(SearchType.TIMESTAMP, first.now)], "and"),
+            ([(SearchType.TIMESTAMP, 1)], "and"),
+            ([(SearchType.MESSAGE_I, "manor")], "and"),
+            ([(SearchType.TREE, "/story"), (SearchType.TAG, "garden")], "and"),
+            ([(SearchType.TAG, "garden"), (SearchType.MESSAGE, "ivy")], "or"),
+            ([(SearchType.TAG, "")], "and"),
+            ([(SearchType.ALL, "")], "and"),
+            ([], "or"),
+        ]
+
+    def test_same_answers_as_one_query_at_a_time(self):
+        expected = [list(Note.filter(self.notes, *query)) for query in self.queries]
+        self.assertTrue(all(expected[i] for i in (0, 1, 2, 3, 5, 9)))
+        self.assertEqual(Note.filter_many(self.notes, self.queries), expected)
+        nows = [[n.now for n in found] for found in expected]
+        self.assertEqual(Note.filter_many(self.notes, self.queries, time_only=True), nows)
+
+    def test_one_read_of_the_file(self):
+        real = Note.iterate
+        with patch.object(Note, "iterate", side_effect=real) as iterate:
+            found = Note.match_many(self.jotfile, self.queries, time_only=True)
+        self.assertEqual(iterate.call_count, 1)
+        for (criteria, logic), nows in zip(self.queries, found):
+            expected = Note.match(self.jotfile, criteria, logic, time_only=True)
+            self.assertEqual(nows, list(expected))
+
+
+class TestMultiTermSearch(unittest.TestCase):
+    """Automaton and Note.match_terms: many terms, one pass per message."""
+
+    def test_automaton_finds_every_term(self):
+        import random
+        from catjot import Automaton
+
+        self.assertEqual(Automaton(["he", "she", "hers", "his"]).terms[1], "she")
+        random.seed(11)
+        for _ in range(500):
+            terms = ["".join(random.choices("abA", k=random.randint(0, 4))) for _ in range(6)]
+            text = "".join(random.choices("abAc", k=random.randint(0, 30)))
+            fold = random.random() < 0.5
+            for walk in (0, 100):
+                with patch.object(Automaton, "FAST_TERMS", walk):
+                    machine = Automaton(terms, fold)
+                    found = {machine.terms[i] for i in machine.hits(text)}
+                haystack = text.lower() if fold else text
+                expected = {
+                    t for t in terms if t and (t.lower() if fold else t) in haystack
+                }
+                self.assertEqual(found, expected, (terms, text, fold))
+
+    def test_any_and_all_match_filter(self):
+        import catjot
+
+        jotfile = "tests/bellvue.jot"
+        terms = ["MANOR", "ivy", "garden", "nowhere-at-all"]
+        for every, logic in ((False, "or"), (True, "and")):
+            for fold, s_type in ((True, SearchType.MESSAGE_I), (False, SearchType.MESSAGE)):
+                criteria = [(s_type, t) for t in terms[:3]]
+                expected = list(Note.match(jotfile, criteria, logic))
+                with patch.object(catjot.Automaton, "FAST_TERMS", 0):
+                    found = list(Note.match_terms(jotfile, terms[:3], every, fold))
+                self.assertEqual([n for n, _hits in found], expected)
+        found = list(Note.match_terms(jotfile, terms))
+        self.assertTrue(found)
+        for inst, hits in found:
+            self.assertEqual(
+                hits, [t for t in terms if t.lower() in inst.message.lower()]
+            )
+
+    def test_uses_text_index(self):
+        import shutil
+        import tempfile
+        import catjot
+
+        with tempfile.TemporaryDirectory() as tmp:
+            jotfile = os.path.join(tmp, "multi.jot")
+            shutil.copy("tests/bellvue.jot", jotfile)
+            with patch.object(catjot._Sidecar, "MIN_BYTES", 0):
+                expected = list(Note.match_terms(jotfile, ["manor", "ivy"]))
+                catjot.TextIndex.open(jotfile)
+                with patch.object(Note, "_records", side_effect=AssertionError):
+                    found = list(Note.match_terms(jotfile, ["manor", "ivy"]))
+        self.assertEqual(found, expected)
+
+    def test_classifier_output(self):
+        import subprocess
+
+        result = subprocess.run(
+            [sys.executable, "catjot.py", "-f", "tests/bellvue.jot"]
+            + ["s", "--any", "manor", "garden", "-d"],
+            capture_output=True,
+            text=True,
+        )
+        lines = [line.split() for line in result.stdout.splitlines()]
+        expected = Note.match_terms("tests/bellvue.jot", ["manor", "garden"])
+        self.assertEqual(lines, [[str(n.now)] + hits for n, hits in expected])
+
+
+class TestBooleanQuery(unittest.TestCase):
+    """NoteQuery: parsing, planning order, index use and `jot q`."""
+
+    def test_parse(self):
+        from catjot import NoteQuery
+
+        query = NoteQuery('tag:prod (msg:"disk full" OR ctx:kubectl) AND NOT dir:/tmp/*')
+        self.assertEqual(
+            query.tree,
+            (
+                "and",
+                [
+                    ("term", (SearchType.TAG, "prod")),
+                    (
+                        "or",
+                        [
+                            ("term", (SearchType.MESSAGE_I, "disk full")),
+                            ("term", (SearchType.CONTEXT_I, "kubectl")),
+                        ],
+                    ),
+                    ("not", ("term", (SearchType.TREE, "/tmp/"))),
+                ],
+            ),
+        )
+        self.assertEqual(NoteQuery("ts:100..200").terms(), [(SearchType.TIME_RANGE, (100, 200))])
+        self.assertEqual(NoteQuery("until:100").terms(), [(SearchType.TIME_RANGE, (None, 100))])
+        self.assertEqual(NoteQuery("http://x").terms(), [(SearchType.MESSAGE_I, "http://x")])
+        for bad in ("AND tag:x", "(tag:x", "tag:x OR", 'msg:"open', "tag:", "tag:x)", "re:[a"):
+            with self.assertRaises(ValueError, msg=bad):
+                NoteQuery(bad)
+
+    def test_matches_naive_evaluation(self):
+        import random
+        from catjot import NoteQuery
+
+        jotfile = "tests/bellvue.jot"
+        notes = list(Note.iterate(jotfile))
+        tags = sorted({t for n in notes for t in n.tag.split()})[:6]
+        dirs = sorted({n.pwd for n in notes})[:4]
+        words = ["the", "manor", "garden", "zebra"]
+
+        def naive(node, inst):
+            if node[0] == "term":
+                return Note.compile([node[1]])(inst)
+            if node[0] == "not":
+                return not naive(node[1], inst)
+            found = [naive(branch, inst) for branch in node[1]]
+            return all(found) if node[0] == "and" else any(found)
+
+        def generate(depth=0):
+            if depth > 2 or random.random() < 0.4:
+                return random.choice(
+                    ["tag:" + random.choice(tags), "msg:" + random.choice(words)]
+                    + ["ctx:" + random.choice(words), "dir:" + random.choice(dirs)]
+                    + ["dir:" + random.choice(dirs) + "*"]
+                )
+            if random.random() < 0.25:
+                return "NOT " + generate(depth + 1)
+            op = random.choice([" AND ", " OR ", " "])
+            return "(" + op.join(generate(depth + 1) for _ in range(3)) + ")"
+
+        random.seed(23)
+        for _ in range(200):
+            query = NoteQuery(generate())
+            expected = [n.now for n in notes if naive(query.tree, n)]
+            self.assertEqual([n.now for n in query.run(jotfile)], expected, query.text)
+            self.assertEqual(list(query.run(jotfile, time_only=True)), expected)
+
+    def test_cheapest_most_selective_first(self):
+        from catjot import NoteQuery
+
+        query = NoteQuery("re:a.b AND msg:timeout AND NOT dir:/tmp/* AND tag:prod")
+        self.assertEqual(
+            query.explain(),
+            "(tag:'prod' AND NOT tree:'/tmp/' AND message_i:'timeout' AND regex:'a.b')",
+        )
+        # under OR the likeliest cheap branch settles the most notes first
+        query = NoteQuery("msg:timeout OR NOT tag:prod")
+        self.assertEqual(query.explain(), "(NOT tag:'prod' OR message_i:'timeout')")
+
+    def test_relative_bounds_are_not_cached(self):
+        from catjot import NoteQuery, QueryCache
+
+        for text in ("since:1h foo", "until:today", "ts:yesterday..", "ts:1..3d"):
+            self.assertIsNone(NoteQuery(text).key(), text)
+        fixed = NoteQuery("since:2026-10-01 foo").key()
+        self.assertIsNotNone(fixed)
+        self.assertEqual(NoteQuery("since:2026-10-01   foo").key(), fixed)
+        self.assertIsNotNone(NoteQuery("ts:1695000000..1696000000").key())
+
+        cache = QueryCache()
+        query = NoteQuery("since:1h msg:e")
+        for _ in range(2):
+            cache.lookup(FIXED_CATNOTE, query.key(), query.plan()[0], lambda: [])
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_reads_only_index_candidates(self):
+        import shutil
+        import tempfile
+        import catjot
+        from catjot import NoteQuery
+
+        with tempfile.TemporaryDirectory() as tmp:
+            jotfile = os.path.join(tmp, "query.jot")
+            shutil.copy("tests/bellvue.jot", jotfile)
+            tags = sorted({t for n in Note.iterate(jotfile) for t in n.tag.split()})
+            text = f"(tag:{tags[0]} OR tag:{tags[1]}) AND NOT msg:zebra"
+            expected = list(NoteQuery(text).run(jotfile))
+            with patch.object(catjot._Sidecar, "MIN_BYTES", 0):
+                _test, candidates = NoteQuery(text).plan(jotfile)
+                self.assertIsNotNone(candidates)
+                with patch.object(Note, "_records", side_effect=AssertionError):
+                    found = list(NoteQuery(text).run(jotfile))
+        self.assertTrue(expected)
+        self.assertEqual(found, expected)
+
+    def test_command_line(self):
+        import subprocess
+        from catjot import NoteQuery
+
+        text = "tag:aurora OR NOT dir:/story/location*"
+        result = subprocess.run(
+            [sys.executable, "catjot.py", "-f", "tests/bellvue.jot", "-d", "q", text],
+            capture_output=True,
+            text=True,
+        )
+        expected = NoteQuery(text).run("tests/bellvue.jot", time_only=True)
+        self.assertEqual(result.stdout.split(), [str(ts) for ts in expected])
+        result = subprocess.run(
+            [sys.executable, "catjot.py", "-f", "tests/bellvue.jot", "q", "tag:x AND"],
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("bad query", result.stderr)
+
+
+class TestQueryCache(NotefileCase):
+    """QueryCache: hits, append patching, invalidation and eviction."""
+
+    FIXTURE = "tests/bellvue.jot"
+    NAME = "cached.jot"
+
+    def setUp(self):
+        super().setUp()
+        self.notes = list(Note.iterate(self.jotfile))
+        self.tag = self.notes[0].tag.split()[0]
+        self.pwd = self.notes[-1].pwd
+
+    def _fresh(self, criteria, logic="and"):
+        return [n.now for n in Note.match(self.jotfile, criteria, logic)]
+
+    def test_key_normalises(self):
+        from catjot import QueryCache
+
+        a = [(SearchType.MESSAGE_I, "Garden"), (SearchType.TAG, "x")]
+        b = [(SearchType.TAG, "x"), (SearchType.MESSAGE_I, "garden"), (SearchType.TAG, "x")]
+        self.assertEqual(QueryCache.key(a, "or"), QueryCache.key(b, "or"))
+        self.assertNotEqual(QueryCache.key(a, "or"), QueryCache.key(a, "and"))
+        self.assertEqual(
+            QueryCache.key((SearchType.TAG, "x"), "or"),
+            QueryCache.key([(SearchType.TAG, "x")], "and"),
+        )
+
+    def test_hits_and_misses(self):
+        from catjot import QueryCache
+
+        cache = QueryCache(1 << 20)
+        criteria = [(SearchType.TAG, self.tag)]
+        first = cache.match(self.jotfile, criteria)
+        with patch.object(Note, "_records", side_effect=AssertionError):
+            again = cache.match(self.jotfile, criteria)
+        self.assertIs(again, first)
+        self.assertEqual([n.now for n in first], self._fresh(criteria))
+        found = cache.match_many(
+            self.jotfile, [(criteria, "or"), ([(SearchType.DIRECTORY, self.pwd)], "or")]
+        )
+        self.assertIs(found[0], first)
+        self.assertEqual([n.now for n in found[1]], self._fresh([(SearchType.DIRECTORY, self.pwd)]))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 2))
+        self.assertEqual(stats["entries"], 2)
+
+    def test_append_patches_only_affected_entries(self):
+        from catjot import QueryCache
+
+        cache = QueryCache(1 << 20)
+        tagged = [(SearchType.TAG, self.tag)]
+        elsewhere = [(SearchType.DIRECTORY, "/nowhere/else")]
+        cache.match(self.jotfile, tagged)
+        untouched = cache.match(self.jotfile, elsewhere)
+        Note.append(self.jotfile, Note.jot("more", tag=self.tag, pwd="/x", now=5))
+        self.assertIs(cache.match(self.jotfile, elsewhere), untouched)
+        self.assertEqual([n.now for n in cache.match(self.jotfile, tagged)], self._fresh(tagged))
+        self.assertEqual(cache.stats()["patched"], 1)
+
+        victim = self._fresh(tagged)[0]
+        Note.delete(self.jotfile, victim, tombstone=True)
+        found = [n.now for n in cache.match(self.jotfile, tagged)]
+        self.assertNotIn(victim, found)
+        self.assertEqual(found, self._fresh(tagged))
+        self.assertEqual(cache.stats()["dropped"], 0)
+
+    def test_rewrite_drops_entries(self):
+        from catjot import QueryCache
+
+        cache = QueryCache(1 << 20)
+        retagged = [(SearchType.TAG, "retagged")]
+        self.assertEqual(cache.match(self.jotfile, retagged), [])
+        Note.amend(self.jotfile, tag="retagged")
+        Note.commit(self.jotfile)
+        found = [n.now for n in cache.match(self.jotfile, retagged)]
+        self.assertEqual(found, [self.notes[-1].now])
+        self.assertEqual(cache.stats()["dropped"], 1)
+
+    def test_byte_budget(self):
+        from catjot import QueryCache
+
+        everything = [(SearchType.ALL, "")]
+        size = QueryCache._weigh(self.notes)
+        # weighing reads the spans, not the lazy message and context
+        light = list(Note.iterate(self.jotfile, headers_only=True))
+        self.assertGreater(QueryCache._weigh(light), 64)
+        self.assertTrue(all(n._message is None for n in self.notes + light))
+        self.assertTrue(all(n._context is None for n in self.notes))
+        cache = QueryCache(size + size // 2)
+        cache.match(self.jotfile, everything)
+        cache.match(self.jotfile, [(SearchType.TAG, self.tag)])
+        cache.match(self.jotfile, everything)  # now the most recently used
+        cache.match(self.jotfile, [(SearchType.TIME_RANGE, (0, None))])
+        stats = cache.stats()
+        self.assertLessEqual(stats["bytes"], stats["budget"])
+        self.assertEqual(stats["evicted"], 2)  # the tag entry, then ALL
+        self.assertEqual(stats["entries"], 1)
+
+        off = QueryCache(0)
+        self.assertEqual(len(off.match(self.jotfile, everything)), len(self.notes))
+        self.assertEqual(off.stats()["entries"], 0)
+
+
+class TestNoteStream(NotefileCase):
+    """Note.stream, NoteContext(stream=True) and `jot d` pagination."""
+
+    FIXTURE = "tests/bellvue.jot"
+    NAME = "stream.jot"
+
+    def setUp(self):
+        super().setUp()
+        nows = [n.now for n in Note.iterate(self.jotfile)]
+        for ts in nows[3:9:2]:
+            Note.delete(self.jotfile, ts, tombstone=True)
+        Note.append(self.jotfile, Note.jot("again", pwd="/story", now=nows[3]))
+        self.nows = [n.now for n in Note.iterate(self.jotfile)]
+
+    def test_same_notes_as_match(self):
+        everything = (SearchType.ALL, "")
+        for step in (1, 100, 1 << 20):
+            with patch.object(Note, "DROP_BEHIND", step):
+                found = [n.now for n in Note.stream(self.jotfile, everything)]
+                self.assertEqual(found, self.nows, step)
+                headers = Note.stream(self.jotfile, everything, headers_only=True)
+                self.assertEqual([n.now for n in headers], self.nows)
+        story = [(SearchType.TREE, "/story")]
+        self.assertEqual(
+            list(Note.stream(self.jotfile, story)), list(Note.match(self.jotfile, story))
+        )
+
+    def test_reads_lazily_and_counts(self):
+        real, loaded = Note._load, []
+
+        def counted(record, span=None):
+            loaded.append(1)
+            return real(record, span)
+
+        with patch.object(Note, "_load", side_effect=counted):
+            with NoteContext(self.jotfile, (SearchType.ALL, ""), stream=True) as nc:
+                walk = iter(nc)
+                next(walk)
+                self.assertLess(len(loaded), 5)
+                self.assertEqual(len(nc), 1)
+                rest = list(walk)
+        self.assertEqual(len(nc), len(self.nows))
+        self.assertEqual([n.now for n in rest], self.nows[1:])
+
+    def _pages(self, size):
+        pages, after = [], None
+        while True:
+            with NoteContext(
+                self.jotfile, (SearchType.ALL, ""), stream=True, limit=size, after=after
+            ) as nc:
+                pages.append([n.now for n in nc])
+                if not nc.more:
+                    return pages
+                after = nc.cursor
+
+    def test_pages_follow_the_cursor(self):
+        pages = self._pages(4)
+        self.assertEqual(sum(pages, []), self.nows)
+        self.assertTrue(all(len(page) == 4 for page in pages[:-1]))
+
+    def test_cursor_survives_removal(self):
+        # the cursor note goes, and later notes carry older timestamps
+        with NoteContext(self.jotfile, (SearchType.ALL, ""), stream=True, limit=5) as nc:
+            list(nc)
+            cursor = nc.cursor
+        for now in (cursor[0] - 100, cursor[0] - 50):
+            Note.append(self.jotfile, Note.jot("backdated", pwd="/story", now=now))
+        Note.delete(self.jotfile, cursor[0], tombstone=True)
+        rest = [n.now for n in Note.stream(self.jotfile, (SearchType.ALL, ""), after=cursor)]
+        self.assertEqual(rest, [n.now for n in Note.iterate(self.jotfile)][4:])
+        self.assertEqual(rest[-2:], [cursor[0] - 100, cursor[0] - 50])
+
+    def test_duplicate_timestamps(self):
+        shared = self.nows[-1]
+        for word in ("one", "two", "three"):
+            Note.append(self.jotfile, Note.jot(word, pwd="/story", now=shared))
+        self.nows = [n.now for n in Note.iterate(self.jotfile)]
+        for size in (1, 2, 3):
+            self.assertEqual(sum(self._pages(size), []), self.nows, size)
+
+    def test_cursor_must_fit(self):
+        ts, start = Note.cursor(self.jotfile, str(self.nows[2]))
+        self.assertEqual(Note.cursor(self.jotfile, f"{ts}@{start}"), (ts, start))
+        for bad in (f"{ts}@{start + 1}", f"{ts + 1}@{start}", "1@0", "123", "x@1"):
+            with self.assertRaises(ValueError, msg=bad):
+                Note.cursor(self.jotfile, bad)
+        with self.assertRaises(ValueError):
+            list(Note.stream(self.jotfile, (SearchType.ALL, ""), after=(ts + 1, start)))
+
+    def test_command_line(self):
+        import re
+        import subprocess
+
+        def jot(*extra):
+            return subprocess.run(
+                [sys.executable, "catjot.py", "-f", self.jotfile, "d"] + list(extra),
+                capture_output=True,
+                text=True,
+            )
+
+        output = jot("--page-size", "5").stdout
+        self.assertIn("5 notes on this page", output)
+        cursor = re.search(r"--after (\S+)", output).group(1)
+        self.assertTrue(cursor.startswith(f"{self.nows[4]}@"))
+        stamps = jot("--page-size", "5", "--after", cursor, "-d").stdout.split()
+        self.assertEqual(stamps, [str(ts) for ts in self.nows[5:10]])
+        bare = jot("--page-size", "5", "--after", str(self.nows[4]), "-d")
+        self.assertEqual(bare.stdout.split(), [str(ts) for ts in self.nows[5:10]])
+        self.assertEqual(jot("--after", "1@0").returncode, 2)
+        self.assertIn(f"{len(self.nows)} notes in total", jot().stdout)
+
+        # -d keeps stdout to timestamps; the cursor comes on stderr
+        pages, extra = [], ["-d", "--page-size", "4"]
+        while True:
+            result = jot(*extra)
+            pages.extend(result.stdout.split())
+            found = re.search(r"--after (\S+)", result.stderr)
+            if found is None:
+                break
+            self.assertIn("jot d -d --page-size 4", result.stderr)
+            extra = ["-d", "--page-size", "4", "--after", found.group(1)]
+        self.assertEqual(pages, [str(ts) for ts in self.nows])
+
+
+class TestReverseReader(NotefileCase):
+    """Reading backwards from EOF must agree exactly with the forward parser."""
+
+    FIXTURES = [
+        "tests/example.jot",
+        "tests/broken.jot",
+        "tests/broken2.jot",
+        "tests/edgecase.jot",
+        "tests/bellvue.jot",
+    ]
+
+    # separators inside messages, runs of separators, whitespace-only lines,
+    # a fragment with no Directory: header and a record with no blank ending
+    ADVERSARIAL = (
+        "^-^\n^-^\n"
+        "Directory:/a\nDate:1\nTag:\nContext:\nMessage:one\n^-^\nnot a sep\n\n"
+        "  ^-^  \nDirectory:/b\nDate:2\nTag:\nContext:\nMessage:two\n\n"
+        "^-^\njunk without header\n \n"
+        "^-^\n^-^\nDirectory:/c\nDate:3\nTag:\nContext:\nMessage:three\n"
+        "^-^\n\n\t\n^-^\nDirectory:/d\nDate:4\nTag:\nContext:\nMessage:four\n\n"
+        "^-^\nDirectory:/e\nDate:5\nTag:\nContext:\nMessage:five"
+    )
+
+    FIXTURE = None
+
+    def _assert_mirrors(self, path):
+        forward = list(Note._records(path))
+        for block in (1, 5, 64, Note.TAIL_BLOCK):
+            with patch.object(Note, "TAIL_BLOCK", block):
+                backward = list(Note._records_reverse(path))
+            self.assertEqual(backward, forward[::-1], f"{path} block={block}")
+
+    def test_block_parser_matches_line_parser(self):
+        path = os.path.join(self.tmpdir.name, "odd.jot")
+        with open(path, "w") as f:
+            f.write(self.ADVERSARIAL)
+        for path in self.FIXTURES + [path]:
+            with open(path, "rb") as f:
+                data = f.read()
+            lines = list(Note._scan(Note._lines_in(data)))
+            blocks = list(Note._records(path))
+            self.assertEqual(
+                [(s, e, "".join(r)) for s, e, r in blocks],
+                [(s, e, "".join(r)) for s, e, r in lines],
+                path,
+            )
+
+    def test_fixtures_mirror_forward_parse(self):
+        for path in self.FIXTURES:
+            self._assert_mirrors(path)
+
+    def test_adversarial_boundaries_mirror_forward_parse(self):
+        path = os.path.join(self.tmpdir.name, "odd.jot")
+        with open(path, "w") as f:
+            f.write(self.ADVERSARIAL)
+        self._assert_mirrors(path)
+        # and again with the final record properly closed
+        with open(path, "a") as f:
+            f.write("\n")
+        self._assert_mirrors(path)
+
+    def test_crlf_and_cr_line_endings(self):
+        import catjot
+
+        # text-mode reading turned "\r\n" and "\r" into "\n"; so must the parser
+        def fields(notes):
+            return [
+                (n.pwd, n.tag, n.context, n.message, n.now if n.message else None)
+                for n in notes
+            ]
+
+        odd = os.path.join(self.tmpdir.name, "odd.jot")
+        with open(odd, "w") as f:
+            f.write(self.ADVERSARIAL + "\n")
+        for path in self.FIXTURES + [odd]:
+            with open(path, "rb") as f:
+                data = f.read()
+            expected = fields(Note.iterate(path))
+            for newline in (b"\r\n", b"\r"):
+                name = f"{len(newline)}-{os.path.basename(path)}"
+                copy = os.path.join(self.tmpdir.name, name)
+                with open(copy, "wb") as f:
+                    f.write(data.replace(b"\n", newline))
+                label = f"{path} {newline!r}"
+                self.assertEqual(fields(Note.iterate(copy)), expected, label)
+                light = list(Note.iterate(copy, headers_only=True))
+                self.assertEqual(fields(light), expected, label)
+                self.assertEqual(
+                    fields(Note.reverse_iterate(copy)), expected[::-1], label
+                )
+                lines = list(Note._scan(Note._lines_in(data.replace(b"\n", newline))))
+                self.assertEqual(
+                    [(s, e, "".join(r)) for s, e, r in Note._records(copy)],
+                    [(s, e, "".join(r)) for s, e, r in lines],
+                    label,
+                )
+                self._assert_mirrors(copy)
+                with patch.object(catjot._Sidecar, "MIN_BYTES", 0):
+                    index = catjot.NoteIndex.open(copy)
+                    offsets = sorted(index.data["spans"])
+                    self.assertEqual(
+                        fields(index.notes(offsets)),
+                        [f for f in expected if f[4] is not None],
+                        label,
+                    )
+
+    def test_empty_file(self):
+        path = os.path.join(self.tmpdir.name, "empty.jot")
+        open(path, "w").close()
+        self.assertEqual(list(Note.reverse_iterate(path)), [])
+
+    def test_match_desc_is_reversed_match(self):
+        criteria = (SearchType.DIRECTORY, "/home/user")
+        asc = [n.now for n in Note.match(FIXED_CATNOTE, criteria)]
+        desc = [n.now for n in Note.match(FIXED_CATNOTE, criteria, order="desc")]
+        self.assertEqual(desc, asc[::-1])
+
+    def test_newest_keeps_file_order(self):
+        everything = [n.now for n in Note.iterate(FIXED_CATNOTE)]
+        for count in (0, 1, 3, len(everything) + 5):
+            with NoteContext(FIXED_CATNOTE, (SearchType.ALL, ""), newest=count) as nc:
+                got = [n.now for n in nc]
+            self.assertEqual(got, everything[-count:] if count else [])
+
+    def test_newest_never_scans_forward(self):
+        last = list(Note.iterate(FIXED_CATNOTE))[-1]
+        with patch.object(Note, "iterate", side_effect=AssertionError):
+            with NoteContext(FIXED_CATNOTE, (SearchType.ALL, ""), newest=1) as nc:
+                self.assertEqual([n.now for n in nc], [last.now])
+
+
+class TestTombstones(NotefileCase):
+    """delete(tombstone=True) appends instead of rewriting; compact() folds."""
+
+    NAME = "graves.jot"
+
+    def setUp(self):
+        super().setUp()
+        self.before = [n.now for n in Note.iterate(self.jotfile)]
+
+    def _nows(self, reader=Note.iterate):
+        return [n.now for n in reader(self.jotfile)]
+
+    def test_tombstone_appends_and_hides(self):
+        victim = self.before[2]
+        size = os.path.getsize(self.jotfile)
+        with open(self.jotfile, "rb") as f:
+            original = f.read()
+
+        Note.delete(self.jotfile, victim, tombstone=True)
+
+        self.assertFalse(os.path.exists(self.jotfile + ".new"))
+        with open(self.jotfile, "rb") as f:
+            self.assertEqual(f.read(size), original)  # strictly an append
+        expected = [ts for ts in self.before if ts != victim]
+        self.assertEqual(self._nows(), expected)
+        self.assertEqual(self._nows(Note.reverse_iterate), expected[::-1])
+        self.assertEqual(
+            list(Note.match(self.jotfile, (SearchType.TIMESTAMP, victim))), []
+        )
+
+    def test_index_lookup_respects_tombstones(self):
+        import catjot
+
+        victim = self.before[0]
+        with patch.object(catjot._Sidecar, "MIN_BYTES", 0):
+            self.assertEqual(len(list(Note.lookup(self.jotfile, [victim]))), 1)
+            Note.delete(self.jotfile, victim, tombstone=True)  # delta, no rebuild
+            self.assertEqual(list(Note.lookup(self.jotfile, [victim])), [])
+
+    def test_note_rejotted_after_tombstone_lives(self):
+        victim = self.before[1]
+        Note.delete(self.jotfile, victim, tombstone=True)
+        Note.append(self.jotfile, Note.jot("back again", now=victim))
+        found = list(Note.match(self.jotfile, (SearchType.TIMESTAMP, victim)))
+        self.assertEqual([n.message for n in found], ["back again\n"])
+        newest = next(Note.reverse_iterate(self.jotfile))
+        self.assertEqual(newest.message, "back again\n")
+
+    def test_quoted_marker_buries_nothing(self):
+        victim = self.before[0]
+        Note.append(
+            self.jotfile,
+            Note.jot(f"see:\nDirectory:/dev/null\nDate:{victim}\nTag:\nContext:\n"),
+        )
+        self.assertIn(victim, self._nows())
+
+    def test_pop_tombstones_newest_in_directory(self):
+        here = [n.now for n in Note.match(self.jotfile, (SearchType.DIRECTORY, "/home/user"))]
+        Note.pop(self.jotfile, "/home/user", tombstone=True)
+        after = [n.now for n in Note.match(self.jotfile, (SearchType.DIRECTORY, "/home/user"))]
+        self.assertEqual(after, here[:-1])
+
+    def test_compact_respects_ratio(self):
+        Note.delete(self.jotfile, self.before[0], tombstone=True)
+        total = len(self.before) + 1
+        self.assertEqual(Note.compact(self.jotfile, 0.9), (0, total))
+        self.assertFalse(os.path.exists(self.jotfile + ".old"))
+
+        self.assertEqual(Note.compact(self.jotfile, 0.1), (2, total))
+        self.assertTrue(os.path.exists(self.jotfile + ".old"))
+        self.assertEqual(self._nows(), self.before[1:])
+        with open(self.jotfile) as f:
+            self.assertNotIn(Note.TOMBSTONE_PWD, f.read())
+        # nothing left to fold
+        self.assertEqual(Note.compact(self.jotfile, 0), (0, len(self.before) - 1))
+
+    def test_cli_remove_then_compact(self):
+        import subprocess
+
+        repo = os.path.dirname(os.path.abspath(__file__))
+        env = dict(os.environ, HOME=self.tmpdir.name)
+        env.pop("CATJOT_FILE", None)
+
+        def jot(*words):
+            return subprocess.run(
+                [sys.executable, os.path.join(repo, "catjot.py"), "-f", self.jotfile]
+                + list(words),
+                capture_output=True,
+                text=True,
+                env=env,
+            )
+
+        victim = str(self.before[-1])
+        self.assertEqual(jot("r", victim).returncode, 0)
+        self.assertFalse(os.path.exists(self.jotfile + ".new"))
+        self.assertIn("0 notes matching", jot("ts", victim).stdout)
+        self.assertNotIn(victim, jot("h", "-d").stdout)
+
+        result = jot("compact", "0")
+        self.assertEqual(result.returncode, 0)
+        self.assertIn("Compacted 2", result.stdout)
+        self.assertEqual(self._nows(), self.before[:-1])
+
+
+class TestNoteTransaction(NotefileCase):
+    """Note.transaction(): many changes, one write."""
+
+    NAME = "batch.jot"
+
+    def setUp(self):
+        super().setUp()
+        self.before = list(Note.iterate(self.jotfile))
+        self.nows = [n.now for n in self.before]
+
+    def _notes(self):
+        return {n.now: n for n in Note.iterate(self.jotfile)}
+
+    def test_deletes_and_inserts_only_append(self):
+        size = os.path.getsize(self.jotfile)
+        with patch.object(Note, "commit") as commit:
+            with Note.transaction(self.jotfile) as txn:
+                for ts in self.nows[:3]:
+                    txn.delete(ts)
+                txn.insert(Note.jot("fresh", now=42))
+        commit.assert_not_called()
+        self.assertGreater(os.path.getsize(self.jotfile), size)
+        self.assertEqual(list(self._notes()), self.nows[3:] + [42])
+
+    def test_amend_batch_is_one_rewrite(self):
+        real_commit = Note.commit
+        with patch.object(Note, "commit", side_effect=real_commit) as commit:
+            with Note.transaction(self.jotfile) as txn:
+                txn.delete(self.nows[0])
+                txn.amend(self.nows[1], context="reworded", tag="urgent")
+                txn.amend(self.nows[1], pwd="/moved")
+                txn.amend(self.nows[2], tag="~nonexistent")
+                txn.insert(Note.jot("fresh", now=42))
+        self.assertEqual(commit.call_count, 1)
+
+        notes = self._notes()
+        self.assertNotIn(self.nows[0], notes)
+        self.assertEqual(notes[self.nows[1]].context, "reworded")
+        self.assertEqual(notes[self.nows[1]].pwd, "/moved")
+        self.assertIn("urgent", notes[self.nows[1]].tag.split())
+        self.assertEqual(notes[self.nows[2]], self.before[2])
+        self.assertEqual(list(notes)[-1], 42)
+
+    def test_reinsert_survives_delete_of_same_timestamp(self):
+        for amend in (False, True):
+            with Note.transaction(self.jotfile) as txn:
+                txn.delete(self.nows[4])
+                if amend:
+                    txn.amend(self.nows[5], context="forces a rewrite")
+                txn.insert(Note.jot(f"refiled {amend}", now=self.nows[4]))
+            survivors = [
+                n.message
+                for n in Note.match(self.jotfile, (SearchType.TIMESTAMP, self.nows[4]))
+            ]
+            self.assertEqual(survivors, [f"refiled {amend}\n"])
+
+    def test_exception_discards_batch(self):
+        with open(self.jotfile, "rb") as f:
+            original = f.read()
+        with self.assertRaises(RuntimeError):
+            with Note.transaction(self.jotfile) as txn:
+                txn.delete(self.nows[0])
+                txn.amend(self.nows[1], tag="never")
+                raise RuntimeError
+        with open(self.jotfile, "rb") as f:
+            self.assertEqual(f.read(), original)
+
+    def test_insert_rejects_empty_message(self):
+        with Note.transaction(self.jotfile) as txn:
+            with self.assertRaises(ValueError):
+                txn.insert(Note({"message": ""}))
+
+
+class TestTailAmend(NotefileCase):
+    """amend() + commit() splice only the last record, journalled."""
+
+    NAME = "tail.jot"
+
+    def setUp(self):
+        super().setUp()
+        self.before = list(Note.iterate(self.jotfile))
+
+    def _read(self):
+        with open(self.jotfile, "rb") as f:
+            return f.read()
+
+    def test_only_the_tail_changes(self):
+        original = self._read()
+        Note.amend(self.jotfile, context="spliced", tag="fresh")
+        self.assertTrue(os.path.exists(self.jotfile + ".journal"))
+        self.assertLess(os.path.getsize(self.jotfile + ".new"), len(original))
+        self.assertEqual(self._read(), original)  # untouched until commit
+
+        Note.commit(self.jotfile)
+        for suffix in (".journal", ".new", ".old"):
+            self.assertFalse(os.path.exists(self.jotfile + suffix), suffix)
+
+        after = list(Note.iterate(self.jotfile))
+        self.assertEqual(after[:-1], self.before[:-1])
+        self.assertEqual(after[-1].context, "spliced")
+        self.assertEqual(after[-1].tag, "fresh")
+        self.assertEqual(after[-1].message, self.before[-1].message)
+        cut = original.rindex(b"Directory:")
+        self.assertEqual(self._read()[:cut], original[:cut])
+
+    def test_tombstones_after_last_note_are_kept(self):
+        Note.delete(self.jotfile, self.before[-1].now, tombstone=True)
+        Note.amend(self.jotfile, pwd="/moved")
+        Note.commit(self.jotfile)
+        after = list(Note.iterate(self.jotfile))
+        self.assertEqual([n.now for n in after], [n.now for n in self.before[:-1]])
+        self.assertEqual(after[-1].pwd, "/moved")
+
+    def test_interrupted_splice_is_redone(self):
+        Note.amend(self.jotfile, context="survives a crash")
+        expected = list(Note.iterate(self.jotfile))[:-1]
+
+        # emulate dying halfway through commit(): journal flipped to
+        # "applying", src truncated and only part of the tail written
+        state, dev, ino, size, cut, undo = Note._read_journal(self.jotfile)
+        Note._write_journal(
+            self.jotfile, ("applying", os.stat(self.jotfile), cut, undo)
+        )
+        with open(self.jotfile + ".new", "rb") as f:
+            tail = f.read()
+        with open(self.jotfile, "r+b") as f:
+            f.truncate(cut)
+            f.seek(cut)
+            f.write(tail[: len(tail) // 2])
+
+        Note.append(self.jotfile, Note.jot("written after the crash"))
+        notes = list(Note.iterate(self.jotfile))
+        self.assertEqual(notes[:-2], expected)
+        self.assertEqual(notes[-2].context, "survives a crash")
+        self.assertEqual(notes[-1].message, "written after the crash\n")
+        self.assertFalse(os.path.exists(self.jotfile + ".journal"))
+
+    def test_write_between_amend_and_commit_discards_amend(self):
+        Note.amend(self.jotfile, context="too late")
+        Note.append(self.jotfile, Note.jot("sneaks in"))
+        snapshot = self._read()
+        with self.assertRaises(ValueError):
+            Note.commit(self.jotfile)
+        self.assertEqual(self._read(), snapshot)
+        self.assertFalse(os.path.exists(self.jotfile + ".journal"))
+
+    def test_full_rewrite_ignores_abandoned_amend(self):
+        Note.amend(self.jotfile, context="abandoned")
+        Note.delete(self.jotfile, self.before[0].now)
+        Note.commit(self.jotfile)
+        self.assertEqual(list(Note.iterate(self.jotfile)), self.before[1:])
+
+    def test_index_follows_splice_without_rebuild(self):
+        import catjot
+
+        with patch.object(catjot._Sidecar, "MIN_BYTES", 0):
+            list(Note.lookup(self.jotfile, [self.before[0].now]))  # builds .idx
+            Note.amend(self.jotfile, context="indexed")
+            Note.commit(self.jotfile)
+            with patch.object(catjot.NoteIndex, "rebuild", side_effect=AssertionError):
+                found = list(Note.lookup(self.jotfile, [self.before[-1].now]))
+        self.assertEqual([n.context for n in found], ["indexed"])
+
+
+class TestLazyNote(unittest.TestCase):
+    """Slotted Note: headers decoded eagerly, context/message on first use."""
+
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(Note.jot("slim"), "__dict__"))
+        with self.assertRaises(AttributeError):
+            Note.jot("slim").color = "tabby"
+
+    def test_loaded_notes_defer_body(self):
+        note = next(Note.iterate(FIXED_CATNOTE))
+        self.assertIsNone(note._message)
+        self.assertIsNone(note._context)
+        self.assertEqual(note.now, 1694747662)
+        self.assertEqual(note.context, "adoption")
+        self.assertEqual(note.message, "hello\n")
+        self.assertIsNone(note._body)  # raw lines released once both decoded
+
+    def test_lazy_load_matches_eager_parse(self):
+        for path in (FIXED_CATNOTE, "tests/broken.jot", "tests/edgecase.jot"):
+            for _s, _e, record in Note._records(path):
+                fields = Note._parse(list(record))
+                loaded = Note._load(record)
+                if fields is None:
+                    self.assertIsNone(loaded)
+                else:
+                    self.assertEqual(loaded, Note(fields))
+                    self.assertEqual(loaded.message, Note(fields).message)
+
+    def test_assignment_and_copy(self):
+        import copy
+
+        note = next(Note.iterate(FIXED_CATNOTE))
+        clone = copy.deepcopy(note)
+        self.assertEqual(clone, note)
+        clone.message = "rewritten\n"
+        clone.context = "elsewhere"
+        self.assertEqual(clone.message, "rewritten\n")
+        self.assertEqual(clone.context, "elsewhere")
+        self.assertEqual(note.message, "hello\n")
+
+
+class TestHeaderOnly(unittest.TestCase):
+    """headers_only reads keep just the header lines of each record."""
+
+    def test_same_notes_as_full_read(self):
+        for path in (FIXED_CATNOTE, "tests/broken.jot", "tests/edgecase.jot"):
+            full = list(Note.iterate(path))
+            light = list(Note.iterate(path, headers_only=True))
+            self.assertEqual(light, full)
+            self.assertEqual([n.context for n in light], [n.context for n in full])
+            self.assertEqual(
+                list(Note.reverse_iterate(path, headers_only=True)), full[::-1]
+            )
+
+    def test_message_fetched_on_demand(self):
+        light = list(Note.iterate("tests/edgecase.jot", headers_only=True))
+        for note in light:
+            self.assertIsInstance(note._body, tuple)
+        full = list(Note.iterate("tests/edgecase.jot"))
+        self.assertEqual([n.message for n in light], [n.message for n in full])
+
+    def test_skipping_bodies_keeps_boundaries(self):
+        import tempfile
+
+        # separators quoted in bodies, blank-line runs, missing headers
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "adversarial.jot")
+            with open(path, "w") as f:
+                f.write("^-^\nDirectory:/a\nDate:1\nTag:\nContext:\nMessage:x\n")
+                f.write("^-^\nnot a header\n \n^-^\n\n^-^\n^-^\n")
+                f.write("Directory:/b\nDate:2\nTag:\nContext:\nMessage:\n \n")
+                f.write("  ^-^  \ntop -b\n\n^-^x\n\n^-^\n")
+                f.write("Directory:/c\nDate:3\nTag:\nContext:\nMessage:y\n")
+            samples = (path, FIXED_CATNOTE, "tests/broken.jot", "tests/broken2.jot")
+            for path in samples + ("tests/edgecase.jot",):
+                full = [
+                    (s, e, r[: Note.HEADER_LINES]) for s, e, r in Note._records(path)
+                ]
+                self.assertEqual(list(Note._records(path, headers_only=True)), full)
+                self.assertEqual(
+                    list(Note._records_reverse(path, headers_only=True)), full[::-1]
+                )
+
+    def test_match_time_only_with_message_criteria(self):
+        criteria = (SearchType.MESSAGE, "hello")
+        self.assertEqual(
+            list(Note.match(FIXED_CATNOTE, criteria, time_only=True)),
+            [n.now for n in Note.match(FIXED_CATNOTE, criteria)],
+        )
+
+
+class TestResume(NotefileCase):
+    """iterate(resume=mark) and refresh() parse only what was appended."""
+
+    NAME = "resume.jot"
+
+    def _read(self, resume=None):
+        found = []
+
+        def reader():
+            return (yield from Note.iterate(self.jotfile, resume=resume))
+
+        gen = reader()
+        while True:
+            try:
+                found.append(next(gen))
+            except StopIteration as done:
+                return found, done.value
+
+    def test_resume_yields_only_new_notes(self):
+        before, mark = self._read()
+        self.assertEqual(before, list(Note.iterate(FIXED_CATNOTE)))
+        self.assertEqual(self._read(mark)[0], [])
+
+        Note.append(self.jotfile, Note.jot("fresh", now=1700000000))
+        new, mark = self._read(mark)
+        self.assertEqual([n.message for n in new], ["fresh\n"])
+        self.assertEqual(self._read(mark)[0], [])
+
+    def test_refresh_tracks_appends_and_tombstones(self):
+        notes = []
+        mark = Note.refresh(self.jotfile, notes)
+        Note.append(self.jotfile, Note.jot("fresh", now=1700000000))
+        Note.delete(self.jotfile, 1694747662, tombstone=True)
+        mark = Note.refresh(self.jotfile, notes, mark)
+        self.assertEqual(notes, list(Note.iterate(self.jotfile)))
+        self.assertNotIn(1694747662, [n.now for n in notes])
+
+    def test_rewrites_start_over(self):
+        notes = []
+        mark = Note.refresh(self.jotfile, notes)
+        Note.delete(self.jotfile, 1694747797)
+        Note.commit(self.jotfile)  # new inode
+        mark = Note.refresh(self.jotfile, notes, mark)
+        self.assertEqual(notes, list(Note.iterate(self.jotfile)))
+
+        # same-size amend of the last note: caught by the tail checksum
+        Note.amend(self.jotfile, context="X" * len(notes[-1].context))
+        Note.commit(self.jotfile)
+        mark = Note.refresh(self.jotfile, notes, mark)
+        self.assertEqual(notes[-1].context, list(Note.iterate(self.jotfile))[-1].context)
+
+    def test_partial_line_and_shrink_start_over(self):
+        notes = []
+        mark = Note.refresh(self.jotfile, notes)
+        with open(self.jotfile, "a") as f:
+            f.write("^-^")  # a writer caught mid-line
+        mark = Note.refresh(self.jotfile, notes, mark)
+        with open(self.jotfile, "a") as f:
+            f.write("\nDirectory:/tmp\nDate:1700000001\nTag:\nContext:\nMessage:x\n\n")
+        mark = Note.refresh(self.jotfile, notes, mark)
+        self.assertEqual(notes, list(Note.iterate(self.jotfile)))
+
+        with open(self.jotfile, "r+") as f:
+            f.truncate(os.path.getsize(self.jotfile) // 2)
+        Note.refresh(self.jotfile, notes, mark)
+        self.assertEqual(len(notes), len(list(Note.iterate(self.jotfile))))
+
+
+class TestCompiledQuery(unittest.TestCase):
+    """Note.compile folds criteria into one test with match()'s rules."""
+
+    def setUp(self):
+        self.notes = list(Note.iterate("tests/bellvue.jot"))
+
+    def _nows(self, criteria, logic="and"):
+        return [n.now for n in Note.filter(self.notes, criteria, logic)]
+
+    def test_unmeetable_queries_compile_to_none(self):
+        for criteria in (
+            [],
+            [(SearchType.ALL, ""), (SearchType.TAG, "")],
+            [(SearchType.DIRECTORY, "/story"), (SearchType.DIRECTORY, "/system")],
+            [(SearchType.TREE, "/story"), (SearchType.TREE, "/system")],
+        ):
+            self.assertIsNone(Note.compile(criteria), criteria)
+        self.assertIsNone(Note.compile([(SearchType.TAG, "")], logic="or"))
+
+    def test_folded_criteria_match_one_at_a_time(self):
+        tags = [(SearchType.TAG, "system_role"), (SearchType.TAG, "garden")]
+        union = sorted(set(self._nows(tags[:1]) + self._nows(tags[1:])))
+        self.assertEqual(sorted(self._nows(tags, "or")), union)
+
+        words = [(SearchType.MESSAGE_I, "MANOR"), (SearchType.MESSAGE_I, "the")]
+        both = [
+            n.now
+            for n in self.notes
+            if "manor" in n.message.lower() and "the" in n.message.lower()
+        ]
+        self.assertTrue(both)
+        self.assertEqual(self._nows(words), both)
+
+        nested = [(SearchType.TREE, "/story"), (SearchType.TREE, "/story/location")]
+        self.assertEqual(self._nows(nested), self._nows(nested[1:]))
+
+    def test_all_under_or_matches_everything(self):
+        criteria = [(SearchType.TAG, "nope"), (SearchType.ALL, "")]
+        self.assertEqual(self._nows(criteria, "or"), [n.now for n in self.notes])
+
+
+class TestParallelScan(NotefileCase):
+    """A scan split across worker processes matches the sequential one."""
+
+    VICTIM = 1725999543  # a /story/character note, tombstoned in every copy
+
+    FIXTURE = None
+    NAME = "big.jot"
+
+    def setUp(self):
+        super().setUp()
+        with open(self.jotfile, "w") as out:
+            for path in TestReverseReader.FIXTURES * 3:
+                with open(path) as f:
+                    out.write(f.read())
+                out.write(TestReverseReader.ADVERSARIAL + "\n\n")
+        Note.delete(self.jotfile, self.VICTIM, tombstone=True)
+
+    @staticmethod
+    def _fields(notes):
+        # phantoms (rejected records) are stamped with the time they're read
+        return [
+            (n.pwd, n.tag, n.context, n.message, n.now if n.message else None)
+            for n in notes
+        ]
+
+    @staticmethod
+    def _split(workers):
+        from contextlib import ExitStack
+
+        stack = ExitStack()
+        stack.enter_context(patch.object(Note, "WORKERS", workers))
+        stack.enter_context(patch.object(Note, "PARALLEL_MIN", 0))
+        stack.enter_context(patch.object(Note, "TAIL_BLOCK", 256))
+        return stack
+
+    def _both(self, *args, **kwargs):
+        with patch.object(Note, "WORKERS", 1):
+            expected = list(Note.match(self.jotfile, *args, **kwargs))
+        with self._split(3):
+            self.assertEqual(len(Note._cuts(self.jotfile)), 4)
+            found = list(Note.match(self.jotfile, *args, **kwargs))
+        return expected, found
+
+    def test_cuts_land_on_record_boundaries(self):
+        with self._split(5):
+            cuts = Note._cuts(self.jotfile)
+        with open(self.jotfile, "rb") as f:
+            data = f.read()
+        spans = list(Note._scan(Note._lines_in(data)))
+        starts = {s - len(b"^-^\n") for s, _e, _r in spans} | {0, len(data)}
+        self.assertEqual(cuts, sorted(set(cuts)))
+        self.assertTrue(set(cuts) <= starts, cuts)
+
+    def test_same_results_as_sequential(self):
+        for criteria, logic in (
+            ((SearchType.ALL, ""), "and"),
+            ((SearchType.TREE, "/"), "and"),
+            ([(SearchType.MESSAGE_I, "e"), (SearchType.TAG, "cat")], "or"),
+        ):
+            expected, found = self._both(criteria, logic)
+            self.assertTrue(expected)
+            self.assertEqual(self._fields(found), self._fields(expected))
+
+    def test_time_only_and_headers_only(self):
+        expected, found = self._both((SearchType.TREE, "/story"), time_only=True)
+        self.assertTrue(expected)
+        self.assertNotIn(self.VICTIM, expected)
+        self.assertEqual(found, expected)
+        expected, found = self._both((SearchType.ALL, ""), headers_only=True)
+        self.assertEqual(self._fields(found), self._fields(expected))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -142,7 +142,9 @@ class TestToolListing(MCPTestBase):
             {"jsonrpc": "2.0", "id": 1, "method": "tools/list"}
         )
         names = {t["name"] for t in resp["result"]["tools"]}
-        self.assertEqual(names, {"search_notes", "list_notes", "get_note"})
+        self.assertEqual(
+            names, {"search_notes", "query_notes", "list_notes", "get_note"}
+        )
         self.assertNotIn("create_note", names)
 
     def test_allow_writes_exposes_create_note(self):
@@ -173,11 +175,40 @@ class TestReadTools(MCPTestBase):
         self.assertEqual(note["directory"], "/home/user/proj")
         self.assertIn("now", note)
 
+    def test_search_notes_limit_ranks(self):
+        seed(self.notefile, [("tabby tabby tabby", "cats", "", "/home/user")])
+        data, is_err = self.tool_result(
+            "search_notes", {"field": "message", "query": "tabby", "limit": 1}
+        )
+        self.assertFalse(is_err)
+        self.assertEqual([n["message"].strip() for n in data], ["tabby tabby tabby"])
+
+    def test_search_notes_fuzzy(self):
+        data, is_err = self.tool_result(
+            "search_notes", {"field": "tag", "query": "shoping", "fuzzy": True}
+        )
+        self.assertFalse(is_err)
+        self.assertEqual([n["message"].strip() for n in data], ["buy tabby food"])
+
     def test_search_notes_unknown_field(self):
         data, is_err = self.tool_result("search_notes", {"field": "bogus", "query": "x"})
         self.assertTrue(is_err)
         self.assertIn("error", data)
 
+    def test_query_notes(self):
+        data, is_err = self.tool_result(
+            "query_notes", {"query": "tag:cats OR (msg:parser AND NOT dir:/home/user/proj/*)"}
+        )
+        self.assertFalse(is_err)
+        self.assertEqual([n["message"].strip() for n in data], ["buy tabby food"])
+        data, _ = self.tool_result(
+            "query_notes", {"query": "dir:/home/* ctx:pytest", "order": "desc", "limit": 1}
+        )
+        self.assertEqual([n["message"].strip() for n in data], ["fix the parser bug"])
+        data, is_err = self.tool_result("query_notes", {"query": "tag:cats AND ("})
+        self.assertTrue(is_err)
+        self.assertIn("hint", data)
+
     def test_list_notes_exact_vs_tree(self):
         exact, _ = self.tool_result("list_notes", {"directory": "/home/user/proj"})
         self.assertEqual(len(exact), 1)
@@ -186,6 +217,22 @@ class TestReadTools(MCPTestBase):
         )
         self.assertEqual(len(tree), 2)
 
+    def test_list_notes_limit_and_order(self):
+        Note.append(self.notefile, Note.jot("later", pwd="/home/user/proj/src", now=2))
+        newest, _ = self.tool_result(
+            "list_notes",
+            {"directory": "/home/user/proj", "tree": True, "limit": 2, "order": "desc"},
+        )
+        self.assertEqual([n["message"].strip() for n in newest], ["later", "fix the parser bug"])
+        oldest, _ = self.tool_result(
+            "list_notes", {"directory": "/home/user/proj", "tree": True, "limit": 1}
+        )
+        self.assertEqual([n["message"].strip() for n in oldest], ["buy tabby food"])
+        data, is_err = self.tool_result(
+            "list_notes", {"directory": "/home/user/proj", "order": "sideways"}
+        )
+        self.assertTrue(is_err)
+
     def test_get_note_by_timestamp(self):
         listed, _ = self.tool_result("list_notes", {"directory": "/home/user/proj"})
         ts = listed[0]["now"]
@@ -198,6 +245,27 @@ class TestReadTools(MCPTestBase):
         self.assertTrue(is_err)
         self.assertIn("error", got)
 
+    def test_reads_see_later_writes(self):
+        # the server keeps the notefile parsed; appends and tombstones made
+        # after a read must still show up in the next one
+        before, _ = self.tool_result("list_notes", {"directory": "/tmp"})
+        self.assertEqual(before, [])
+        Note.append(self.notefile, Note.jot("seven", pwd="/tmp", now=7))
+        Note.append(self.notefile, Note.jot("eight", pwd="/tmp", now=8))
+        Note.delete(self.notefile, 7, tombstone=True)
+        after, _ = self.tool_result("list_notes", {"directory": "/tmp"})
+        self.assertEqual([n["now"] for n in after], [8])
+
+    def test_repeat_reads_hit_cache(self):
+        cache = catjot_mcp._cache()
+        before = cache.stats()
+        first, _ = self.tool_result("search_notes", {"field": "tag", "query": "cats work"})
+        again, _ = self.tool_result("search_notes", {"field": "tag", "query": "work cats"})
+        self.assertEqual(sorted(n["now"] for n in again), sorted(n["now"] for n in first))
+        after = cache.stats()
+        self.assertEqual(after["misses"] - before["misses"], 2)
+        self.assertEqual(after["hits"] - before["hits"], 2)
+
     def test_unknown_tool_is_error(self):
         _, is_err = self.tool_result("no_such_tool", {})
         self.assertTrue(is_err)
@@ -333,7 +401,9 @@ class TestStdioSubprocess(MCPTestBase):
         responses = [json.loads(l) for l in lines]
         self.assertEqual(responses[0]["result"]["serverInfo"]["name"], "catjot")
         names = {t["name"] for t in responses[1]["result"]["tools"]}
-        self.assertEqual(names, {"search_notes", "list_notes", "get_note"})
+        self.assertEqual(
+            names, {"search_notes", "query_notes", "list_notes", "get_note"}
+        )
         payload = json.loads(responses[2]["result"]["content"][0]["text"])
         self.assertEqual(payload[0]["message"].strip(), "subprocess note")
 